@@ -8,7 +8,7 @@ from reframe.core.backends import getlauncher
 # `SpackTest` is a class for benchmarks which will use Spack as build system.
 # The only requirement is to inherit this class and set the `spack_spec`
 # attribute.
-from benchmarks.modules.utils import SpackTest
+from benchmarks.modules.utils import SpackTest, output_scanner
 
 @rfm.simple_test
 class BabelstreamBenchmarkBase(SpackTest):
@@ -37,22 +37,22 @@ class BabelstreamBenchmarkBase(SpackTest):
     # If you need more precision, get NumPy and use its numpy.float128.
     @performance_function('MBytes/sec', perf_key='Copy')
     def extract_copy_perf(self):
-        return sn.extractsingle(r'Copy \s+(\S+)\s+.', self.stdout, 1, float)
+        return output_scanner.extractsingle(r'Copy \s+(\S+)\s+.', self.stdout, 1, float)
 
     @performance_function('MBytes/sec', perf_key='Mul')
     def extract_scale_perf(self):
-        return sn.extractsingle(r'Mul \s+(\S+)\s+..', self.stdout, 1, float)
+        return output_scanner.extractsingle(r'Mul \s+(\S+)\s+..', self.stdout, 1, float)
 
     @performance_function('MBytes/sec', perf_key='Add')
     def extract_add_perf(self):
-        return sn.extractsingle(r'Add \s+(\S+)\s+.?', self.stdout, 1, float)
+        return output_scanner.extractsingle(r'Add \s+(\S+)\s+.?', self.stdout, 1, float)
 
     @performance_function('MBytes/sec', perf_key='Triad')
     def extract_triad_perf(self):
-        return sn.extractsingle(r'Triad \s+(\S+)\s+.', self.stdout, 1, float)
+        return output_scanner.extractsingle(r'Triad \s+(\S+)\s+.', self.stdout, 1, float)
     @performance_function('MBytes/sec', perf_key='Dot')
     def extract_dot_perf(self):
-        return sn.extractsingle(r'Dot \s+(\S+)\s+.', self.stdout, 1, float)
+        return output_scanner.extractsingle(r'Dot \s+(\S+)\s+.', self.stdout, 1, float)
     @run_after('setup')
     def setup_num_tasks(self):
         self.env_vars['OMP_NUM_THREADS'] = f'{self.num_cpus_per_task}'
@@ -5,7 +5,7 @@
 
 import reframe as rfm
 import reframe.utility.sanity as sn
-from benchmarks.modules.utils import SpackTest
+from benchmarks.modules.utils import SpackTest, output_scanner
 import os.path as path
 
 class Cp2kBaseBenchmark(SpackTest):
@@ -41,7 +41,7 @@ class Cp2kBaseBenchmark(SpackTest):
     def set_perf_patterns(self):
         self.perf_patterns = {
             'Maximum total time':
-            sn.extractsingle(r'CP2K +([0-9]+) +([0-9.]+) +([0-9.]+) +([0-9.]+) +([0-9.]+) +([0-9.]+)', self.stdout, 6, float)
+            output_scanner.extractsingle(r'CP2K +([0-9]+) +([0-9.]+) +([0-9.]+) +([0-9.]+) +([0-9.]+) +([0-9.]+)', self.stdout, 6, float)
         }
 
 
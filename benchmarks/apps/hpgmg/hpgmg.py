@@ -5,7 +5,7 @@
 
 import reframe as rfm
 import reframe.utility.sanity as sn
-from benchmarks.modules.utils import SpackTest
+from benchmarks.modules.utils import SpackTest, output_scanner
 
 
 @rfm.simple_test
@@ -39,8 +39,8 @@ class HpgmgTest(SpackTest):
 
     @run_before('performance')
     def set_perf_patterns(self):
-        dofs = sn.extractall(r'DOF/s=(\S+)\s+.*',
-                             self.stdout, 1, float)
+        dofs = output_scanner.extractall(r'DOF/s=(\S+)\s+.*',
+                                         self.stdout, 1, float)
         self.perf_patterns = {
             'l_0': dofs[0],
             'l_1': dofs[1],
@@ -10,17 +10,42 @@
         reframe/bin/reframe -C reframe_config.py -c apps/imb/ --run --performance-report
 """
 
+import os.path
+import re
+import numpy as np
 import reframe as rfm
 import reframe.utility.sanity as sn
+import reframe.utility.typecheck as typ
 from collections import namedtuple
 from benchmarks.modules.imb import read_imb_out
+from benchmarks.modules.reframe_extras import NodePlacement
 from benchmarks.modules.utils import SpackTest
 
 Metric = namedtuple('Metric', ['column_number', 'function', 'unit', 'label'])
 
-class IMB_base(SpackTest):
+# Metrics of benchmarks whose columns are:
+#   #bytes | #repetitions | t_min[usec] | t_max[usec] | t_avg[usec]
+COLLECTIVE_METRICS = [
+    Metric(4, np.min, 't_avg[usec]', 'min_avg_latency'),
+    Metric(4, np.max, 't_avg[usec]', 'max_avg_latency'),
+]
+
+# Metrics of benchmarks whose columns are:
+#   #bytes | #repetitions | t_min[usec] | t_max[usec] | t_avg[usec] | Mbytes/sec
+EXCHANGE_METRICS = [
+    Metric(4, np.min, 't_avg[usec]', 'min_avg_latency'),
+    Metric(5, np.max, 'Mbytes/sec', 'max_bandwidth'),
+]
+
+class IMB_base(SpackTest, NodePlacement):
     METRICS = []
 
+    # Names of the IMB benchmarks run by the test, as in the "# Benchmarking <name>" lines of its output
+    benchmarks = variable(typ.List[str], value=[])
+
+    # Also report the value at every message size of the columns used by `METRICS`
+    message_size_metrics = variable(typ.Bool, value=False)
+
     valid_systems = ['-gpu']
     valid_prog_environs = ['default']
     exclusive_access = True
@@ -30,36 +55,70 @@ class IMB_base(SpackTest):
     spack_spec = 'intel-mpi-benchmarks@2019.6'
     time_limit = '59m'
 
+    def metrics(self, benchmark):
+        """ Return the Metrics of `benchmark`, `self.METRICS` by default """
+        return self.METRICS
+
+    @run_before('sanity')
+    def set_sanity_patterns(self):
+        self.sanity_patterns = sn.all([sn.assert_found('# Benchmarking ' + benchmark, self.stdout)
+                                       for benchmark in self.benchmarks])
+
     @run_before('performance')
     def add_metrics(self):
-        """ Create `self.perf_patterns` and units only in `self.reference`.
+        """ Create `self.perf_patterns` and units only in `self.reference`, for the Metrics of each
+            benchmark in `self.benchmarks` with `self.num_tasks` processes.
 
-            Args:
-                metrics: TODO
-                n_procs: TODO
+            Performance variables are named after the metric labels, prefixed by the lowercase
+            benchmark name if the test runs more than one benchmark.
+        """
+
+        for benchmark in self.benchmarks:
+            prefix = f'{benchmark.lower()}_' if len(self.benchmarks) > 1 else ''
+            for metric in self.metrics(benchmark):
+                label = prefix + metric.label
+                self.perf_patterns[label] = reduce(self.stdout, benchmark, self.num_tasks, metric.column_number, metric.function)
+                self.reference[label] = (0, None, None, metric.unit)
+
+            if self.message_size_metrics:
+                self.add_message_size_metrics(benchmark, prefix)
 
-            TODO: Requires self.METRICS
+    def add_message_size_metrics(self, benchmark, prefix=''):
+        """ Add a `<prefix><quantity>_<size>B` performance variable for every message size of the
+            curves behind the Metrics of `benchmark`.
         """
 
-        for metric in self.METRICS:
-            self.perf_patterns[metric.label] = reduce(self.stdout, self.num_tasks, metric.column_number, metric.function)
-            self.reference[metric.label] = (0, None, None, metric.unit)
+        # one curve per column, named after the metric label without its reduction
+        curves = {}
+        for metric in self.metrics(benchmark):
+            curves.setdefault(metric.column_number, (re.sub(r'^(min|max)_', '', metric.label), metric.unit))
+        sizes = read_imb_out(os.path.join(self.stagedir, self.job.stdout), benchmark)[self.num_tasks][0]
+        for column_number, (quantity, unit) in curves.items():
+            for size in sizes:
+                label = f'{prefix}{quantity}_{size}B'
+                self.perf_patterns[label] = value_at(self.stdout, benchmark, self.num_tasks, column_number, size)
+                self.reference[label] = (0, None, None, unit)
 
 @sn.deferrable
-def reduce(path, n_procs, column_number, function):
+def reduce(path, benchmark, n_procs, column_number, function):
     """ Calculate an aggregate value from IMB output.
 
         Args:
             path: str, path to file
+            benchmark: str, name of the IMB benchmark
             n_procs: int, number of processes
             column_number: int, column number
-            function: callable to apply to specified `column` of table for `n_procs` in `path`
+            function: NumPy reduction to apply to specified `column` of table for `benchmark` with `n_procs` in `path`
     """
-    tables = read_imb_out(path)
+    tables = read_imb_out(path, benchmark)
     table = tables[n_procs] # separate lines here for more useful KeyError if missing:
-    col = [row[column_number] for row in table]
-    result = function(col)
-    return result
+    return function(table[column_number]).item()
+
+@sn.deferrable
+def value_at(path, benchmark, n_procs, column_number, size):
+    """ Value in column `column_number` for message size `size` bytes of the IMB output table for `benchmark` with `n_procs` in `path` """
+    table = read_imb_out(path, benchmark)[n_procs]
+    return table[column_number][table[0] == size][0].item()
 
 @rfm.simple_test
 class IMB_PingPong(IMB_base):
@@ -68,10 +127,12 @@ class IMB_PingPong(IMB_base):
         # 'column_number' 'function', 'unit', 'label'
         # Columns in the output of the benchmarks are:
         #    #bytes | #repetitions | t[usec] | Mbytes/sec
-        Metric(3, max, 'Mbytes/sec', 'max_bandwidth'),
-        Metric(2, min, 't[usec]', 'min_latency'),
-        Metric(2, max, 't[usec]', 'max_latency'),
+        Metric(3, np.max, 'Mbytes/sec', 'max_bandwidth'),
+        Metric(2, np.min, 't[usec]', 'min_latency'),
+        Metric(2, np.max, 't[usec]', 'max_latency'),
     ]
+    benchmarks = ['PingPong']
+
     def __init__(self):
         super().__init__()
         self.executable_opts = ['pingpong']
@@ -80,10 +141,6 @@ class IMB_PingPong(IMB_base):
         self.num_tasks_per_node = 1
         self.tags.add('pingpong')
 
-    @run_before('sanity')
-    def set_sanity_patterns(self):
-        self.sanity_patterns = sn.assert_found('# Benchmarking PingPong', self.stdout)
-
 @rfm.simple_test
 class IMB_MPI1(IMB_base):
     """
@@ -94,7 +151,7 @@ which (hopefully) is to fill up nodes one by one. Should use 8 nodes at 256 task
         # 'column_number' 'function', 'unit', 'label'
         # Columns in the output of the benchmarks are:
         #   #bytes | #repetitions | Mbytes/sec | Msg/sec
-        Metric(2, max, 'Mbytes/sec', 'max_bandwidth')
+        Metric(2, np.max, 'Mbytes/sec', 'max_bandwidth')
     ]
 
     tasks = parameter([ 2 ** x for x in range(1,9)])
@@ -105,12 +162,65 @@ which (hopefully) is to fill up nodes one by one. Should use 8 nodes at 256 task
 
     def __init__(self):
         super().__init__()
-        self.executable_opts = [self.mode.lower(), '-npmin', str(self.num_tasks)]
+        self.benchmarks = [self.mode]
         self.num_tasks = self.tasks
+        self.executable_opts = [self.mode.lower(), '-npmin', str(self.num_tasks)]
         self.num_cpus_per_task = 1
         self.tags.add(self.mode.lower())
-        #TODO: What is the default behaviour if I don't set num_tasks_per_node?
+        # num_tasks_per_node is not set, so the scheduler fills up nodes one by one, unless
+        # `placement` requests a node set, see NodePlacement.
 
-    @run_before('sanity')
-    def set_sanity_patterns(self):
-        self.sanity_patterns = sn.assert_found('# Benchmarking '+self.mode, self.stdout)
+class IMB_Collective(IMB_base):
+    """
+Runs the benchmarks in `benchmarks` on 2^1 ... 2^8 tasks, like IMB_MPI1.
+    """
+    tasks = parameter([ 2 ** x for x in range(1,9)])
+
+    def __init__(self):
+        super().__init__()
+        self.num_tasks = self.tasks
+        self.executable_opts = [b.lower() for b in self.benchmarks] + ['-npmin', str(self.num_tasks)]
+        self.num_cpus_per_task = 1
+        self.tags |= {b.lower() for b in self.benchmarks}
+
+@rfm.simple_test
+class IMB_Allreduce(IMB_Collective):
+    METRICS = COLLECTIVE_METRICS
+    benchmarks = ['Allreduce']
+
+@rfm.simple_test
+class IMB_Bcast(IMB_Collective):
+    METRICS = COLLECTIVE_METRICS
+    benchmarks = ['Bcast']
+
+@rfm.simple_test
+class IMB_Reduce_scatter(IMB_Collective):
+    METRICS = COLLECTIVE_METRICS
+    benchmarks = ['Reduce_scatter']
+
+@rfm.simple_test
+class IMB_Exchange(IMB_Collective):
+    METRICS = EXCHANGE_METRICS
+    benchmarks = ['Exchange']
+
+@rfm.simple_test
+class IMB_Sendrecv(IMB_Collective):
+    METRICS = EXCHANGE_METRICS
+    benchmarks = ['Sendrecv']
+
+@rfm.simple_test
+class IMB_Collectives(IMB_Collective):
+    """
+Runs all of Allreduce, Bcast, Reduce_scatter, Exchange and Sendrecv in a single job.
+    """
+    BENCHMARK_METRICS = {
+        'Allreduce': COLLECTIVE_METRICS,
+        'Bcast': COLLECTIVE_METRICS,
+        'Reduce_scatter': COLLECTIVE_METRICS,
+        'Exchange': EXCHANGE_METRICS,
+        'Sendrecv': EXCHANGE_METRICS,
+    }
+    benchmarks = list(BENCHMARK_METRICS)
+
+    def metrics(self, benchmark):
+        return self.BENCHMARK_METRICS[benchmark]
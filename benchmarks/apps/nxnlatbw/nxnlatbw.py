@@ -0,0 +1,99 @@
+""" Ping-pong latency and bandwidth matrix between all nodes in the ReFrame partition.
+
+    See README.md for details.
+"""
+
+import os.path
+import numpy as np
+import reframe as rfm
+import reframe.utility.sanity as sn
+from benchmarks.modules.nxnlatbw import plot_heatmap, read_nxnlatbw_out
+from benchmarks.modules.reframe_extras import UNUSABLE_NODE_STATES, scheduler_info
+from benchmarks.modules.utils import SpackTest
+
+
+@sn.deferrable
+def pair_stat(path, quantity, function):
+    """ Apply `function` to the `quantity` ('latency' or 'bandwidth') of all the measured pairs in `path` """
+    matrix = read_nxnlatbw_out(path)
+    return function(matrix.pairs(getattr(matrix, quantity))).item()
+
+
+@rfm.simple_test
+class Nxnlatbw(SpackTest):
+    descr = 'Latency and bandwidth between all pairs of nodes, using one process per node'
+    valid_systems = ['-gpu']
+    valid_prog_environs = ['default']
+    # MPI library to build and run with, e.g. `-S spack_spec=openmpi`: there is no default which
+    # concretizes on all systems, as some only provide an external MPI.
+    spack_spec = required
+    sourcesdir = 'src'
+    executable = './nxnlatbw'
+    num_tasks_per_node = 1
+    exclusive_access = True
+    time_limit = '1h'
+
+    # Number of nodes to use, by default all the usable nodes of the partition
+    num_nodes = variable(int, type(None), value=None)
+    # How to schedule the pairs of nodes:
+    # * 'rounds': all the pairs of a round-robin tournament at the same time, in N-1 rounds
+    # * 'serial': one ordered pair at a time, in N*(N-1) steps
+    pair_schedule = variable(str, value='rounds')
+    heatmap = 'nxnlatbw_heatmap.png'
+
+    @run_after('setup')
+    def set_num_tasks(self):
+        if self.num_nodes is None:
+            self.num_nodes = scheduler_info(self.current_partition, exclude_states=UNUSABLE_NODE_STATES).num_nodes
+        self.skip_if(self.num_nodes < 2, f'needs at least 2 nodes, got {self.num_nodes}')
+        self.num_tasks = self.num_nodes
+        if self.pair_schedule == 'serial':
+            self.executable_opts = ['-s']
+        elif self.pair_schedule != 'rounds':
+            raise ValueError(f'unknown pair_schedule {self.pair_schedule!r}, expected "rounds" or "serial"')
+
+    @run_before('compile')
+    def build_benchmark(self):
+        self.postbuild_cmds = [
+            f'eval `spack -e {self.build_system.environment} load --sh {self.spack_spec}`',
+            'mpicc -O2 -o nxnlatbw mpi_nxnlatbw.c',
+        ]
+
+    @sanity_function
+    def validate_all_pairs(self):
+        pairs = sn.count(sn.extractall(r'^\d+,\d+,', self.stdout))
+        return sn.all([
+            sn.assert_found(r'src,dst,lat\(us\),bandwidth\(\(Mbytes/sec\)', self.stdout),
+            sn.assert_eq(pairs, self.num_tasks * (self.num_tasks - 1)),
+        ])
+
+    @run_after('sanity')
+    def save_heatmap(self):
+        matrix = read_nxnlatbw_out(os.path.join(self.stagedir, self.job.stdout))
+        plot_heatmap(matrix, os.path.join(self.stagedir, self.heatmap),
+                     f'{self.current_partition.fullname}, {self.num_tasks} nodes')
+        self.keep_files.append(self.heatmap)
+
+    @performance_function('us')
+    def latency_median(self):
+        return pair_stat(self.stdout, 'latency', np.median)
+
+    @performance_function('us')
+    def latency_p99(self):
+        return pair_stat(self.stdout, 'latency', lambda pairs: np.percentile(pairs, 99))
+
+    @performance_function('us')
+    def latency_worst(self):
+        return pair_stat(self.stdout, 'latency', np.max)
+
+    @performance_function('Mbytes/sec')
+    def bandwidth_median(self):
+        return pair_stat(self.stdout, 'bandwidth', np.median)
+
+    @performance_function('Mbytes/sec')
+    def bandwidth_p1(self):
+        return pair_stat(self.stdout, 'bandwidth', lambda pairs: np.percentile(pairs, 1))
+
+    @performance_function('Mbytes/sec')
+    def bandwidth_worst(self):
+        return pair_stat(self.stdout, 'bandwidth', np.min)
@@ -0,0 +1,218 @@
+/*
+  Copyright (c) 2004,2005. PathScale, Inc. All rights reserved.
+    
+  Redistribution and use in source and binary forms, with or without 
+  modification, are permitted provided that the following conditions
+  are met:
+    
+  + All copies of source code must retain the above copyright notice, 
+    this list of conditions and the following disclaimer. 
+
+  + Redistributions in binary form must reproduce the above copyright
+    notice, this list of conditions and the following disclaimer in the
+    documentation and/or other materials provided with the distribution.
+
+  + If user makes modifications to this software, and provides those 
+    modifications to PathScale, user assigns to PathScale, Inc. ownership
+    of the provided modifications and all intellectual property rights 
+    embodied in those modifications. 
+    
+  + The name of PathScale, Inc. may not be used to endorse or promote 
+    products derived from this software without specific prior written 
+    permission. 
+      
+  THIS SOFTWARE IS PROVIDED BY PATHSCALE, INC. AND ITS LICENSORS "AS IS" 
+  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, 
+  THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR 
+  PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL PATHSCALE, INC. OR ITS 
+  LICENSORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, 
+  EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, 
+  PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR 
+  PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF 
+  LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING 
+  NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS 
+  SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE. 
+*/
+
+/*
+ * Derived from code supplied by Ohio State University:
+ * Copyright (C) 2002-2003 the Network-Based Computing Laboratory
+ * (NBCL), The Ohio State University.  
+ *  http://nowlab.cis.ohio-state.edu/projects/mpi-iba/
+ */
+
+/*
+ * Measures the ping-pong latency and the bandwidth between all pairs of ranks.
+ *
+ * By default the pairs are scheduled as a round-robin tournament: in each of
+ * the N-1 rounds (N if N is odd) every rank is paired with a different
+ * partner, and all the pairs of a round are measured at the same time, in
+ * both directions.  With `-s` a single ordered pair is measured at a time, as
+ * in the original version, which needs N*(N-1) steps.
+ *
+ * Rank 0 prints the hostname of each rank as `# rank <rank> <host>` lines,
+ * then one `src,dst,lat(us),bandwidth((Mbytes/sec)` CSV line per ordered pair.
+ */
+
+#include "mpi.h"
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <unistd.h>
+
+#define MYBUFSIZE 4*1024*1024
+char s_buf[MYBUFSIZE];
+char r_buf[MYBUFSIZE];
+
+int size = MYBUFSIZE;
+int latloop = 10000, latskip = 10;
+int bwloop = 10, bwskip = 2;
+
+/* Measure latency and bandwidth from this rank to `dest`, which calls receive_from() at the same time. */
+static void send_to(int dest, double *latency, double *bw)
+{
+    MPI_Status stat;
+    double t_start = 0.0, t_end = 0.0;
+    int i;
+
+    for (i = 0; i < latloop + latskip; i++) {
+        if (i == latskip)
+            t_start = MPI_Wtime();
+        MPI_Send((void*)0, 0, MPI_CHAR, dest, 1, MPI_COMM_WORLD);
+        MPI_Recv((void*)0, 0, MPI_CHAR, dest, 1, MPI_COMM_WORLD, &stat);
+    }
+    t_end = MPI_Wtime();
+    *latency = (t_end - t_start) * 1.0e6 / (2.0 * latloop);
+
+    /* wait for the receiver to be ready */
+    MPI_Recv(NULL, 0, MPI_CHAR, dest, 999, MPI_COMM_WORLD, &stat);
+    for ( i=0; i< bwskip; i++ ) {
+        MPI_Send(s_buf, size, MPI_CHAR, dest, i, MPI_COMM_WORLD);
+    }
+    MPI_Recv(NULL, 0, MPI_CHAR, dest, i+1000, MPI_COMM_WORLD,&stat);
+    t_start=MPI_Wtime();
+    for ( i=0; i< bwloop; i++ ) {
+        MPI_Send(s_buf, size, MPI_CHAR, dest, i, MPI_COMM_WORLD);
+    }
+    MPI_Recv(NULL, 0, MPI_CHAR, dest, i+1000, MPI_COMM_WORLD,&stat);
+    t_end=MPI_Wtime();
+    *bw = ((double)size*(double)bwloop)/((t_end-t_start)*(1.0e6));
+}
+
+/* Counterpart of send_to() on the `src` rank. */
+static void receive_from(int src)
+{
+    MPI_Status stat;
+    int i;
+
+    for (i = 0; i < latloop + latskip; i++) {
+        MPI_Recv((void*)0, 0, MPI_CHAR, src, 1, MPI_COMM_WORLD, &stat);
+        MPI_Send((void*)0, 0, MPI_CHAR, src, 1, MPI_COMM_WORLD);
+    }
+
+    MPI_Send(NULL, 0, MPI_CHAR, src, 999, MPI_COMM_WORLD);
+    for ( i=0; i< bwskip; i++ ) {
+        MPI_Recv(r_buf, size, MPI_CHAR, src,i,MPI_COMM_WORLD,&stat);
+    }
+    MPI_Send(NULL, 0, MPI_CHAR, src, i + 1000, MPI_COMM_WORLD);
+    for ( i=0; i< bwloop; i++ ) {
+        MPI_Recv(r_buf, size, MPI_CHAR, src,i,MPI_COMM_WORLD,&stat);
+    }
+    MPI_Send(NULL, 0, MPI_CHAR, src, i + 1000, MPI_COMM_WORLD);
+}
+
+/* Partner of `rank` in round `round` of a round-robin tournament between
+   `players` ranks (an even number), or -1 if it is a real rank's bye. */
+static int partner(int rank, int round, int players, int numprocs)
+{
+    int other;
+    if (rank == players - 1)
+        other = round;
+    else if (rank == round)
+        other = players - 1;
+    else
+        other = (2 * round - rank + (players - 1)) % (players - 1);
+    return other < numprocs ? other : -1;
+}
+
+int main(int argc, char *argv[])
+{
+
+    int myid, numprocs, i, r;
+    int serial = 0, rounds;
+    double result[3], *results = NULL;
+    char host[MPI_MAX_PROCESSOR_NAME], *hosts = NULL;
+    int host_len;
+
+    MPI_Init(&argc, &argv);
+    MPI_Comm_size(MPI_COMM_WORLD, &numprocs);
+    MPI_Comm_rank(MPI_COMM_WORLD, &myid);
+
+    for (i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "-s") == 0)
+            serial = 1;
+    }
+
+    /* touch the data */
+    memset(s_buf, 'a', size);
+    memset(r_buf, 'b', size);
+
+    memset(host, 0, sizeof(host));
+    MPI_Get_processor_name(host, &host_len);
+    if (myid == 0) {
+        results = malloc(3 * numprocs * sizeof(double));
+        hosts = malloc(MPI_MAX_PROCESSOR_NAME * numprocs);
+    }
+    MPI_Gather(host, MPI_MAX_PROCESSOR_NAME, MPI_CHAR, hosts, MPI_MAX_PROCESSOR_NAME, MPI_CHAR, 0, MPI_COMM_WORLD);
+    if (myid == 0) {
+        for (i = 0; i < numprocs; i++)
+            fprintf(stdout, "# rank %d %s\n", i, hosts + i * MPI_MAX_PROCESSOR_NAME);
+        fprintf(stdout, "src,dst,lat(us),bandwidth((Mbytes/sec)\n");
+        fflush(stdout);
+    }
+
+    /* In the serial schedule round r measures the ordered pair r / N -> r % N. */
+    int players = numprocs + numprocs % 2;
+    rounds = serial ? numprocs * numprocs : players - 1;
+    for (r = 0; r < rounds; r++) {
+        /* result of this rank as a sender: destination (-1 if none), latency, bandwidth */
+        result[0] = -1;
+        MPI_Barrier(MPI_COMM_WORLD);
+        if (serial) {
+            int src = r / numprocs, dest = r % numprocs;
+            if (src != dest) {
+                if (myid == src) {
+                    send_to(dest, &result[1], &result[2]);
+                    result[0] = dest;
+                } else if (myid == dest) {
+                    receive_from(src);
+                }
+            }
+        } else {
+            int other = partner(myid, r, players, numprocs);
+            if (other >= 0) {
+                /* the lower rank sends first, then the other way around */
+                if (myid < other) {
+                    send_to(other, &result[1], &result[2]);
+                    receive_from(other);
+                } else {
+                    receive_from(other);
+                    send_to(other, &result[1], &result[2]);
+                }
+                result[0] = other;
+            }
+        }
+        MPI_Gather(result, 3, MPI_DOUBLE, results, 3, MPI_DOUBLE, 0, MPI_COMM_WORLD);
+        if (myid == 0) {
+            for (i = 0; i < numprocs; i++) {
+                if (results[3 * i] >= 0)
+                    fprintf(stdout, "%d,%d,%0.2f,%f \n", i, (int)results[3 * i], results[3 * i + 1], results[3 * i + 2]);
+            }
+            fflush(stdout);
+        }
+    }
+
+    MPI_Finalize();
+    return 0;
+}
@@ -4,16 +4,37 @@
 """
 
 from collections import namedtuple
+import os.path
 import re
+import numpy as np
 import reframe as rfm
 import reframe.utility.sanity as sn
+import reframe.utility.typecheck as typ
 import modules
-from benchmarks.modules.omb import read_omb_out
+from benchmarks.modules.omb import read_omb_out, read_omb_table
+from benchmarks.modules.reframe_extras import NodePlacement
 from benchmarks.modules.utils import SpackTest
 
 Metric = namedtuple('Metric', ['column_number', 'function', 'unit', 'label'])
 
-class OSU_Micro_Benchmarks(SpackTest):
+# Collective benchmarks, each also available as a non-blocking `i<name>` benchmark
+OSU_COLLECTIVES = [
+    'allgather', 'allgatherv', 'allreduce', 'alltoall', 'alltoallv', 'barrier', 'bcast',
+    'gather', 'gatherv', 'reduce', 'reduce_scatter', 'scatter', 'scatterv',
+]
+
+# Reduction over message sizes, and its label prefix, for the columns in each unit
+OSU_REDUCTIONS = {
+    'us': (np.min, 'min'),
+    'MB/s': (np.max, 'max'),
+    'messages/s': (np.max, 'max'),
+    '%': (np.max, 'max'),
+}
+
+class OSU_Micro_Benchmarks(SpackTest, NodePlacement):
+
+    # Also report the value at every message size of the columns used by `METRICS`
+    message_size_metrics = variable(typ.Bool, value=False)
 
     def __init__(self):
         self.valid_systems = ['-gpu']
@@ -27,23 +48,47 @@ class OSU_Micro_Benchmarks(SpackTest):
     def add_metrics(self):
         """ Add all Metrics from self.METRICS to sanity/performance/reference patterns """
 
+        self.sanity_patterns = sn.assert_found('# OSU MPI', self.stdout)
         for metric in self.METRICS:
-            self.sanity_patterns = sn.assert_found('# OSU MPI', self.stdout)
             self.perf_patterns[metric.label] = reduce(self.stdout, metric.column_number, metric.function)
             self.reference[metric.label] = (0, None, None, metric.unit) # oddly we don't have to supply the "*" scope key??
 
+    @run_before('performance')
+    def add_message_size_metrics(self):
+        """ Add a `<quantity>_<size>B` performance variable for every message size of the curves
+            behind `self.METRICS`, if `self.message_size_metrics` is set.
+        """
+
+        if not self.message_size_metrics:
+            return
+        # one curve per column, named after the metric label without its reduction
+        curves = {}
+        for metric in self.METRICS:
+            curves.setdefault(metric.column_number, (re.sub(r'^(min|max)_', '', metric.label), metric.unit))
+        sizes = read_omb_out(os.path.join(self.stagedir, self.job.stdout))[0]
+        for column_number, (quantity, unit) in curves.items():
+            for size in sizes:
+                label = f'{quantity}_{size}B'
+                self.perf_patterns[label] = value_at(self.stdout, column_number, size)
+                self.reference[label] = (0, None, None, unit)
+
 
 @sn.deferrable
 def reduce(path, column_number, function):
-    data = read_omb_out(path)
-    col = [row[column_number] for row in data]
-    return function(col)
+    col = read_omb_out(path)[column_number]
+    return function(col).item()
+
+
+@sn.deferrable
+def value_at(path, column_number, size):
+    cols = read_omb_out(path)
+    return cols[column_number][cols[0] == size][0].item()
 
 
 @rfm.simple_test
 class Osu_alltoall(OSU_Micro_Benchmarks):
     # 'column', 'function', 'unit', 'label'
-    METRICS = [Metric(1, min, 'us', "min_av_latency")]
+    METRICS = [Metric(1, np.min, 'us', "min_av_latency")]
 
     def __init__(self):
         super().__init__()
@@ -58,7 +103,7 @@ class Osu_alltoall(OSU_Micro_Benchmarks):
 
 @rfm.simple_test
 class Osu_allgather(OSU_Micro_Benchmarks):
-    METRICS = [Metric(1, min, 'us', "min_av_latency")]
+    METRICS = [Metric(1, np.min, 'us', "min_av_latency")]
 
     def __init__(self):
         super().__init__()
@@ -74,7 +119,7 @@ class Osu_allgather(OSU_Micro_Benchmarks):
 @rfm.simple_test
 class Osu_allreduce(OSU_Micro_Benchmarks):
 
-    METRICS = [Metric(1, min, 'us', "min_av_latency")]
+    METRICS = [Metric(1, np.min, 'us', "min_av_latency")]
 
     def __init__(self):
         super().__init__()
@@ -90,7 +135,7 @@ class Osu_allreduce(OSU_Micro_Benchmarks):
 @rfm.simple_test
 class Osu_bw(OSU_Micro_Benchmarks):
 
-    METRICS = [Metric(1, max, 'MB/s', "max_bandwidth")]
+    METRICS = [Metric(1, np.max, 'MB/s', "max_bandwidth")]
 
     def __init__(self):
 
@@ -104,7 +149,7 @@ class Osu_bw(OSU_Micro_Benchmarks):
 @rfm.simple_test
 class Osu_latency(OSU_Micro_Benchmarks):
 
-    METRICS = [Metric(1, min, 'us', "min_latency")]
+    METRICS = [Metric(1, np.min, 'us', "min_latency")]
 
     def __init__(self):
 
@@ -118,7 +163,7 @@ class Osu_latency(OSU_Micro_Benchmarks):
 @rfm.simple_test
 class Osu_bibw(OSU_Micro_Benchmarks):
 
-    METRICS = [Metric(1, max, 'MB/s', "max_bandwidth")]
+    METRICS = [Metric(1, np.max, 'MB/s', "max_bandwidth")]
 
     def __init__(self):
 
@@ -127,3 +172,49 @@ class Osu_bibw(OSU_Micro_Benchmarks):
         self.num_tasks = 2
         self.num_tasks_per_node = 1
         self.tags = {'bibw'}
+
+
+@rfm.simple_test
+class Osu_collective(OSU_Micro_Benchmarks):
+    """ Any blocking or non-blocking collective benchmark, on `num_nodes` nodes using as many
+        processes per node as there are CPUs.
+
+        The performance variables are found from the columns of the results table, e.g.
+        `min_avg_latency`, or `min_overall` and `max_overlap` for non-blocking collectives.
+    """
+
+    METRICS = []
+
+    benchmark = parameter(OSU_COLLECTIVES + ['i' + c for c in OSU_COLLECTIVES])
+    num_nodes = variable(int, value=2)
+
+    def __init__(self):
+        super().__init__()
+        self.executable = f'osu_{self.benchmark}'
+        self.tags = {'collectives'}
+
+    @run_after('setup')
+    def setup_num_tasks(self):
+        self.num_tasks_per_node = self.current_partition.processor.num_cpus
+        self.num_tasks = self.num_nodes * self.num_tasks_per_node
+
+    @run_before('performance')
+    def add_table_metrics(self):
+        """ Add a performance variable for each column of the results table in `OSU_REDUCTIONS`,
+            and for each message size if `self.message_size_metrics` is set.
+        """
+
+        table = read_omb_table(os.path.join(self.stagedir, self.job.stdout))
+        sizes = table.column('size') if table.columns[0].name == 'size' else []
+        for column_number, column in enumerate(table.columns):
+            if column.unit not in OSU_REDUCTIONS:
+                continue
+            function, prefix = OSU_REDUCTIONS[column.unit]
+            label = f'{prefix}_{column.name}'
+            self.perf_patterns[label] = reduce(self.stdout, column_number, function)
+            self.reference[label] = (0, None, None, column.unit)
+            if self.message_size_metrics:
+                for size in sizes:
+                    label = f'{column.name}_{size}B'
+                    self.perf_patterns[label] = value_at(self.stdout, column_number, size)
+                    self.reference[label] = (0, None, None, column.unit)
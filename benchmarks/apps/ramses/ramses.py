@@ -1,6 +1,7 @@
 import os.path as path
 import reframe as rfm
 import reframe.utility.sanity as sn
+from benchmarks.modules.reframe_extras import AdaptiveScalingTest
 from benchmarks.modules.utils import SpackTest
 
 
@@ -62,7 +63,7 @@ class RamsesMPI(SpackTest):
 
 
 @rfm.simple_test
-class RamsesMPI_strong(RamsesMPI):
+class RamsesMPI_strong(RamsesMPI, AdaptiveScalingTest):
 
     tags = {"strong"}
     num_nodes = parameter(2**i for i in range(0,5))
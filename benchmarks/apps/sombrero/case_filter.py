@@ -1,9 +1,10 @@
 from enum import IntEnum
 import itertools as it
+from benchmarks.modules.reframe_extras import local_size_between
 
 
 class Idx(IntEnum):
-    # See _flatten_nested_case() and generate()
+    # See generate()
     strong_or_weak = 0
     size = strong_or_weak + 1
     partition = size + 1
@@ -12,21 +13,6 @@ class Idx(IntEnum):
     idx_max = nprocesses_per_node + 1
 
 
-def _flatten_nested_case(nested_case):
-    # See Idx and generate()
-    res = [None] * Idx.idx_max
-
-    (
-        res[Idx.strong_or_weak],  #
-        res[Idx.size],  #
-        (
-            res[Idx.partition],  #
-            res[Idx.nprocesses],  #
-            res[Idx.nprocesses_per_node])) = nested_case
-
-    return tuple(res)
-
-
 def _check_nprocesses(np):
     '''
     Make sure the number of processes is 2^n or 2^n x 3
@@ -46,40 +32,30 @@ global_sizes = {
 }
 
 
-def _case_filter(case):
-    strong_or_weak = case[Idx.strong_or_weak]
-    size = case[Idx.size]
-    nprocesses = case[Idx.nprocesses]
+def _nprocesses_constraint(case, info):
+    return _check_nprocesses(case.num_tasks)
 
-    if not _check_nprocesses(nprocesses):
-        return False
-    if strong_or_weak == "weak" and size != "medium":
-        return False
 
+def generate(scaling_sweep):
     min_size = 4**4  # Sombrero would not accept these anyway
     max_size = 24**3 * 32  # the size of the smallest global lattice
 
-    local_size = global_sizes[size] / nprocesses
-
-    if not min_size <= local_size <= max_size:
-        return False
-
-    return True
-
-
-def generate(scaling_config):
-    strong_or_weak = ['strong', 'weak']
-
-    # See Idx and _flatten_nested_case()
-    nested_cases = it.product(strong_or_weak,
-                              global_sizes.keys(),
-                              scaling_config())
-
-    cases = map(_flatten_nested_case, nested_cases)
-
-    filtered = filter(_case_filter, cases)
-
-    filtered_list = list(filtered)
-    for case in filtered_list:
+    # See Idx
+    cases = []
+    for strong_or_weak, size in it.product(['strong', 'weak'], global_sizes.keys()):
+        if strong_or_weak == "weak" and size != "medium":
+            continue
+        # Full nodes with one process per physical core.
+        for case in scaling_sweep(
+                tasks_per_node=lambda info: [info.pcores_per_node],
+                threads_per_task=[1],
+                constraints=[
+                    _nprocesses_constraint,
+                    local_size_between(global_sizes[size], min_size, max_size)
+                ]):
+            cases.append((strong_or_weak, size, case.partition,
+                          case.num_tasks, case.num_tasks_per_node))
+
+    for case in cases:
         assert len(case) == Idx.idx_max
-    return filtered_list
+    return cases
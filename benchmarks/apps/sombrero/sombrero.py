@@ -8,16 +8,18 @@ import reframe.utility.sanity as sn
 import reframe.utility.udeps as udeps
 
 from benchmarks.apps.sombrero import case_filter
-from benchmarks.modules.reframe_extras import scaling_config
-from benchmarks.modules.utils import SpackTest
+from benchmarks.modules.reframe_extras import scaling_sweep
+from benchmarks.modules.utils import SpackBuild, SpackRunTest, output_scanner
 
 
 @rfm.simple_test
-class SombreroBenchmarkBase(SpackTest):
+class SombreroBenchmarkBase(SpackRunTest):
     valid_systems = ['-gpu']
     valid_prog_environs = ['default']
     time_limit = '3m'
-    spack_spec = 'sombrero@2021-08-16'
+    # All the cases share the same build of Sombrero.
+    spack_build = fixture(SpackBuild, scope='environment',
+                          variables={'spack_spec': 'sombrero@2021-08-16'})
     theory_id = parameter(range(1, 7))
 
     @run_after('init')
@@ -48,24 +50,24 @@ class SombreroBenchmarkBase(SpackTest):
         i = self.theory_id
         self.perf_patterns = {
             f'flops{i}':
-            sn.extractsingle(
+            output_scanner.extractsingle(
                 r'\[RESULT\]\[0\] Case ' + str(i) + r' (\S+) Gflops/seconds',
                 self.stdout, 1, float),
             f'time{i}':
-            sn.extractsingle(
+            output_scanner.extractsingle(
                 r'\[RESULT\]\[0\] Case ' + str(i) +
                 r' \S+ Gflops in (\S+) seconds', self.stdout, 1, float),
             f'communicated{i}':
-            sn.extractsingle(
+            output_scanner.extractsingle(
                 r'\[MAIN\]\[0\] Case ' + str(i) +
                 r': .* (\S+) bytes communicated', self.stdout, 1, float),
             f'avg_arithmetic_intensity{i}':
-            sn.extractsingle(
+            output_scanner.extractsingle(
                 r'\[MAIN\]\[0\] Case ' + str(i) +
                 r': (\S+) average arithmetic intensity', self.stdout, 1,
                 float),
             f'computation/communication{i}':
-            sn.extractsingle(
+            output_scanner.extractsingle(
                 r'\[MAIN\]\[0\] Case ' + str(i) +
                 r': (\S+) flop per byte communicated', self.stdout, 1, float),
         }
@@ -84,7 +86,7 @@ class SombreroBenchmarkMini(SombreroBenchmarkBase):
 
 @rfm.simple_test
 class SombreroBenchmarkScaling(SombreroBenchmarkBase):
-    params = parameter(case_filter.generate(scaling_config))
+    params = parameter(case_filter.generate(scaling_sweep))
     valid_systems = ['-gpu']
     tags = {"scaling"}
 
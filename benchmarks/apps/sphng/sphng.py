@@ -37,7 +37,7 @@ class SphngBase(SpackTest):
                 self.env_vars['I_MPI_PIN_RESPECT_CPUSET'] = '0'
         elif(self.current_partition.scheduler.registered_name == 'torque'):
             self.env_vars['I_MPI_JOB_RESPECT_PROCESS_PLACEMENT'] = 'off'
-            self.executable = '-perhost $NUM_TASKS_PER_NODE ' + self.executable
+            self.job.launcher.options += ['-perhost', '$NUM_TASKS_PER_NODE']
 
     @run_before('compile')
     def setup_build_system(self):
@@ -0,0 +1,141 @@
+from collections import namedtuple
+import math
+
+# Example format, one line per rank, with the CPUs of each NUMA node and their socket after the `@`:
+"""
+affinity rank=0 host=node001 cpus=0-3 mems=0-1 node0=0-31@0 node1=32-63@1
+affinity rank=1 host=node001 cpus=32-35 mems=0-1 node0=0-31@0 node1=32-63@1
+"""
+
+# Shell line setting `rank` to the MPI rank of the process, from the environment set by the launcher
+# (Open MPI, PMIx, MPI implementations using PMI, or Slurm), for scripts run by the launcher which
+# don't use MPI themselves.
+MPI_RANK_SH = r"""rank=${OMPI_COMM_WORLD_RANK:-${PMIX_RANK:-${PMI_RANK:-${SLURM_PROCID:-0}}}}
+"""
+
+# Probe run by each rank through the launcher of the test, printing a line in the format above.
+AFFINITY_PROBE = r"""#!/bin/sh
+""" + MPI_RANK_SH + r"""cpus=$(sed -n 's/^Cpus_allowed_list:[[:space:]]*//p' /proc/self/status)
+mems=$(sed -n 's/^Mems_allowed_list:[[:space:]]*//p' /proc/self/status)
+numa=''
+for node in /sys/devices/system/node/node[0-9]*; do
+    cpulist=$(cat "$node/cpulist" 2>/dev/null)
+    [ -n "$cpulist" ] || continue
+    first=${cpulist%%[-,]*}
+    socket=$(cat "/sys/devices/system/cpu/cpu$first/topology/physical_package_id" 2>/dev/null)
+    numa="$numa ${node##*/}=$cpulist@${socket:-0}"
+done
+echo "affinity rank=$rank host=$(cat /proc/sys/kernel/hostname) cpus=$cpus mems=$mems$numa"
+"""
+
+# Environment variables controlling the pinning of processes and threads, recorded in the report
+PINNING_ENV_PREFIXES = ('OMP_', 'I_MPI_PIN', 'KMP_AFFINITY', 'SLURM_CPU_BIND', 'OMPI_MCA_hwloc', 'OMPI_MCA_rmaps')
+
+
+class RankAffinity(namedtuple('RankAffinity', ['rank', 'host', 'cpus', 'mems', 'numa_nodes'])):
+    """ Affinity of a rank: its rank and host, the frozensets of CPUs and NUMA nodes it may run on and
+        allocate memory from, and a dict of NUMA node -> (frozenset of CPUs, socket) of its host.
+    """
+    __slots__ = ()
+
+
+def parse_cpu_list(s):
+    """ Convert a Linux CPU list, e.g. '0-3,8', to a frozenset of ints """
+    cpus = set()
+    for item in s.split(','):
+        if not item:
+            continue
+        lo, _, hi = item.partition('-')
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return frozenset(cpus)
+
+
+def format_cpu_list(cpus):
+    """ Convert a collection of ints to a Linux CPU list, the inverse of `parse_cpu_list()` """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(lo) if lo == hi else f'{lo}-{hi}' for lo, hi in ranges)
+
+
+def read_affinity_out(path):
+    """ Read the output of `AFFINITY_PROBE` run by each rank into a list of RankAffinity, sorted by rank """
+    ranks = []
+    with open(path) as f:
+        for line in f:
+            if not line.startswith('affinity '):
+                continue
+            fields = dict(item.split('=', 1) for item in line.split()[1:] if '=' in item)
+            numa_nodes = {}
+            for key, value in fields.items():
+                if key.startswith('node') and key[4:].isdigit():
+                    cpulist, _, socket = value.partition('@')
+                    numa_nodes[int(key[4:])] = (parse_cpu_list(cpulist), int(socket or 0))
+            ranks.append(RankAffinity(int(fields['rank']), fields['host'], parse_cpu_list(fields['cpus']),
+                                      parse_cpu_list(fields.get('mems', '')), numa_nodes))
+    return sorted(ranks, key=lambda r: r.rank)
+
+
+def affinity_report(ranks, num_tasks, num_cpus_per_task=1):
+    """ Check the affinity of `ranks`, a list of RankAffinity, for a run of `num_tasks` ranks using
+        `num_cpus_per_task` CPUs each.
+
+        Returns a dict with:
+            'ranks': list of dicts, one per rank, with its rank, host, CPU list, memory NUMA nodes and
+                the NUMA nodes and sockets of its CPUs
+            'warnings': list of str, one per problem found:
+                - ranks which did not report their affinity
+                - oversubscribed hosts, with more threads than CPUs available to their ranks
+                - ranks sharing CPUs with other ranks of the same host
+                - unbound ranks, which may run on all the CPUs of a host shared with other ranks
+                - ranks whose CPUs span more sockets than their threads need
+    """
+    warnings = []
+    missing = sorted(set(range(num_tasks)) - {r.rank for r in ranks})
+    if missing:
+        warnings.append(f'{len(missing)} of {num_tasks} ranks did not report their affinity, e.g. rank {missing[0]}')
+
+    by_host = {}
+    for r in ranks:
+        by_host.setdefault(r.host, []).append(r)
+
+    entries = []
+    for host, host_ranks in by_host.items():
+        host_cpus = frozenset().union(*(cpus for cpus, _ in host_ranks[0].numa_nodes.values()))
+        used = frozenset().union(*(r.cpus for r in host_ranks))
+        threads = len(host_ranks) * num_cpus_per_task
+        if threads > len(used):
+            warnings.append(f'{host} is oversubscribed: {threads} threads of {len(host_ranks)} ranks on {len(used)} CPUs')
+        shared = [r.rank for r in host_ranks if any(r.cpus & o.cpus for o in host_ranks if o is not r)]
+        unbound = [r.rank for r in host_ranks if host_cpus and r.cpus >= host_cpus]
+        if len(host_ranks) > 1 and unbound:
+            warnings.append(f'{len(unbound)} ranks on {host} are not bound, e.g. rank {unbound[0]}')
+        elif shared:
+            warnings.append(f'{len(shared)} ranks on {host} share CPUs with other ranks, e.g. rank {shared[0]}')
+
+        # smallest number of CPUs of a socket, to find how many sockets the threads of a rank need
+        socket_cpus = {}
+        for cpus, socket in host_ranks[0].numa_nodes.values():
+            socket_cpus[socket] = socket_cpus.get(socket, frozenset()) | cpus
+        needed = math.ceil(num_cpus_per_task / min(map(len, socket_cpus.values()))) if socket_cpus else 1
+        for r in host_ranks:
+            numa = sorted(n for n, (cpus, _) in r.numa_nodes.items() if r.cpus & cpus)
+            sockets = sorted({socket for n, (cpus, socket) in r.numa_nodes.items() if r.cpus & cpus})
+            if len(sockets) > needed and r.rank not in unbound:
+                warnings.append(f'rank {r.rank} on {host} spans {len(sockets)} sockets: CPUs {format_cpu_list(r.cpus)}')
+            entries.append({'rank': r.rank, 'host': host, 'cpus': format_cpu_list(r.cpus),
+                            'mems': format_cpu_list(r.mems), 'numa_nodes': numa, 'sockets': sockets})
+
+    entries.sort(key=lambda e: e['rank'])
+    return {'ranks': entries, 'warnings': warnings}
+
+
+if __name__ == '__main__':
+    import sys
+    import json
+    ranks = read_affinity_out(sys.argv[1])
+    num_cpus_per_task = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    print(json.dumps(affinity_report(ranks, len(ranks), num_cpus_per_task), indent=2))
@@ -1,3 +1,10 @@
+from collections import namedtuple
+import functools
+import os
+import re
+
+import numpy as np
+
 # examples of output - note that a single file *may* contain multiple
 # benchmark results
 #
@@ -12,52 +19,153 @@
 # #---------------------------------------------------
 #        #bytes #repetitions      t[usec]   Mbytes/sec
 #             0         1000         2.25         0.00
+#
+# collectives have min/max/avg times, and no message sizes for Barrier:
+#
+# # Benchmarking Allreduce
+# # #processes = 4
+# # ( 2 additional processes waiting in MPI_Barrier)
+# #----------------------------------------------------------------
+#        #bytes #repetitions  t_min[usec]  t_max[usec]  t_avg[usec]
+#             0         1000         0.03         0.04         0.03
+#
+# IMB-EXT and IMB-RMA may run each benchmark in several modes:
+#
+# # Benchmarking Unidir_Put
+# # #processes = 2
+# #---------------------------------------------------
+# #
+# #    MODE: NON-AGGREGATE
+# #
+#        #bytes #repetitions      t[usec]   Mbytes/sec
+#             0         1000         0.04         0.00
 
-def read_imb_out(path):
-    """ Read stdout from an IMB-MPI1 run.
+# Column titles of the results tables with a known name, unit and type.  Other titles are float
+# columns named after the title, with the unit in brackets if any, e.g. `t_avg[usec]` is the
+# `t_avg` column in `usec`.
+IMB_COLUMNS = {
+    # title: (name, unit, type)
+    '#bytes': ('bytes', 'B', int),
+    '#repetitions': ('repetitions', None, int),
+    'Mbytes/sec': ('bandwidth', 'Mbytes/sec', float),
+    'Msg/sec': ('message_rate', 'Msg/sec', float),
+    'defects': ('defects', None, float),
+}
 
-        Returns a dict with:
-            key:= int, total number of processes involved
-            value:= pandas dataframe, i.e. one per results table. Columns as per table.
+ImbColumn = namedtuple('ImbColumn', ['title', 'name', 'unit', 'type'])
+
+
+def imb_column(title):
+    """ Return the ImbColumn described by the title of a column in an IMB results table. """
+    if title in IMB_COLUMNS:
+        return ImbColumn(title, *IMB_COLUMNS[title])
+    match = re.match(r'^(.*?)\[(.*)\]$', title)
+    name, unit = match.groups() if match else (title, None)
+    return ImbColumn(title, re.sub(r'\W+', '_', name).strip('_').lower(), unit, float)
 
-        If multiple results tables are present it is assumed that they are all the same benchmark,
-        and only differ in the number of processes.
+
+class ImbTable(namedtuple('ImbTable', ['benchmark', 'n_procs', 'mode', 'columns', 'data'])):
+    """ A results table of an IMB benchmark: the benchmark name as in the output (e.g. `PingPong`),
+        the total number of processes involved, the mode of IMB-EXT/IMB-RMA benchmarks (or None),
+        the ImbColumn for each column and a tuple of read-only NumPy arrays, one per column.
     """
 
-    dframes = {}
+    def column(self, name):
+        """ Return the array of the column called `name`. """
+        for column, values in zip(self.columns, self.data):
+            if column.name == name:
+                return values
+        raise KeyError(f'No column {name} in the results of {self.benchmark}')
+
 
-    COLTYPES = { # all benchmark names here should be lowercase
-        'uniband': (int, int, float, int), # #bytes #repetitions Mbytes/sec Msg/sec
-        'biband': (int, int, float, int),
-        'pingpong':(int, int, float, float), # #bytes #repetitions t[usec] Mbytes/sec
-        'alltoall':(int, int, float, float, float) # #bytes #repetitions t_min[usec] t_max[usec] t_avg[usec]
-    }
+def iter_imb_out(path):
+    """ Read stdout from an IMB-MPI1, IMB-EXT or IMB-RMA run, yielding an ImbTable for every
+        results table as soon as it has been read.
+    """
 
+    table = None # (benchmark, n_procs, mode, header, rows) of the table being read
     with open(path) as f:
         for line in f:
+            line = line.strip()
             if line.startswith('# Benchmarking '):
-                benchmark = line.split()[-1].lower()
-                if benchmark not in COLTYPES:
-                    raise ValueError(f'Do not know how to read {benchmark} benchmark in {path}')
-                converters = COLTYPES[benchmark]
-                line = next(f)
-                expect = '# #processes = '
-                if not line.startswith(expect):
-                    raise ValueError(f'expected {expect}, got {nprocs_line}')
-                n_procs = int(line.split('=')[-1].strip())
-                while line.startswith('#'):
-                    line = next(f) # may or may not include line "# .. additional processes waiting in MPI_Barrier", plus other # lines
-                rows = []
-                while True:
-                    line = next(f).strip()
-                    if line == '':
-                        break
-                    rows.append([f(v) for (f, v) in zip(converters, line.split())])
-                dframes[n_procs] = rows
-    return dframes
+                if table is not None and table[4]:
+                    yield imb_table(path, *table)
+                table = [line.split()[-1], None, None, None, []]
+            elif table is None:
+                continue
+            elif line.startswith('# #processes = '):
+                table[1] = int(line.split('=')[-1].split()[0])
+            elif re.match(r'^#\s*MODE:', line):
+                table[2] = line.split(':', 1)[1].strip()
+            elif line.startswith('#') and re.match(r'^#\w', line.split()[0]):
+                # Table header, e.g. `#bytes #repetitions t[usec] Mbytes/sec`.  A new header in
+                # the same benchmark starts a new table (e.g. the next mode).
+                if table[4]:
+                    yield imb_table(path, *table)
+                    table[4] = []
+                table[3] = line.split()
+            elif table[3] is not None and re.match(r'^[-+]?\d', line):
+                table[4].append(line.split())
+            elif table[4]:
+                # End of the results, the benchmark may go on with a table in another mode
+                yield imb_table(path, *table)
+                table[3:] = [None, []]
+    if table is not None and table[4]:
+        yield imb_table(path, *table)
+
+
+def imb_table(path, benchmark, n_procs, mode, header, rows):
+    """ Return the ImbTable with the given `rows` of strings from `path`. """
+    if n_procs is None:
+        raise ValueError(f'expected "# #processes = " before the results of {benchmark} in {path}')
+    columns = tuple(imb_column(title) for title in header)
+    if any(len(row) != len(columns) for row in rows):
+        raise ValueError(f'Results of {benchmark} in {path} do not match columns {header}')
+    table = np.array(rows, dtype=str).reshape(len(rows), len(columns)).T
+    data = tuple(values.astype(column.type) for (column, values) in zip(columns, table))
+    for values in data:
+        values.flags.writeable = False # shared through the cache
+    return ImbTable(benchmark, n_procs, mode, columns, data)
+
+
+def read_imb_tables(path):
+    """ Read stdout from an IMB run into a tuple of ImbTable, in the order of the output.
+
+        Parsed outputs are cached on the path, modification time and size of the file, so that
+        several metrics reading the same file only parse it once.
+    """
+    st = os.stat(path)
+    return _read_imb_tables(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _read_imb_tables(path, mtime_ns, size):
+    return tuple(iter_imb_out(path))
+
+
+def read_imb_out(path, benchmark=None):
+    """ Read stdout from an IMB-MPI1 run.
+
+        Returns a dict with:
+            key:= int, total number of processes involved
+            value:= tuple of read-only NumPy arrays, i.e. one per column of the results table.
+
+        Only the tables of `benchmark` (case-insensitive) are returned, or, if it is None, all
+        tables, assuming that they are all the same benchmark and only differ in the number of
+        processes.  For benchmarks run in several modes, the first mode is returned.
+    """
+
+    tables = {}
+    for table in read_imb_tables(path):
+        if benchmark is None or table.benchmark.lower() == benchmark.lower():
+            tables.setdefault(table.n_procs, table.data)
+    return tables
+
 
 if __name__ == '__main__':
     import sys
-    d = read_imb_out(sys.argv[1])
-    for n, df in d.items():
-        print(n)
+    for table in iter_imb_out(sys.argv[1]):
+        print(table.benchmark, table.n_procs, table.mode or '')
+        print([c.name for c in table.columns])
+        for r in zip(*table.data):
+            print(r)
@@ -0,0 +1,121 @@
+from collections import namedtuple
+import functools
+import os
+
+import numpy as np
+
+# Example format:
+"""
+# rank 0 node001
+# rank 1 node002
+src,dst,lat(us),bandwidth((Mbytes/sec)
+0,1,3.38,2696.482952
+1,0,2.70,2983.428731
+"""
+
+
+class NxnMatrix(namedtuple('NxnMatrix', ['hosts', 'latency', 'bandwidth'])):
+    """ Results of an nxnlatbw run: the host of each rank (or None if not in the output), and NxN
+        read-only NumPy arrays of the latency (us) and bandwidth (Mbytes/sec) from the row rank to
+        the column rank, NaN for pairs which were not measured (including the diagonal).
+    """
+
+    def pairs(self, values):
+        """ Return the values of the measured pairs in `values` (e.g. `self.latency`), as a flat array. """
+        return values[~np.isnan(values)]
+
+    def worst_pair(self, values, largest=True):
+        """ Return the (src, dst) ranks of the largest (or smallest) of `values`, e.g. the highest latency. """
+        flat = np.nanargmax(values) if largest else np.nanargmin(values)
+        return tuple(int(i) for i in np.unravel_index(flat, values.shape))
+
+    def label(self, rank):
+        """ Return `rank` and its host, if known, as a string """
+        return f'{rank} {self.hosts[rank]}' if self.hosts[rank] is not None else str(rank)
+
+
+def read_nxnlatbw_out(path):
+    """ Read stdout from an nxnlatbw run into an NxnMatrix.
+
+        Parsed outputs are cached on the path, modification time and size of the file.
+    """
+    st = os.stat(path)
+    return _read_nxnlatbw_out(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=16)
+def _read_nxnlatbw_out(path, mtime_ns, size):
+    hosts = {}
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith('# rank '):
+                _, _, rank, host = line.split(None, 3)
+                hosts[int(rank)] = host.strip()
+            elif line[:1].isdigit():
+                vals = line.strip().split(',')
+                if len(vals) == 4:
+                    rows.append(vals)
+    if not rows:
+        raise ValueError(f'No results found in {path}')
+
+    table = np.array(rows, dtype=float)
+    src, dst = table[:, 0].astype(int), table[:, 1].astype(int)
+    n = max(src.max(), dst.max(), max(hosts, default=0)) + 1
+    latency = np.full((n, n), np.nan)
+    bandwidth = np.full((n, n), np.nan)
+    latency[src, dst] = table[:, 2]
+    bandwidth[src, dst] = table[:, 3]
+    for values in (latency, bandwidth):
+        values.flags.writeable = False # shared through the cache
+    return NxnMatrix(tuple(hosts.get(rank) for rank in range(n)), latency, bandwidth)
+
+
+def plot_heatmap(matrix, path, title=''):
+    """ Save heatmaps of the latency and bandwidth matrices of an NxnMatrix to the image file `path`.
+
+        Ranks are labelled with their hosts, the worst pair of each matrix is outlined, and the
+        median over each rank's pairs is shown along each axis, so that a slow node shows up as
+        a line and a slow switch as a block of consecutive hosts.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
+
+    n = len(matrix.hosts)
+    labels = [matrix.label(rank) for rank in range(n)]
+    fig, axes = plt.subplots(1, 2, figsize=(2 * max(6, 0.25 * n + 3), max(5, 0.25 * n + 3)))
+    for ax, values, name, cmap, largest in [
+            (axes[0], matrix.latency, 'Latency (us)', 'Reds', True),
+            (axes[1], matrix.bandwidth, 'Bandwidth (Mbytes/sec)', 'Reds_r', False)]:
+        image = ax.imshow(values, cmap=cmap, interpolation='nearest')
+        fig.colorbar(image, ax=ax, shrink=0.8)
+        src, dst = matrix.worst_pair(values, largest)
+        ax.add_patch(Rectangle((dst - 0.5, src - 0.5), 1, 1, fill=False, edgecolor='blue', linewidth=2))
+        ax.set_title(f'{name}\nworst: {labels[src]} -> {labels[dst]} ({values[src, dst]:.2f})')
+        if n <= 64:
+            ax.set_xticks(range(n))
+            ax.set_yticks(range(n))
+            ax.set_xticklabels([f'{l} ({m:.1f})' for l, m in zip(labels, np.nanmedian(values, axis=0))], rotation=90, fontsize='small')
+            ax.set_yticklabels([f'{l} ({m:.1f})' for l, m in zip(labels, np.nanmedian(values, axis=1))], fontsize='small')
+        ax.set_xlabel('dst (median)')
+        ax.set_ylabel('src (median)')
+    if title:
+        fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+if __name__ == '__main__':
+    import sys
+    matrix = read_nxnlatbw_out(sys.argv[1])
+    for name, values, largest in [('latency', matrix.latency, True), ('bandwidth', matrix.bandwidth, False)]:
+        pairs = matrix.pairs(values)
+        src, dst = matrix.worst_pair(values, largest)
+        q = 99 if largest else 1
+        print(f'{name}: median {np.median(pairs):.2f}, p{q} {np.percentile(pairs, q):.2f}, '
+              f'worst {values[src, dst]:.2f} ({matrix.label(src)} -> {matrix.label(dst)})')
+    if len(sys.argv) > 2:
+        plot_heatmap(matrix, sys.argv[2], os.path.basename(sys.argv[1]))
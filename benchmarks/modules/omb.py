@@ -1,5 +1,10 @@
+from collections import namedtuple
+import functools
+import os
 import re
 
+import numpy as np
+
 # Example formats
 
 # alltoall - note blank line at start!:
@@ -39,49 +44,115 @@ import re
 ...
 """
 
-OSU_OUTPUT_COLS = {
-    '# OSU MPI All-to-All Personalized Exchange Latency Test': (int, float), # ('Size', 'Avg Latency(us)')
-    '# OSU MPI Bandwidth Test': (int, float), # ('Size', 'Bandwidth (MB/s)')
-    '# OSU MPI Bi-Directional Bandwidth Test': (int, float), # ('Size', 'Bandwidth (MB/s)')
-    '# OSU MPI Multiple Bandwidth / Message Rate Test': (int, float, float), # ('Size', 'MB/s', 'Messages/s')
-    '# OSU MPI Latency Test': (int, float), # ('Size', 'Latency (us)')
-    '# OSU MPI Allgather Latency Test': (int, float), # ('Size', 'Avg Latency(us)')
-    '# OSU MPI Allreduce Latency Test': (int, float), # ('Size', 'Avg Latency(us)')
+# non-blocking collectives, e.g. iallreduce:
+"""
+# OSU MPI Non-blocking Allreduce Latency Test v5.6.2
+# Overall = Coll. Init + Compute + MPI_Test + MPI_Wait
+
+# Size           Overall(us)       Compute(us)    Pure Comm.(us)        Overlap(%)
+4                      12.20              6.68              5.23             -5.73
+...
+"""
+
+# barrier - no message sizes:
+"""
+# OSU MPI Barrier Latency Test v5.6.2
+# Avg Latency(us)
+             3.20
+"""
+
+# The columns of a results table are given by the last commented line before the results, e.g.
+# `# Size      Bandwidth (MB/s)`, whose titles are separated by at least two spaces.  Titles not in
+# this registry are float columns named after the title, with the unit in brackets if any, e.g.
+# `Avg Latency(us)` is the `avg_latency` column in `us`.
+OSU_COLUMNS = {
+    # title: (name, unit, type)
+    'Size': ('size', 'B', int),
+    'Iterations': ('iterations', None, int),
+    'MB/s': ('bandwidth', 'MB/s', float),
+    'Messages/s': ('message_rate', 'messages/s', float),
 }
 
+OmbColumn = namedtuple('OmbColumn', ['title', 'name', 'unit', 'type'])
+
+
+def omb_column(title):
+    """ Return the OmbColumn described by the title of a column in an OMB results table. """
+    if title in OSU_COLUMNS:
+        return OmbColumn(title, *OSU_COLUMNS[title])
+    match = re.match(r'^(.*?)\s*\((.*)\)$', title)
+    name, unit = match.groups() if match else (title, None)
+    return OmbColumn(title, re.sub(r'\W+', '_', name).strip('_').lower(), unit, float)
+
+
+class OmbTable(namedtuple('OmbTable', ['benchmark', 'columns', 'data'])):
+    """ Results of an OMB benchmark: its name (e.g. `OSU MPI Latency Test`), the OmbColumn for each
+        column and a tuple of read-only NumPy arrays, one per column.
+    """
+
+    def column(self, name):
+        """ Return the array of the column called `name`. """
+        for column, values in zip(self.columns, self.data):
+            if column.name == name:
+                return values
+        raise KeyError(f'No column {name} in the results of {self.benchmark}')
+
+
+def read_omb_table(path):
+    """ Read stdout from an OMB run into an OmbTable.
+
+        Parsed outputs are cached on the path, modification time and size of the file, so that
+        several metrics reading the same file only parse it once.
+    """
+    st = os.stat(path)
+    return _read_omb_table(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
 
 def read_omb_out(path):
     """ Read stdout from a multi-column OMB output file.
 
-        Returns a pandas dataframe.
+        Returns a tuple of read-only NumPy arrays, one per column of the results table.
     """
-    # work out file type:
+    return read_omb_table(path).data
+
+
+@functools.lru_cache(maxsize=64)
+def _read_omb_table(path, mtime_ns, size):
+    benchmark = None
+    header = None
     rows = []
     with open(path) as f:
         for line in f:
-            if line.strip() == '' or re.match('^(#|\d)', line) is None:
-                # Skip empty lines or lines not starting with either `#` or a
-                # number.
-                continue
+            line = line.strip()
+            if line.startswith('# OSU '):
+                # Line with benchmark name
+                benchmark = line[2:].rsplit(' v', 1)[0]
             elif line.startswith('#'):
-                if line.startswith('# OSU MPI'):
-                    # Line with benchmark name
-                    test_type, test_ver = line.strip().split(' v')
-                    try:
-                        converters = OSU_OUTPUT_COLS[test_type]
-                    except KeyError:
-                        raise KeyError(f'Do not know how to parse output for "{test_type}"')
-                else:
-                    # Other commented out lines we don't need to parse, skip.
-                    continue
-            else:
+                # The last commented line before the results has the column titles
+                if not rows:
+                    header = line
+            elif re.match(r'^[-+]?\d', line):
                 # Line starting with a number
-                rows.append([f(v) for (f, v) in zip(converters, line.split())])
-    return rows
+                rows.append(line.split())
+    if benchmark is None:
+        raise ValueError(f'Could not find the name of an OSU benchmark in {path}')
+    if header is None:
+        raise ValueError(f'Could not find the column titles of {benchmark} in {path}')
+
+    columns = tuple(omb_column(title) for title in re.split(r'\s{2,}', header.lstrip('#').strip()))
+    if any(len(row) != len(columns) for row in rows):
+        raise ValueError(f'Results of {benchmark} in {path} do not match columns {[c.title for c in columns]}')
+    table = np.array(rows, dtype=str).reshape(len(rows), len(columns)).T
+    data = tuple(values.astype(column.type) for (column, values) in zip(columns, table))
+    for values in data:
+        values.flags.writeable = False # shared through the cache
+    return OmbTable(benchmark, columns, data)
 
 
 if __name__ == '__main__':
     import sys
-    rows = read_omb_out(sys.argv[1])
-    for r in rows:
+    table = read_omb_table(sys.argv[1])
+    print(table.benchmark)
+    print([c.name for c in table.columns])
+    for r in zip(*table.data):
         print(r)
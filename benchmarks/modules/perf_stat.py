@@ -0,0 +1,120 @@
+from collections import namedtuple
+import glob
+import os
+
+from benchmarks.modules.affinity import MPI_RANK_SH
+
+# Example format, from `perf stat -x,` (value, unit, event, run time, % of run time counted, metric,
+# metric unit), followed by the start and end times of the command added by `PERF_STAT_WRAPPER`:
+"""
+# started on Mon Oct 19 08:00:00 2026
+
+1843525349,,cycles:u,612043421,100.00,,
+4214389611,,instructions:u,612043421,100.00,2.29,insn per cycle
+<not supported>,,LLC-store-misses:u,0,100.00,,
+# time,1760860800.125,1760860800.737
+"""
+
+# Events counted by default: cycles and instructions for the IPC, and cache misses, with last level
+# cache misses as an estimate of the traffic to memory.  All are generic perf events available on
+# plain Linux, without vendor tools.
+PERF_STAT_EVENTS = ['cycles', 'instructions', 'cache-references', 'cache-misses', 'LLC-load-misses', 'LLC-store-misses']
+
+# Size in bytes of the memory transfer of a last level cache miss.
+CACHE_LINE_SIZE = 64
+
+# Wrapper running each rank under `perf stat`, writing its counters to `rfm_perf_stat.<rank>.csv`.
+# If perf can't count the events, e.g. because of `kernel.perf_event_paranoid`, the command runs
+# without it.
+PERF_STAT_WRAPPER = r"""#!/bin/sh
+""" + MPI_RANK_SH + r"""out=rfm_perf_stat.$rank.csv
+events="$1"
+shift
+if ! perf stat -x, -o /dev/null -e "$events" -- true 2>/dev/null; then
+    echo "# perf stat unavailable on $(cat /proc/sys/kernel/hostname)" > $out
+    exec "$@"
+fi
+start=$(date +%s.%N)
+perf stat -x, -o $out -e "$events" -- "$@"
+status=$?
+echo "# time,$start,$(date +%s.%N)" >> $out
+exit $status
+"""
+
+
+class PerfStat(namedtuple('PerfStat', ['counters', 'elapsed'])):
+    """ Counters of a `perf stat` run: a dict of event name, without modifiers (e.g. `cycles` for
+        `cycles:u`), to its value (float), or None if not supported or counted, and the elapsed time
+        (float seconds) of the command, or None if unknown.
+    """
+    __slots__ = ()
+
+
+def read_perf_stat(path):
+    """ Read the output of `perf stat -x,` written by `PERF_STAT_WRAPPER` into a PerfStat """
+    counters = {}
+    elapsed = None
+    with open(path) as f:
+        for line in f:
+            fields = line.strip().split(',')
+            if fields[0] == '# time' and len(fields) == 3:
+                elapsed = float(fields[2]) - float(fields[1])
+            elif line.startswith('#') or len(fields) < 3:
+                continue
+            else:
+                event = fields[2].split(':')[0]
+                try:
+                    counters[event] = float(fields[0])
+                except ValueError: # e.g. <not supported>, <not counted>
+                    counters[event] = None
+    return PerfStat(counters, elapsed)
+
+
+def perf_stat_metrics(paths):
+    """ Derive metrics from the PerfStat of each rank in `paths`.
+
+        Counters are summed over ranks.  Returns a dict of name -> (value, unit) with those of the
+        following which could be computed:
+            - `ipc`: instructions per cycle
+            - `cache_misses_per_kinst`: cache misses per thousand instructions
+            - `llc_misses_per_kinst`: last level cache load and store misses per thousand instructions
+            - `llc_bandwidth`: traffic to memory estimated from the last level cache misses, in
+              GB/s over the longest elapsed time of a rank
+    """
+    stats = [read_perf_stat(path) for path in paths]
+    totals = {}
+    for stat in stats:
+        for event, value in stat.counters.items():
+            if value is None or totals.get(event, 0) is None:
+                totals[event] = None
+            else:
+                totals[event] = totals.get(event, 0) + value
+    elapsed = max((stat.elapsed for stat in stats if stat.elapsed), default=None)
+
+    def total(*events):
+        values = [totals.get(event) for event in events]
+        return None if None in values else sum(values)
+
+    metrics = {}
+    instructions, cycles = total('instructions'), total('cycles')
+    if instructions and cycles:
+        metrics['ipc'] = (instructions / cycles, 'insn/cycle')
+    if instructions and total('cache-misses') is not None:
+        metrics['cache_misses_per_kinst'] = (1000 * total('cache-misses') / instructions, 'misses/kinst')
+    llc_misses = total('LLC-load-misses', 'LLC-store-misses')
+    if instructions and llc_misses is not None:
+        metrics['llc_misses_per_kinst'] = (1000 * llc_misses / instructions, 'misses/kinst')
+    if elapsed and llc_misses is not None:
+        metrics['llc_bandwidth'] = (llc_misses * CACHE_LINE_SIZE / elapsed / 1e9, 'GB/s')
+    return metrics
+
+
+def perf_stat_files(directory):
+    """ Return the sorted paths of the `perf stat` outputs of all ranks in `directory` """
+    return sorted(glob.glob(os.path.join(directory, 'rfm_perf_stat.*.csv')))
+
+
+if __name__ == '__main__':
+    import sys
+    for name, (value, unit) in perf_stat_metrics(sys.argv[1:]).items():
+        print(f'{name}: {value:.4g} {unit}')
@@ -0,0 +1,159 @@
+import collections
+import html
+import re
+import zlib
+
+from benchmarks.modules.affinity import MPI_RANK_SH
+
+# Example format of `perf script`, one block per sample with the innermost frame first:
+"""
+IMB-MPI1 12345 1234.567890:     250000 cycles:u:
+            55d1c2e3f4a5 compute+0x15 (/path/to/bin)
+            55d1c2e3f400 main+0x20 (/path/to/bin)
+            7f0d3c829d8f __libc_start_main+0xf3 (/usr/lib64/libc-2.28.so)
+
+"""
+
+# Wrapper running the selected ranks under `perf record`, writing their samples to
+# `rfm_perf.<rank>.data`.  Its arguments are the ranks to profile ('all' or a comma-separated list),
+# the sampling frequency, the call graph mode and the command.  If perf can't sample, e.g. because
+# of `kernel.perf_event_paranoid`, the command runs without it.
+PERF_RECORD_WRAPPER = r"""#!/bin/sh
+""" + MPI_RANK_SH + r"""ranks="$1"
+frequency="$2"
+call_graph="$3"
+shift 3
+case ",$ranks," in
+    ,all,|*,$rank,*) ;;
+    *) exec "$@" ;;
+esac
+if ! perf record -q -F "$frequency" -o /dev/null -- true 2>/dev/null; then
+    exec "$@"
+fi
+exec perf record -q -F "$frequency" --call-graph="$call_graph" -o rfm_perf.$rank.data -- "$@"
+"""
+
+# Commands converting the samples of each rank to text with `perf script`, on the node running
+# the job script, which must see the same binaries as the compute nodes.
+PERF_SCRIPT_CMDS = [
+    'for data in rfm_perf.*.data; do',
+    '    if [ -f "$data" ]; then perf script -i "$data" > "${data%.data}.script" 2>/dev/null; fi',
+    'done',
+]
+
+
+def collapse_perf_script(path):
+    """ Collapse the stacks in the output of `perf script` at `path`, as `stackcollapse-perf.pl` does.
+
+        Returns a collections.Counter of stacks, each a tuple of function names from the outermost
+        frame, i.e. the command name, to the innermost, to their number of samples.
+    """
+    stacks = collections.Counter()
+    comm, frames = None, []
+    with open(path, errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                if comm is not None:
+                    stacks[(comm,) + tuple(reversed(frames))] += 1
+                comm, frames = None, []
+            elif not line[0].isspace():
+                # header, e.g. `IMB-MPI1 12345 [000] 1234.567890: 250000 cycles:u:`
+                comm, frames = re.split(r'\s+\d+(/\d+)?\s', line, maxsplit=1)[0].strip(), []
+            elif comm is not None:
+                # frame, e.g. `55d1c2e3f4a5 compute+0x15 (/path/to/bin)`
+                parts = line.split(None, 1)
+                symbol = parts[1] if len(parts) > 1 else '[unknown]'
+                symbol = re.sub(r'\s+\([^()]*\)$', '', symbol.strip())
+                frames.append(re.sub(r'\+0x[0-9a-f]+$', '', symbol) or '[unknown]')
+    if comm is not None:
+        stacks[(comm,) + tuple(reversed(frames))] += 1
+    return stacks
+
+
+def write_folded(stacks, path):
+    """ Write collapsed `stacks` in the folded format of FlameGraph, one `f1;f2;f3 count` line per stack """
+    with open(path, 'w') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f'{";".join(stack)} {count}\n')
+
+
+def hot_spots(stacks, top=30):
+    """ Return the `top` functions with most samples in collapsed `stacks`, as a list of
+        (function, self %, total %) tuples, where self counts samples in the function itself and
+        total samples in the function or its callees.
+    """
+    total_samples = sum(stacks.values()) or 1
+    self_counts, total_counts = collections.Counter(), collections.Counter()
+    for stack, count in stacks.items():
+        self_counts[stack[-1]] += count
+        for function in set(stack[1:]) or set(stack):
+            total_counts[function] += count
+    functions = sorted(total_counts, key=lambda fn: (-self_counts[fn], -total_counts[fn], fn))[:top]
+    return [(fn, 100 * self_counts[fn] / total_samples, 100 * total_counts[fn] / total_samples) for fn in functions]
+
+
+def write_hot_spots(stacks, path, title=''):
+    """ Write the `hot_spots()` of collapsed `stacks` as a text table """
+    with open(path, 'w') as f:
+        if title:
+            f.write(f'# {title}\n')
+        f.write(f'# {sum(stacks.values())} samples\n')
+        f.write(f'{"self%":>7} {"total%":>7}  function\n')
+        for function, self_pct, total_pct in hot_spots(stacks):
+            f.write(f'{self_pct:7.2f} {total_pct:7.2f}  {function}\n')
+
+
+def write_flame_graph(stacks, path, title='', width=1200, frame_height=16):
+    """ Write collapsed `stacks` as an SVG flame graph, with the outermost frames at the bottom.
+
+        Frames narrower than a pixel are left out.  Hovering over a frame shows its function, samples
+        and percentage of all samples.
+    """
+    # tree of nested dicts: function -> [samples, children]
+    root = [0, {}]
+    for stack, count in stacks.items():
+        node = root
+        node[0] += count
+        for function in stack:
+            node = node[1].setdefault(function, [0, {}])
+            node[0] += count
+    total = root[0] or 1
+    scale = (width - 20) / total
+
+    rects = []
+    def layout(children, x, depth):
+        for function, (count, grandchildren) in sorted(children.items()):
+            w = count * scale
+            if w >= 1:
+                rects.append((function, count, x, depth, w))
+                layout(grandchildren, x, depth + 1)
+            x += w
+    layout(root[1], 10, 0)
+
+    max_depth = max((depth for _, _, _, depth, _ in rects), default=0)
+    height = (max_depth + 1) * frame_height + 60
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+           f'<rect width="100%" height="100%" fill="#f8f8f8"/>',
+           f'<text x="{width / 2}" y="20" text-anchor="middle" font-size="15">{html.escape(title)}</text>']
+    for function, count, x, depth, w in rects:
+        y = height - 30 - (depth + 1) * frame_height
+        # warm colours, stable for each function
+        h = zlib.crc32(function.encode())
+        fill = f'rgb({205 + h % 50},{(h >> 8) % 180},{(h >> 16) % 55})'
+        name = html.escape(function)
+        label = name if len(function) * 7 < w - 4 else (html.escape(function[:int((w - 4) / 7) - 2]) + '..' if w > 28 else '')
+        out.append(f'<g><title>{name} ({count} samples, {100 * count / total:.2f}%)</title>'
+                   f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{frame_height - 1}" fill="{fill}" rx="2"/>'
+                   f'<text x="{x + 3:.1f}" y="{y + frame_height - 4}">{label}</text></g>')
+    out.append('</svg>')
+    with open(path, 'w') as f:
+        f.write('\n'.join(out) + '\n')
+
+
+if __name__ == '__main__':
+    import sys
+    stacks = collapse_perf_script(sys.argv[1])
+    for function, self_pct, total_pct in hot_spots(stacks):
+        print(f'{self_pct:7.2f} {total_pct:7.2f}  {function}')
+    if len(sys.argv) > 2:
+        write_flame_graph(stacks, sys.argv[2], sys.argv[1])
@@ -6,10 +6,13 @@ import reframe as rfm
 from reframe.core.buildsystems import BuildSystem
 from reframe.core.logging import getlogger
 from reframe.core.launchers import JobLauncher
-from reframe.core.runtime import runtime
+from reframe.core.runtime import runtime, loadenv
+import reframe.utility.osext as osext
 import reframe.utility.sanity as sn
+import reframe.utility.typecheck as typ
 
 import os, shutil, subprocess, shlex, subprocess
+import collections, datetime, errno, fcntl, fnmatch, functools, hashlib, json, re, time
 from subprocess import PIPE
 from pprint import pprint
 
@@ -25,11 +28,12 @@ def scaling_config(min_nodes=1, max_node_factor=1.0, core_factor=1.0):
                     self.num_tasks_per_node = num_tasks_per_node
                     self.valid_systems = [part]
         
-        Tests will be generated for 1, 2, 4, 8, ..., nodes up to the maximum number of nodes in the appropriate Slurm partition.
-        This maximum number is included whether or not it is a power of 2. Any `--partition` or `--exclude` directives in the ReFrame
-        partition's `access` property are taken into account.
+        Tests will be generated for 1, 2, 4, 8, ..., nodes up to the maximum number of nodes in the appropriate scheduler partition.
+        This maximum number is included whether or not it is a power of 2. Any `--partition` or `--exclude` directives (Slurm)
+        or `-q` directives (PBS, SGE) in the ReFrame partition's `access` property are taken into account.
 
-        For ReFrame partitions which do not use slurm, no test is generated.
+        Node counts and topology come from the scheduler of each ReFrame partition, or from the configuration only, see
+        `scheduler_info()`. Partitions whose scheduler can't be queried are skipped with a warning.
         
         Args:
             `min_nodes`: number of nodes to start at (default: 1)
@@ -44,22 +48,124 @@ def scaling_config(min_nodes=1, max_node_factor=1.0, core_factor=1.0):
         **NB:** It is important that the test using this sets `self.valid_systems` as shown above, else tests may be defined for incorrect partitions.
     """
 
-    curr_sys = runtime().system
-    for part in curr_sys.partitions:
-        if part.scheduler.registered_name not in ['slurm', 'squeue']:
-            continue # ignore non Slurm schedulers
+    for case in scaling_sweep(tasks_per_node=lambda info: [int(info.pcores_per_node * core_factor)],
+                              threads_per_task=[1], min_nodes=min_nodes, max_node_factor=max_node_factor):
+        yield (case.partition, case.num_tasks, case.num_tasks_per_node)
 
-        sched_partition = Scheduler_Info(part)
-        n_tasks_per_node = int(sched_partition.pcores_per_node * core_factor)
-        
-        n = 1
-        while n < int(sched_partition.num_nodes * max_node_factor):
-            n_tasks = n_tasks_per_node * n
-            yield (part.fullname, n_tasks, n_tasks_per_node)
-            n *= 2
-        # create largest test:
-        n_tasks = n_tasks_per_node * int(sched_partition.num_nodes * max_node_factor)
-        yield (part.fullname, n_tasks, n_tasks_per_node)
+class ScalingCase(collections.namedtuple('ScalingCase', ['partition', 'num_nodes', 'num_tasks_per_node', 'num_cpus_per_task'])):
+    """ A configuration of a scaling sweep, see `scaling_sweep()`.
+
+        Fields are the full name of the ReFrame partition, the number of nodes, of tasks per node and of threads per task.
+    """
+    __slots__ = ()
+
+    @property
+    def num_tasks(self):
+        return self.num_nodes * self.num_tasks_per_node
+
+def sweep_values(values, info, default):
+    """ Return the sorted, unique values of a dimension of `scaling_sweep()`.
+
+        `values` may be None for `default`, a sequence, or a callable taking a `SchedulerBackend` and returning a sequence.
+    """
+    if values is None:
+        values = default
+    elif callable(values):
+        values = values(info)
+    return sorted(set(values))
+
+def scaling_sweep(nodes=None, tasks_per_node=None, threads_per_task=None, constraints=(),
+                  max_node_hours=None, hours_per_case=None, min_nodes=1, max_node_factor=1.0):
+    """ Generate the configurations of a scaling sweep over nodes x tasks per node x threads per task on all partitions.
+
+        Intended to be used as the values of a test parameter, e.g.:
+
+            class MyTest(rfm.RunOnlyRegressionTest):
+                case = parameter(scaling_sweep(constraints=[socket_aligned()]))
+
+                @run_after('init')
+                def set_partition(self):
+                    self.valid_systems = [self.case.partition]
+
+        Each dimension may be given as a sequence of int or as a callable taking the `SchedulerBackend` of a partition
+        (see `scheduler_info()`) and returning one:
+            `nodes`: default 1, 2, 4, 8, ..., from `min_nodes` up to the number of nodes of the partition times
+                `max_node_factor`, this maximum number included whether or not it is a power of 2
+            `tasks_per_node`: default 1, 2, 4, 8, ..., up to and including the number of physical cores per node
+            `threads_per_task`: default the number of physical cores per node divided by the tasks per node, i.e. full nodes
+        Configurations with more nodes than available or more CPUs per node than logical cores are never generated.
+
+        `constraints` is a sequence of callables taking a `ScalingCase` and the `SchedulerBackend` of its partition and
+        returning False to prune the configuration, see e.g. `local_size_between()`, `tasks_divide()` and `socket_aligned()`.
+
+        If `max_node_hours` is given, the total number of node-hours is capped to it, including configurations from
+        the cheapest one; `hours_per_case` is then required, either a number of hours or a callable taking a
+        `ScalingCase` and returning one.  Configurations over budget are dropped with a warning.
+
+        Partitions whose scheduler can't be queried are skipped with a warning.
+
+        Returns a list of `ScalingCase`, ordered by partition, nodes, tasks per node and threads per task.
+    """
+    cases = []
+    for part in runtime().system.partitions:
+        try:
+            info = scheduler_info(part)
+        except (OSError, ValueError, IndexError) as e:
+            getlogger().warning('cannot get scheduler information for partition %s: %s' % (part.fullname, e))
+            continue
+        max_nodes = int(info.num_nodes * max_node_factor)
+        for num_nodes in sweep_values(nodes, info, sequence(min_nodes, max_nodes, 2) + [max_nodes]):
+            if not 1 <= num_nodes <= info.num_nodes:
+                continue
+            for num_tasks_per_node in sweep_values(tasks_per_node, info, sequence(1, info.pcores_per_node, 2) + [info.pcores_per_node]):
+                if not 1 <= num_tasks_per_node <= info.lcores_per_node:
+                    continue
+                for num_cpus_per_task in sweep_values(threads_per_task, info, [max(1, info.pcores_per_node // num_tasks_per_node)]):
+                    if num_cpus_per_task < 1 or num_tasks_per_node * num_cpus_per_task > info.lcores_per_node:
+                        continue
+                    case = ScalingCase(part.fullname, num_nodes, num_tasks_per_node, num_cpus_per_task)
+                    if all(constraint(case, info) for constraint in constraints):
+                        cases.append(case)
+
+    if max_node_hours is not None:
+        if hours_per_case is None:
+            raise ValueError('hours_per_case is required to cap a scaling sweep to max_node_hours')
+        hours = hours_per_case if callable(hours_per_case) else lambda case: hours_per_case
+        kept, dropped, total = set(), [], 0.0
+        for case in sorted(cases, key=lambda case: case.num_nodes * hours(case)):
+            cost = case.num_nodes * hours(case)
+            if total + cost > max_node_hours:
+                dropped.append(case)
+                continue
+            kept.add(case)
+            total += cost
+        if dropped:
+            getlogger().warning('scaling sweep capped to %s node-hours, dropped: %s' % (max_node_hours, ', '.join(map(str, dropped))))
+        cases = [case for case in cases if case in kept]
+    return cases
+
+def local_size_between(global_size, min_size, max_size):
+    """ Scaling sweep constraint: the problem size per task, `global_size` divided by the number of tasks, is within [`min_size`, `max_size`]. """
+    def constraint(case, info):
+        return min_size <= global_size / case.num_tasks <= max_size
+    return constraint
+
+def tasks_divide(n):
+    """ Scaling sweep constraint: the number of tasks divides `n`, e.g. the number of grid points along a decomposed axis. """
+    def constraint(case, info):
+        return n % case.num_tasks == 0
+    return constraint
+
+def socket_aligned():
+    """ Scaling sweep constraint: tasks are spread evenly across sockets and none of them spans two sockets.
+
+        The number of sockets is taken from the scheduler or the `processor.num_sockets` configuration of the partition.
+    """
+    def constraint(case, info):
+        cores_per_socket = info.pcores_per_node // info.sockets_per_node
+        return (case.num_tasks_per_node % info.sockets_per_node == 0 and
+                cores_per_socket % case.num_cpus_per_task == 0)
+    return constraint
 
 def scaling_config_mock():
     """
@@ -86,6 +192,7 @@ class ScalingTest(rfm.RegressionTest):
         taken into account:
         - `--partition`: use a non-default Slurm partition.
         - `--exclude`: exclude specific nodes from consideration, i.e. a `partition_fraction` of 1.0 will not use these nodes.
+        For PBS and SGE the `-q` directive selects the queue. See `scheduler_info()` for the supported schedulers.
 
         The following tags are set:
         - `num_nodes`: the number of nodes used.
@@ -96,7 +203,7 @@ class ScalingTest(rfm.RegressionTest):
     @run_after('setup')
     def set_nodes(self):
         
-        scheduler_partition = Scheduler_Info(self.current_partition)
+        scheduler_partition = scheduler_info(self.current_partition)
 
         # calculate number of nodes to use:
         if not hasattr(self, 'partition_fraction'):
@@ -123,82 +230,423 @@ class ScalingTest(rfm.RegressionTest):
         # set tags:
         self.tags |= {'num_procs=%i' % self.num_tasks, 'num_nodes=%i' % self.num_nodes, 'procs_per_node=%i' % self.num_tasks_per_node}
 
-class CachedRunTest(rfm.RegressionTest):
+def add_perf_variable(test, name, expr, unit):
+    """ Add the deferred expression `expr` as the performance variable `name` of `test`, whichever of
+        `perf_patterns` or `perf_variables` the test uses.
+
+        `perf_patterns` is a required variable without a default value, so is only set by tests using it.
+    """
+    perf_patterns = getattr(test, 'perf_patterns', None)
+    if perf_patterns is not None:
+        perf_patterns[name] = expr
+        test.reference[f'*:{name}'] = (None, None, None, unit)
+    else:
+        test.perf_variables[name] = sn.make_performance_function(expr, unit)
+
+def perflog_dir(test):
+    """ Return the directory where the first `filelog` perflog handler of the configuration writes the
+        perflog of `test`, or None if there is no such handler.
+
+        The path is built as ReFrame's filelog handler does, relative to the prefix of the system
+        (e.g. from `--prefix`) and with environment variables expanded.
+    """
+    site_config = runtime().site_config
+    for i, handler in enumerate(site_config.get('logging/0/handlers_perflog') or []):
+        if handler.get('type') == 'filelog':
+            config_prefix = f'logging/0/handlers_perflog/{i}'
+            basedir = os.path.abspath(os.path.join(
+                site_config.get('systems/0/prefix'),
+                osext.expandvars(site_config.get(f'{config_prefix}/basedir'))
+            ))
+            prefix = osext.expandvars(site_config.get(f'{config_prefix}/prefix'))
+            fields = collections.defaultdict(str, check_system=test.current_system.name,
+                                             check_partition=test.current_partition.name)
+            return os.path.join(basedir, prefix) % fields
+    return None
+
+class LastHooks(rfm.RegressionMixin):
+    """ Mixin calling `last_before_run()` and `last_before_performance()` after all other `run_before('run')` and
+        `run_before('performance')` hooks of a test.
+
+        ReFrame pins a single hook per stage last (`always_last=True`), so mixins which must see the final state of the
+        test, e.g. its executable or performance variables, derive from this class and extend these methods, calling
+        `super()` first, instead of pinning hooks of their own.
+    """
+
+    @run_before('run', always_last=True)
+    def run_last_before_run(self):
+        self.last_before_run()
+
+    @run_before('performance', always_last=True)
+    def run_last_before_performance(self):
+        self.last_before_performance()
+
+    def last_before_run(self):
+        pass
+
+    def last_before_performance(self):
+        pass
+
+class CachedRunTest(LastHooks):
     """ Mixin. TODO: document properly.
 
         Classes using this can be derive from `rfm.RunOnlyRegressionTest`
         Assumes saved output files are in a directory `cache/` in same parent directory (and with same directory tree) as the `output/` and `stage/` directories.
 
         set self.use_cache to True or a path relative to cwd.
-    
-        NB Any class using this MUST NOT change self.executable in a method decorated with `@run_before('run')` as that will override functionality here.
+
+        Saved files are replayed into the stage dir before the sanity stage, according to `cache_replay`:
+            - 'link' (default): hardlink them
+            - 'reflink': make copy-on-write clones, where the filesystem supports it
+            - 'copy': copy them
+        Links and clones fall back to copies where they can't be made, e.g. across filesystems. Replayed files must
+        not be modified in place, or the saved output would be too, unless copies are used.
+
+        All saved files are replayed, unless `cache_files` is set to glob patterns of the files read by the sanity and
+        performance functions, matched against paths relative to the saved output directory or file names, e.g.
+        `['rsl.out.0000']`.  The job's stdout and stderr are then replayed too.  The files read can't be found from the
+        sanity and performance functions themselves, as ReFrame doesn't expose the arguments of deferred expressions.
+
+        The executable is replaced by a no-op after all other `run_before('run')` hooks, so these may set it, and
+        plugins wrapping it (e.g. `PerfCountersPlugin`) only wrap the no-op.
     """
+    cache_replay = variable(str, value='link')
+    cache_files = variable(typ.List[str], type(None), value=None)
 
-    @run_before('run')
-    def no_run(self):
+    def last_before_run(self):
         """ Turn the run phase into a no-op. """
-
+        super().last_before_run()
         if self.use_cache:
             with open(os.path.join(self.stagedir, 'noop.sh'), 'w') as noop:
                 noop.write('#!/bin/bash\necho "noop $@"\n')
             self.executable = "./noop.sh"
 
-    @run_after('run')
-    def copy_saved_output(self):
-        """ Copy saved output files to stage dir. """
+    def saved_output_dir(self):
+        """ Return the path (str) of the saved output directory of this test. """
+        # find the part of the path common to both output and staging:
+        rtc = rfm.core.runtime.runtime()
+        tree_path = os.path.relpath(self.outputdir, rtc.output_prefix)
 
-        if self.use_cache:
-            # find the part of the path common to both output and staging:
-            rtc = rfm.core.runtime.runtime()
-            tree_path = os.path.relpath(self.outputdir, rtc.output_prefix)
-            
-            cache_root = 'cache' if self.use_cache == True else self.use_cache
+        cache_root = 'cache' if self.use_cache == True else self.use_cache
 
-            saved_output_dir = os.path.join(cache_root, tree_path)
-            
-            if not os.path.exists(saved_output_dir) or not os.path.isdir(saved_output_dir):
-                raise ValueError("cached output directory %s does not exist or isn't a directory" % os.path.abspath(saved_output_dir))
+        saved_output_dir = os.path.join(cache_root, tree_path)
+
+        if not os.path.exists(saved_output_dir) or not os.path.isdir(saved_output_dir):
+            raise ValueError("cached output directory %s does not exist or isn't a directory" % os.path.abspath(saved_output_dir))
+        return saved_output_dir
 
-            import distutils.dir_util
-            distutils.dir_util.copy_tree(saved_output_dir, self.stagedir)
+    def replayed_files(self, saved_output_dir):
+        """ Return a sorted list of paths (str) of the saved files to replay, relative to `saved_output_dir`. """
+        files = []
+        for dirpath, dirnames, filenames in os.walk(saved_output_dir):
+            files.extend(os.path.relpath(os.path.join(dirpath, f), saved_output_dir) for f in filenames)
+        if self.cache_files is None:
+            return sorted(files)
+        patterns = list(self.cache_files) + [self.job.stdout, self.job.stderr]
+        return sorted(f for f in files if any(fnmatch.fnmatch(f, p) or fnmatch.fnmatch(os.path.basename(f), p) for p in patterns))
 
+    @run_before('sanity')
+    def replay_saved_output(self):
+        """ Replay the saved output files into the stage dir. """
+        if not self.use_cache:
+            return
+        saved_output_dir = self.saved_output_dir()
+        replay = {'link': link_or_copy, 'reflink': reflink_or_copy, 'copy': shutil.copy2}.get(self.cache_replay)
+        if replay is None:
+            raise ValueError("invalid cache_replay %r: must be one of 'link', 'reflink' or 'copy'" % self.cache_replay)
+        for relpath in self.replayed_files(saved_output_dir):
+            dest = os.path.join(self.stagedir, relpath)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if os.path.lexists(dest): # e.g. output of the no-op run
+                os.remove(dest)
+            replay(os.path.join(saved_output_dir, relpath), dest)
+
+def link_or_copy(src, dst):
+    """ Hardlink file `src` to `dst`, falling back to a copy where hardlinks can't be used, e.g. across filesystems. """
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        shutil.copy2(src, dst)
+
+class AdaptiveScalingTest(rfm.RegressionMixin):
+    """ Mixin for strong-scaling tests, stopping the sweep once parallel efficiency collapses.
+
+        Classes using this must have an integer `num_nodes` parameter and a performance variable named `scaling_time_var`
+        (default 'elapsed_time') giving the time to solution.
+
+        With `adaptive_scaling` enabled (the default), each test depends on the test with the next smaller `num_nodes`
+        (and the same values of any other parameter), so node counts run in increasing order.  The parallel efficiency
+        relative to the smallest node count, i.e. (time x nodes of smallest run) / (time x nodes), is reported as the
+        `parallel_efficiency` performance variable.  Once it falls under `min_parallel_efficiency` the test is tagged
+        `scaling_stopped`, which is recorded in the perflog, and all the tests with larger node counts are skipped.
+        Skipped tests don't reach the perflog, so a record of each of them, with the reason and the node count where
+        scaling stopped, is appended as a JSON line to `<test>.scaling.jsonl` next to the perflog.
+        Note that if a test fails, the tests with larger node counts fail as well because of the dependency.
+    """
+    adaptive_scaling = variable(typ.Bool, value=True)
+    min_parallel_efficiency = variable(float, value=0.5)
+    scaling_time_var = variable(str, value='elapsed_time')
+
+    @run_after('init')
+    def depend_on_smaller_scale(self):
+        self.smaller_scale = None
+        self.scaling_stopped = False
+        if not self.adaptive_scaling:
+            return
+        cls = type(self)
+        params = cls.get_variant_info(self.variant_num)['params']
+        smaller = [n for n in cls.param_space['num_nodes'] if n < self.num_nodes]
+        if not smaller:
+            return
+        others = {k: v for k, v in params.items() if k != 'num_nodes'}
+        param_space_size = len(cls.param_space)
+        for v in cls.get_variant_nums(num_nodes=max(smaller), **others):
+            # same fixture variants, which are the outer index of the variant space:
+            if v // param_space_size == self.variant_num // param_space_size:
+                self.smaller_scale = cls.variant_name(v)
+                self.depends_on(self.smaller_scale)
+                break
+
+    @run_after('setup')
+    def skip_after_efficiency_collapse(self):
+        if self.smaller_scale is None:
+            return
+        smaller = self.getdep(self.smaller_scale)
+        if smaller.scaling_stopped:
+            # propagate to all larger node counts:
+            self.scaling_stopped = True
+            self.scaling_stopped_at = smaller.scaling_stopped_at
+            reason = 'parallel efficiency fell below %g%% at %d nodes' % (100 * self.min_parallel_efficiency, self.scaling_stopped_at)
+            self.record_skipped_scale(reason)
+            self.skip(reason)
+
+    def record_skipped_scale(self, reason):
+        """ Append a record of this skipped test, and of those with larger node counts, to `<test>.scaling.jsonl` next
+            to the perflog.
+
+            The tests with larger node counts are skipped by ReFrame because of their skipped dependency, so never run
+            any hook of their own.
+        """
+        log_dir = perflog_dir(self)
+        if log_dir is None:
+            return
+        os.makedirs(log_dir, exist_ok=True)
+        with open(os.path.join(log_dir, f'{type(self).variant_name()}.scaling.jsonl'), 'a') as f:
+            for num_nodes in sorted(n for n in type(self).param_space['num_nodes'] if n >= self.num_nodes):
+                record = {
+                    'time': datetime.datetime.now().astimezone().isoformat(),
+                    'display_name': re.sub(r' %num_nodes=\d+', f' %num_nodes={num_nodes}', self.display_name),
+                    'system': self.current_system.name,
+                    'partition': self.current_partition.name,
+                    'num_nodes': num_nodes,
+                    'reason': reason,
+                    'scaling_stopped_at': self.scaling_stopped_at,
+                    'min_parallel_efficiency': self.min_parallel_efficiency,
+                }
+                f.write(json.dumps(record) + '\n')
+
+    @run_before('performance')
+    def set_parallel_efficiency(self):
+        if not self.adaptive_scaling:
+            return
+        add_perf_variable(self, 'parallel_efficiency', self.parallel_efficiency(), '%')
+
+    @sn.deferrable
+    def parallel_efficiency(self):
+        """ Return the parallel efficiency (float, %) of this test, updating the scaling state and tags before logging. """
+        perf_patterns = getattr(self, 'perf_patterns', None)
+        perf_exprs = perf_patterns if perf_patterns is not None else self.perf_variables
+        node_time = sn.evaluate(perf_exprs[self.scaling_time_var]) * self.num_nodes
+        if self.smaller_scale is None:
+            self.base_node_time = node_time
+        else:
+            self.base_node_time = self.getdep(self.smaller_scale).base_node_time
+        efficiency = self.base_node_time / node_time
+        if efficiency < self.min_parallel_efficiency:
+            self.scaling_stopped = True
+            self.scaling_stopped_at = self.num_nodes
+            self.tags |= {'scaling_stopped'}
+        return 100 * efficiency
+
+# ioctl request to clone a file on copy-on-write filesystems, from <linux/fs.h>
+FICLONE = 0x40049409
+
+def reflink_or_copy(src, dst):
+    """ Make `dst` a copy-on-write clone of file `src`, falling back to a copy where the filesystem doesn't support it. """
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EBADF):
+            raise
+        shutil.copy2(src, dst)
+    else:
+        shutil.copystat(src, dst)
+
+def hash_tree(digest, path):
+    """ Update a `hashlib` object with the relative names and contents of all files under directory `path`, in sorted order. """
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for f in sorted(filenames):
+            full = os.path.join(dirpath, f)
+            digest.update(os.path.relpath(full, path).encode())
+            with open(full, 'rb') as fh:
+                digest.update(fh.read())
+
+_compiler_versions = {}
+
+def compiler_version(environ):
+    """ Return the version banners of the C, C++ and Fortran compilers of a ReFrame programming environment.
+
+        The environment is loaded in the current process to run `<compiler> --version`, so this is done once per
+        environment and session.  Compilers which can't be run give an empty banner.
+
+        Returns a tuple of str.
+    """
+    key = (environ.name, tuple(environ.modules), environ.cc, environ.cxx, environ.ftn)
+    if key not in _compiler_versions:
+        snapshot, _ = loadenv(environ)
+        try:
+            banners = []
+            for compiler in (environ.cc, environ.cxx, environ.ftn):
+                try:
+                    banners.append(osext.run_command([compiler, '--version']).stdout.strip())
+                except OSError:
+                    banners.append('')
+        finally:
+            snapshot.restore()
+        _compiler_versions[key] = tuple(banners)
+    return _compiler_versions[key]
+
+def build_cache_key(test):
+    """ Return a key (hex str) identifying the build of a test from everything which can change its result.
+
+        This covers the test's system, partition and environment, the sources in `sourcesdir`, the build system
+        and its flags, pre/post-build commands, modules and environment variables of both the test and programming
+        environment, and the compiler versions.
+    """
+    digest = hashlib.sha256()
+    environ = test.current_environ
+    for item in (test.current_system.name, test.current_partition.name, environ.name, test.executable,
+                 type(test.build_system).__name__, sorted(vars(test.build_system).items()),
+                 test.prebuild_cmds, test.postbuild_cmds, test.modules, sorted(test.env_vars.items()),
+                 environ.modules, sorted(environ.env_vars.items()),
+                 environ.cflags, environ.cxxflags, environ.fflags, environ.cppflags, environ.ldflags,
+                 compiler_version(environ), test.sourcesdir):
+        digest.update(repr(item).encode())
+        digest.update(b'\0')
+    if test.sourcesdir:
+        sourcesdir = os.path.join(test.prefix, test.sourcesdir)
+        if os.path.isdir(sourcesdir):
+            hash_tree(digest, sourcesdir)
+    return digest.hexdigest()
+
+class BuildCache(object):
+    def __init__(self, root, max_size):
+        """ Content-addressed cache of executables.
+
+            Args:
+                root: str, directory holding the cache
+                max_size: int, maximum total size in bytes of the cached files, least recently used ones are evicted beyond this
+
+            Entries are written atomically, so concurrent tests can share the cache, and are retrieved by hardlinking.
+            Cached files must therefore not be modified in place.
+        """
+        self.root = os.path.abspath(root)
+        self.max_size = max_size
+
+    def path(self, key):
+        """ Return the path (str) of the entry for `key`, which may not exist. """
+        return os.path.join(self.root, key[:2], key)
+
+    def fetch(self, key, dest):
+        """ Place the entry for `key` at path `dest`, marking it as recently used. """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        if os.path.lexists(dest):
+            os.remove(dest)
+        link_or_copy(path, dest)
+        os.utime(path)
+
+    def store(self, key, src):
+        """ Save file `src` as the entry for `key`, then evict old entries if needed. """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), '.%s.%d.tmp' % (key, os.getpid()))
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            link_or_copy(src, tmp)
+            os.replace(tmp, path) # atomic, readers see either no entry or a complete one
+        except BaseException:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            raise
+        os.utime(path)
+        self.evict()
+
+    def evict(self):
+        """ Remove least recently used entries until the cache is no larger than `max_size`. """
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for f in filenames:
+                if f.startswith('.'): # in-progress writes
+                    continue
+                path = os.path.join(dirpath, f)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError: # evicted concurrently
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
 
 class CachedCompileOnlyTest(rfm.CompileOnlyRegressionTest):
     """ A compile-only test with caching of binaries between `reframe` runs.
-    
-        Test classes derived from this class will save `self.executable` to a ./builds/{system}/{partition}/{environment}/{self.name}` directory after compilation.
-        However if this path (including the filename) exists before compilation (i.e. on the next run):
+
+        Test classes derived from this class save `self.executable` after compilation in a content-addressed cache
+        (see `BuildCache`) in the `build_cache_dir` directory, keyed by everything affecting the build (see `build_cache_key()`).
+        If a matching binary is already in the cache (i.e. on the next run, unless sources, flags, modules or compilers changed):
             - No compilation occurs
-            - `self.sourcesdir` is set to this directory, so `reframe` will copy the binary to the staging dir (as if compilation had occured)
-            - A new attribute `self.build_path` is set to this path (otherwise None)
+            - The binary is hardlinked from the cache into the staging dir, as if compilation had occured
+            - A new attribute `self.build_path` is set to its path in the cache (otherwise None)
 
-        Note that `self.sourcesdir` is only manipulated if no compilation occurs, so compilation test-cases which modify this to specify the source directory should be fine.
+        The cache is shared by all systems, partitions and environments and is limited to `build_cache_max_size` bytes.
 
         TODO: Make logging tidier - currently produces info-level (stdout by default) messaging on whether cache is used.
     """
+    build_cache_dir = variable(str, value='builds')
+    build_cache_max_size = variable(int, value=10 * 1024 ** 3)
+
     @run_before('compile')
     def conditional_compile(self):
-        build_dir = os.path.abspath(os.path.join('builds', self.current_system.name, self.current_partition.name, self.current_environ.name, self.name))
-        build_path = os.path.join(build_dir, self.executable)
+        self.build_cache = BuildCache(self.build_cache_dir, self.build_cache_max_size)
+        self.build_key = build_cache_key(self)
+        build_path = self.build_cache.path(self.build_key)
         if os.path.exists(build_path):
             self.build_path = build_path
             getlogger().info('found exe at %r', self.build_path)
             self.build_system = NoBuild()
-            self.sourcesdir = build_dir # means reframe will copy the exe back in
         else:
             self.build_path = None
 
     @run_after('compile')
     def copy_executable(self):
-        if not self.build_path: # i.e. only if actually did a compile:
-            self.exes_dir = os.path.join('builds', self.current_system.name, self.current_partition.name, self.current_environ.name, self.name)
-            exe_path = os.path.join(self.stagedir, self.executable)
-            build_path = os.path.join(self.exes_dir, self.executable)
-            build_dir = os.path.dirpath(build_path) # self.executable might include a directory
-            if not os.path.exists(build_dir):
-                os.makedirs(build_dir)
-            shutil.copy(exe_path, build_path)
-            getlogger().info('copied exe to %r', build_path)
+        exe_path = os.path.join(self.stagedir, self.executable) # self.executable might include a directory
+        if self.build_path:
+            self.build_cache.fetch(self.build_key, exe_path)
+        else: # i.e. only if actually did a compile:
+            self.build_cache.store(self.build_key, exe_path)
+            getlogger().info('copied exe to %r', self.build_cache.path(self.build_key))
 
 class NoBuild(BuildSystem):
     """ A no-op build system """
@@ -207,6 +655,36 @@ class NoBuild(BuildSystem):
     def emit_build_commands(self, environ):
         return []
 
+# Time in seconds for which node information from the scheduler is reused.
+SCHEDULER_INFO_TTL = 300
+
+def ttl_cache(ttl):
+    """ Decorator caching the results of a function by its (hashable) positional arguments for `ttl` seconds.
+
+        The cache can be emptied with the `cache_clear()` method of the decorated function.
+    """
+    def decorator(fn):
+        cache = {}
+        @functools.wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            if args in cache and now - cache[args][0] < ttl:
+                return cache[args][1]
+            result = fn(*args)
+            cache[args] = (now, result)
+            return result
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+@ttl_cache(SCHEDULER_INFO_TTL)
+def sinfo_nodes_output(partition=None):
+    """ Return the output (str) of `sinfo --Node --long`, optionally for a given slurm partition, cached for `SCHEDULER_INFO_TTL` seconds. """
+    sinfo_cmd = ['sinfo', '--Node', '--long']
+    if partition:
+        sinfo_cmd.append('--partition=%s' % partition)
+    return subprocess.run(sinfo_cmd, stdout=PIPE, stderr=PIPE).stdout.decode('utf-8') # encoding?
+
 def slurm_node_info(partition=None):
     """ Get information about slurm nodes.
 
@@ -229,10 +707,7 @@ def slurm_node_info(partition=None):
 
         TODO: add partition selection? with None being current one (note system partition != slurm partition)
     """
-    sinfo_cmd = ['sinfo', '--Node', '--long']
-    if partition:
-        sinfo_cmd.append('--partition=%s' % partition)
-    nodeinfo = subprocess.run(sinfo_cmd, stdout=PIPE, stderr=PIPE).stdout.decode('utf-8') # encoding?
+    nodeinfo = sinfo_nodes_output(partition)
 
     nodes = []
     lines = nodeinfo.split('\n')
@@ -247,17 +722,208 @@ def slurm_node_info(partition=None):
     return nodes
 
 
+def split_hostlist(s):
+    """ Split a Slurm 'hostlist expression' at the commas which are not within brackets.
+
+        Returns a list of str.
+    """
+    items, depth, start = [], 0, 0
+    for i, c in enumerate(s):
+        if c == '[':
+            depth += 1
+        elif c == ']':
+            depth -= 1
+            if depth < 0:
+                raise ValueError('unbalanced brackets in hostlist %r' % s)
+        elif c == ',' and depth == 0:
+            items.append(s[start:i])
+            start = i + 1
+    if depth != 0:
+        raise ValueError('unbalanced brackets in hostlist %r' % s)
+    items.append(s[start:])
+    return [item for item in items if item]
+
+def expand_hostlist(s):
+    """ Convert a Slurm 'hostlist expression' to a list of individual node names, without calling Slurm.
+
+        Supports comma-separated lists, ranges with zero padding and several bracketed groups per name, e.g.:
+
+            expand_hostlist('nid[001-003,010]') -> ['nid001', 'nid002', 'nid003', 'nid010']
+            expand_hostlist('r[1-2]n[1-2],login') -> ['r1n1', 'r1n2', 'r2n1', 'r2n2', 'login']
+    """
+    hostnames = []
+    for item in split_hostlist(s.strip()):
+        start = item.find('[')
+        if start == -1:
+            hostnames.append(item)
+            continue
+        end = item.index(']', start)
+        prefix, ranges, suffix = item[:start], item[start + 1:end], item[end + 1:]
+        for r in split_hostlist(ranges):
+            lo, _, hi = r.partition('-')
+            if not lo.isdigit() or (hi and not hi.isdigit()):
+                raise ValueError('invalid range %r in hostlist %r' % (r, s))
+            for n in range(int(lo), int(hi or lo) + 1):
+                # expand any further bracketed groups in the rest of the name:
+                hostnames.extend(expand_hostlist('%s%0*d%s' % (prefix, len(lo), n, suffix)))
+    return hostnames
+
+def compress_hostlist(hostnames):
+    """ Convert a sequence of node names to a compact Slurm 'hostlist expression', the inverse of `expand_hostlist()`.
+
+        Names are grouped by the part before their trailing number, e.g.:
+
+            compress_hostlist(['nid001', 'nid002', 'nid003', 'nid010', 'login']) -> 'nid[001-003,010],login'
+
+        Duplicates are removed and numbers are sorted within each group.  Numbers with different zero padding are kept
+        in separate groups.
+    """
+    groups = {} # prefix -> set of str numbers, in order of first appearance
+    plain = set() # names without a number
+    for name in hostnames:
+        m = re.match(r'^(.*?)(\d+)$', name)
+        if m is None:
+            plain.add(name)
+            groups.setdefault(name, set())
+        else:
+            groups.setdefault(m.group(1), set()).add(m.group(2))
+
+    items = []
+    for prefix, numbers in groups.items():
+        if prefix in plain:
+            items.append(prefix)
+        if not numbers:
+            continue
+        # width 0 means no padding, which only works if no number has leading zeros:
+        widths = {}
+        padded = any(len(d) > 1 and d.startswith('0') for d in numbers)
+        for d in numbers:
+            widths.setdefault(len(d) if padded else 0, []).append(int(d))
+        for width, ints in sorted(widths.items()):
+            ints = sorted(ints)
+            ranges = []
+            start = prev = ints[0]
+            for n in ints[1:] + [None]:
+                if n is not None and n == prev + 1:
+                    prev = n
+                    continue
+                ranges.append('%0*d' % (width, start) if start == prev else '%0*d-%0*d' % (width, start, width, prev))
+                start = prev = n
+            if len(ints) == 1:
+                items.append(prefix + ranges[0])
+            else:
+                items.append('%s[%s]' % (prefix, ','.join(ranges)))
+    return ','.join(items)
+
 def hostlist_to_hostnames(s):
     """ Convert a Slurm 'hostlist expression' to a list of individual node names.
-    
-        Uses `scontrol` command.
+
+        See `expand_hostlist()`.
     """
-    hostnames = subprocess.run(['scontrol', 'show', 'hostnames', s], capture_output=True, text=True).stdout.split()
-    return hostnames
+    return expand_hostlist(s)
+
+def hostnames_to_hostlist(hostnames):
+    """ Convert a sequence of individual node names to a Slurm 'hostlist expression', e.g. for `--nodelist`.
+
+        See `compress_hostlist()`.
+    """
+    return compress_hostlist(hostnames)
+
+@ttl_cache(SCHEDULER_INFO_TTL)
+def scheduler_nodes(slurm_partition_name, exclude_hostlist, exclude_states, only_states):
+    """ Get information about the nodes of a Slurm partition, cached for `SCHEDULER_INFO_TTL` seconds.
+
+        Args:
+            slurm_partition_name: str, name of slurm partition, or None for the default one
+            exclude_hostlist: str, Slurm hostlist expression of nodes to exclude, or None
+            exclude_states: tuple of str, exclude nodes in these Slurm node states
+            only_states: tuple of str, only include nodes in these Slurm node states
+
+        Returns a tuple of dicts as for `slurm_node_info()`, which must not be modified.
+    """
+    slurm_excluded_nodes = set(expand_hostlist(exclude_hostlist)) if exclude_hostlist else set()
+    nodeinfo = []
+    for node in slurm_node_info(slurm_partition_name):
+        if slurm_partition_name is None and not node['PARTITION'].endswith('*'): # filter to default partition
+            continue
+        if node['NODELIST'] in slurm_excluded_nodes:
+            continue
+        if node['STATE'].strip('*') in exclude_states:
+            continue
+        if only_states and node['STATE'] not in only_states:
+            continue
+        nodeinfo.append(node)
+    return tuple(nodeinfo)
+
+class SchedulerBackend(object):
+    """ Base class for information about the nodes available to a ReFrame partition.
+
+        Subclasses query a specific scheduler in their constructor, which takes the arguments of `Scheduler_Info`,
+        and provide the attributes:
+            - `num_nodes`: number of nodes
+            - `sockets_per_node`: number of sockets per node
+            - `pcores_per_node`: number of physical cores per node
+            - `lcores_per_node`: number of logical cores per node
+
+        Use `scheduler_info()` to get the appropriate backend for a ReFrame partition.
+    """
+
+    def set_topology(self, topologies):
+        """ Set the attributes from a sequence of (sockets, physical cores, logical cores) tuples, one per node.
+
+            All nodes must have the same topology.
+        """
+        self.num_nodes = len(topologies)
+        if not topologies:
+            raise ValueError('Cannot summarise CPUs - no nodes found')
+        if not len(set(topologies)) == 1:
+            raise ValueError('Cannot summarise CPUs - description differs between nodes:\n%r' % list(topologies))
+        self.sockets_per_node, self.pcores_per_node, self.lcores_per_node = topologies[0]
+
+    def __str__(self):
+
+        descr = ['%s=%s' % (k, getattr(self, k)) for k in ['num_nodes', 'sockets_per_node', 'pcores_per_node', 'lcores_per_node']]
 
-class Scheduler_Info(object):
+        return '%s(%s)' % (type(self).__name__, ', '.join(descr))
+
+def processor_topology(rfm_partition):
+    """ Return a (sockets, physical cores, logical cores) tuple per node from the `processor` configuration of a ReFrame
+        partition, or None if it doesn't define the number of CPUs.
+    """
+    processor = rfm_partition.processor
+    if not processor.num_cpus:
+        return None
+    sockets = processor.num_sockets or 1
+    pcores = processor.num_cpus // (processor.num_cpus_per_core or 1)
+    return (sockets, pcores, processor.num_cpus)
+
+def access_option(rfm_partition, flag):
+    """ Return the value (str) of a `flag value` option in the `access` property of a ReFrame partition, or None. """
+    if rfm_partition is None:
+        return None
+    for option in rfm_partition.access:
+        parts = option.split()
+        if len(parts) == 2 and parts[0] == flag:
+            return parts[1]
+    return None
+
+def slurm_access(rfm_partition):
+    """ Return the Slurm partition name and the hostlist expression of excluded nodes (str or None) from the
+        `--partition` and `--exclude` options in the `access` property of a ReFrame partition.
+    """
+    slurm_partition_name = None
+    exclude_hostlist = None
+    if rfm_partition is not None:
+        for option in rfm_partition.access:
+            if '--partition=' in option:
+                _, slurm_partition_name = option.split('=')
+            if '--exclude' in option:
+                _, exclude_hostlist = option.split('=')
+    return slurm_partition_name, exclude_hostlist
+
+class Scheduler_Info(SchedulerBackend):
     def __init__(self, rfm_partition=None, exclude_states=None, only_states=None):
-        """ Information from the scheduler.
+        """ Information from the Slurm scheduler.
 
             Args:
                 rfm_partition: reframe.core.systems.SystemPartition or None
@@ -274,48 +940,326 @@ class Scheduler_Info(object):
             in the `access` property of the ReFrame partition will affect the information returned:
                 - `--partition`
                 - `--exclude`
+
+            Node information is shared by all instances with the same arguments, see `scheduler_nodes()`, so that
+            e.g. `scaling_config` and `ScalingTest` query the scheduler only once per partition.
         """
 
-        # TODO: handle scheduler not being slurm!
-        slurm_partition_name = None
-        slurm_excluded_nodes = []
+        slurm_partition_name, exclude_hostlist = slurm_access(rfm_partition)
+        exclude_states = () if exclude_states is None else tuple(exclude_states)
+        only_states = () if only_states is None else tuple(only_states)
+
+        # filter out nodes we don't want:
+        nodeinfo = scheduler_nodes(slurm_partition_name, exclude_hostlist, exclude_states, only_states)
+            
+        topologies = []
+        for node in nodeinfo:
+            sockets, cores, threads = [int(v) for v in node['S:C:T'].split(':')] # nb each is 'per' the preceeding
+            topologies.append((sockets, sockets * cores, sockets * cores * threads))
+        self.set_topology(topologies)
+
+@ttl_cache(SCHEDULER_INFO_TTL)
+def pbs_node_info():
+    """ Get information about PBS/Torque nodes from `pbsnodes -a`, cached for `SCHEDULER_INFO_TTL` seconds.
+
+        Returns a tuple of dicts, one per node, with key "name" for the name of the node and all its `key = value`
+        attributes, e.g. "state", "np" (Torque) or "resources_available.ncpus" (PBS Pro), with str values.
+    """
+    out = subprocess.run(['pbsnodes', '-a'], stdout=PIPE, stderr=PIPE).stdout.decode('utf-8')
+    nodes = []
+    for line in out.split('\n'):
+        if not line.strip():
+            continue
+        if not line[0].isspace():
+            nodes.append({'name': line.strip()})
+        elif nodes and '=' in line:
+            key, _, value = line.partition('=')
+            nodes[-1][key.strip()] = value.strip()
+    return tuple(nodes)
+
+class PbsInfo(SchedulerBackend):
+    def __init__(self, rfm_partition=None, exclude_states=None, only_states=None):
+        """ Information from the PBS or Torque scheduler.
+
+            Arguments and attributes are as for `Scheduler_Info`.  Only nodes of the queue given by a `-q` option in the
+            `access` property of the ReFrame partition are considered, if nodes report their queue (PBS Pro).
+            States are those reported by `pbsnodes`, e.g. "free" or "offline".
+
+            The topology of the nodes is taken from the `processor` configuration of the partition where defined,
+            as PBS only reports the number of CPUs, which are otherwise assumed to be all physical cores on one socket.
+        """
+        queue = access_option(rfm_partition, '-q')
         exclude_states = [] if exclude_states is None else exclude_states
         only_states = [] if only_states is None else only_states
-        if rfm_partition is not None:
-            for option in rfm_partition.access:
-                if '--partition=' in option:
-                    _, slurm_partition_name = option.split('=')
-                if '--exclude' in option:
-                    _, exclude_hostlist = option.split('=')
-                    slurm_excluded_nodes = hostlist_to_hostnames(exclude_hostlist)
-        
-        # filter out nodes we don't want:
         nodeinfo = []
-        for node in slurm_node_info(slurm_partition_name):
-            if slurm_partition_name is None and not node['PARTITION'].endswith('*'): # filter to default partition
-                continue
-            if node['NODELIST'] in slurm_excluded_nodes:
+        for node in pbs_node_info():
+            if queue and node.get('queue', queue) != queue:
                 continue
-            if node['STATE'].strip('*') in exclude_states:
+            states = node.get('state', '').split(',')
+            if any(state in exclude_states for state in states):
                 continue
-            if only_states and node['STATE'] not in only_states:
+            if only_states and not any(state in only_states for state in states):
                 continue
             nodeinfo.append(node)
-            
-        self.num_nodes = len(nodeinfo)
-        cpus = [n['S:C:T'] for n in nodeinfo]
-        if not len(set(cpus)) == 1:
-            raise ValueError('Cannot summarise CPUs - description differs between nodes:\n%r' % cpus)
-        sockets, cores, threads = [int(v) for v in cpus[0].split(':')] # nb each is 'per' the preceeding
-        self.sockets_per_node = sockets
-        self.pcores_per_node = sockets * cores
-        self.lcores_per_node = sockets * cores * threads
 
-    def __str__(self):
+        topology = processor_topology(rfm_partition) if rfm_partition is not None else None
+        topologies = []
+        for node in nodeinfo:
+            if topology is not None:
+                topologies.append(topology)
+            else:
+                ncpus = int(node.get('resources_available.ncpus', node.get('pcpus', node.get('np', 1))))
+                topologies.append((1, ncpus, ncpus))
+        self.set_topology(topologies)
 
-        descr = ['%s=%s' % (k, getattr(self, k)) for k in ['num_nodes', 'sockets_per_node', 'pcores_per_node', 'lcores_per_node']]
+@ttl_cache(SCHEDULER_INFO_TTL)
+def sge_host_info():
+    """ Get information about SGE hosts from `qhost`, cached for `SCHEDULER_INFO_TTL` seconds.
+
+        Returns a tuple of dicts, one per host, with keys from the `qhost` header, e.g. "HOSTNAME", "NCPU", "NSOC",
+        "NCOR", "NTHR", and str values.
+    """
+    out = subprocess.run(['qhost'], stdout=PIPE, stderr=PIPE).stdout.decode('utf-8')
+    lines = out.split('\n')
+    header = lines[0].split()
+    hosts = []
+    for line in lines[1:]:
+        line = line.split()
+        if not line or line[0].startswith('-') or line[0] == 'global':
+            continue
+        hosts.append(dict(zip(header, line)))
+    return tuple(hosts)
+
+@ttl_cache(SCHEDULER_INFO_TTL)
+def sge_queue_hosts(queue):
+    """ Return the set of short names of the hosts of an SGE queue, from `qselect`. """
+    out = subprocess.run(['qselect', '-q', queue], stdout=PIPE, stderr=PIPE).stdout.decode('utf-8')
+    return {line.partition('@')[2].split('.')[0] for line in out.split()}
+
+class SgeInfo(SchedulerBackend):
+    def __init__(self, rfm_partition=None, exclude_states=None, only_states=None):
+        """ Information from the SGE scheduler.
+
+            Arguments and attributes are as for `Scheduler_Info`.  Only hosts of the queue given by a `-q` option in the
+            `access` property of the ReFrame partition are considered.  `qhost` doesn't report host states, so
+            `exclude_states` and `only_states` are ignored, except that hosts not reporting their load are considered down
+            and excluded.
+
+            The topology of the nodes is taken from the `processor` configuration of the partition where defined.
+        """
+        queue = access_option(rfm_partition, '-q')
+        queue_hosts = sge_queue_hosts(queue) if queue else None
+        topology = processor_topology(rfm_partition) if rfm_partition is not None else None
+        topologies = []
+        for host in sge_host_info():
+            if queue_hosts is not None and host['HOSTNAME'].split('.')[0] not in queue_hosts:
+                continue
+            if host.get('LOAD', '-') == '-':
+                continue
+            if topology is not None:
+                topologies.append(topology)
+            else:
+                topologies.append((int(host['NSOC']), int(host['NCOR']), int(host['NTHR'])))
+        self.set_topology(topologies)
+
+class StaticInfo(SchedulerBackend):
+    def __init__(self, rfm_partition=None, exclude_states=None, only_states=None):
+        """ Information from the ReFrame configuration only, without querying any scheduler.
+
+            Arguments and attributes are as for `Scheduler_Info`, but node states are ignored.  The number of nodes
+            is given by `num_nodes` in the `extras` of the ReFrame partition, by default 1, and the topology by its
+            `processor` configuration.  If the latter is missing, all CPUs of the current node are assumed to be
+            physical cores on one socket.
+        """
+        if rfm_partition is None:
+            num_nodes, topology = 1, None
+        else:
+            num_nodes, topology = rfm_partition.extras.get('num_nodes', 1), processor_topology(rfm_partition)
+        if topology is None:
+            ncpus = os.cpu_count() or 1
+            topology = (1, ncpus, ncpus)
+        self.set_topology([topology] * num_nodes)
+
+# Backend for each ReFrame scheduler, any other uses `StaticInfo`.
+SCHEDULER_BACKENDS = {
+    'slurm': Scheduler_Info,
+    'squeue': Scheduler_Info,
+    'pbs': PbsInfo,
+    'torque': PbsInfo,
+    'sge': SgeInfo,
+}
+
+def scheduler_info(rfm_partition, exclude_states=None, only_states=None):
+    """ Return information about the nodes of a ReFrame partition from the appropriate `SchedulerBackend`.
+
+        Partitions defining both `num_nodes` in their `extras` and the number of CPUs in their `processor` configuration
+        use `StaticInfo`, which doesn't query the scheduler at all.  Otherwise the backend for the partition's scheduler
+        is used, see `SCHEDULER_BACKENDS`.
+    """
+    if 'num_nodes' in rfm_partition.extras and processor_topology(rfm_partition) is not None:
+        backend = StaticInfo
+    else:
+        backend = SCHEDULER_BACKENDS.get(rfm_partition.scheduler.registered_name, StaticInfo)
+    return backend(rfm_partition, exclude_states, only_states)
+
+class NetworkTopology(object):
+    """ Network topology of the nodes, from a Slurm `topology.conf` file or the output of `scontrol show topology`.
+
+        Both describe a tree of switches, one per line, e.g.:
+
+            SwitchName=s0 Nodes=nid[001-016]
+            SwitchName=s1 Nodes=nid[017-032]
+            SwitchName=g0 Switches=s[0-1]
+
+        Switches with `Nodes` are the leaf switches of the nodes.  The group of a leaf switch is the switch listing it
+        in its `Switches`, e.g. a dragonfly group or the spine of a fat tree, or the leaf switch itself if there is none.
+
+        Attributes:
+            - `switches`: dict of leaf switch name -> list of node names, in the order of the description
+            - `groups`: dict of group name -> list of leaf switch names
+            - `switch`: dict of node name -> leaf switch name
+            - `group`: dict of node name -> group name
+    """
+
+    def __init__(self, description):
+        parents = {}
+        self.switches = {}
+        for line in description.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = dict(field.split('=', 1) for field in line.split() if '=' in field)
+            if 'SwitchName' not in fields:
+                continue
+            name = fields['SwitchName']
+            if fields.get('Nodes'):
+                self.switches[name] = expand_hostlist(fields['Nodes'])
+            for child in expand_hostlist(fields.get('Switches', '')):
+                parents[child] = name
+        if not self.switches:
+            raise ValueError('no switches with nodes found in network topology')
+
+        self.groups = {}
+        self.switch = {}
+        self.group = {}
+        for name, nodes in self.switches.items():
+            group = parents.get(name, name)
+            self.groups.setdefault(group, []).append(name)
+            for node in nodes:
+                self.switch[node] = name
+                self.group[node] = group
+
+def read_topology(path):
+    """ Return the `NetworkTopology` described in the Slurm `topology.conf` format by file `path`. """
+    with open(path) as f:
+        return NetworkTopology(f.read())
+
+@ttl_cache(SCHEDULER_INFO_TTL)
+def slurm_topology():
+    """ Return the `NetworkTopology` from `scontrol show topology`, cached for `SCHEDULER_INFO_TTL` seconds. """
+    out = subprocess.run(['scontrol', 'show', 'topology'], stdout=PIPE, stderr=PIPE).stdout.decode('utf-8')
+    return NetworkTopology(out)
+
+# Placements of nodes, see `placement_nodes()`.
+PLACEMENTS = ('default', 'same-switch', 'cross-switch', 'cross-group')
+
+def round_robin(node_lists, num_nodes):
+    """ Return `num_nodes` nodes taken in turn from each of the `node_lists`, or None if there are not enough nodes or
+        if they would not span at least two of the lists.
+    """
+    node_lists = [list(nodes) for nodes in node_lists if nodes]
+    if len(node_lists) < 2 or sum(len(nodes) for nodes in node_lists) < num_nodes:
+        return None
+    nodes = []
+    while len(nodes) < num_nodes:
+        for node_list in node_lists:
+            if node_list and len(nodes) < num_nodes:
+                nodes.append(node_list.pop(0))
+    return nodes
+
+def placement_nodes(topology, placement, num_nodes, available=None):
+    """ Choose `num_nodes` nodes of a `NetworkTopology` according to `placement`:
+
+            - 'same-switch': all nodes on the same leaf switch
+            - 'cross-switch': nodes spread in turn over the leaf switches of the same group
+            - 'cross-group': nodes spread in turn over the groups
+
+        Only nodes in `available` (a set of node names) are used if given.  The first node set found, in the order of
+        the topology description, is returned as a list of node names.  Raises a ValueError if there is none.
+    """
+    def nodes_of(switches):
+        return [node for switch in switches for node in topology.switches[switch]
+                if available is None or node in available]
+
+    if placement == 'same-switch':
+        candidates = [nodes_of([switch])[:num_nodes] for switch in topology.switches]
+        candidates = [nodes for nodes in candidates if len(nodes) == num_nodes]
+    elif placement == 'cross-switch':
+        candidates = [round_robin([nodes_of([switch]) for switch in switches], num_nodes)
+                      for switches in topology.groups.values()]
+    elif placement == 'cross-group':
+        candidates = [round_robin([nodes_of(switches) for switches in topology.groups.values()], num_nodes)]
+    else:
+        raise ValueError('invalid placement %r: must be one of %s' % (placement, ', '.join(map(repr, PLACEMENTS[1:]))))
+    candidates = [nodes for nodes in candidates if nodes is not None]
+    if not candidates:
+        raise ValueError('no %s placement of %d nodes in the network topology' % (placement, num_nodes))
+    return candidates[0]
+
+# Slurm node states of nodes which can't run jobs, e.g. to exclude from placements or node counts.
+UNUSABLE_NODE_STATES = ('down', 'drained', 'draining', 'fail', 'failing', 'future', 'maint')
+
+class NodePlacement(rfm.RegressionMixin):
+    """ Mixin choosing the nodes of a test according to their position in the network, on Slurm partitions.
+
+        Set `placement` to one of `PLACEMENTS`, e.g. `-S placement=cross-switch`, see `placement_nodes()`.  The default
+        'default' leaves the choice of nodes to the scheduler.  The network topology is read from `topology_file`, or
+        the file given by `topology_file` in the `extras` of the ReFrame partition, in the Slurm `topology.conf` format,
+        else from `scontrol show topology`.  Nodes are chosen among the nodes of the Slurm partition, see `slurm_access()`,
+        which are not in one of `UNUSABLE_NODE_STATES`, and requested with `--nodelist`.
+
+        The number of nodes is derived from `num_tasks` and `num_tasks_per_node`, or the number of physical cores per
+        node if the latter isn't set, in which case `num_tasks_per_node` is set to it.  Tests with 'cross-switch' or
+        'cross-group' placements are skipped if they need a single node.
+
+        `placement` is logged, and the following tags are set:
+        - `switches`: the number of leaf switches of the nodes.
+        - `groups`: the number of groups of the nodes.
+    """
+    placement = variable(str, value='default', loggable=True)
+    topology_file = variable(str, type(None), value=None)
+
+    @run_after('setup')
+    def check_placement(self):
+        if self.placement == 'default':
+            return
+        if self.placement not in PLACEMENTS:
+            raise ValueError('invalid placement %r: must be one of %s' % (self.placement, ', '.join(map(repr, PLACEMENTS))))
+        if self.current_partition.scheduler.registered_name not in ('slurm', 'squeue'):
+            self.skip('placement %r needs a Slurm partition' % self.placement)
+
+    @run_before('run')
+    def place_nodes(self):
+        if self.placement == 'default':
+            return
+        topology_file = self.topology_file or self.current_partition.extras.get('topology_file')
+        topology = read_topology(topology_file) if topology_file else slurm_topology()
+
+        slurm_partition_name, exclude_hostlist = slurm_access(self.current_partition)
+        nodeinfo = scheduler_nodes(slurm_partition_name, exclude_hostlist, UNUSABLE_NODE_STATES, ())
+        available = {node['NODELIST'] for node in nodeinfo}
+
+        tasks_per_node = self.num_tasks_per_node or scheduler_info(self.current_partition).pcores_per_node
+        num_nodes = -(-self.num_tasks // tasks_per_node)
+        self.skip_if(num_nodes < 2 and self.placement != 'same-switch',
+                     'placement %r needs at least 2 nodes, got %d' % (self.placement, num_nodes))
+        nodes = placement_nodes(topology, self.placement, num_nodes, available)
+        # spread the tasks as assumed for the nodes requested, rather than as the scheduler chooses:
+        self.num_tasks_per_node = tasks_per_node
+        self.job.options += ['--nodes=%d' % num_nodes, '--nodelist=%s' % compress_hostlist(nodes)]
 
-        return 'Scheduler_Info(%s)' % (', '.join(descr))
+        self.tags |= {'switches=%d' % len({topology.switch[n] for n in nodes}),
+                      'groups=%d' % len({topology.group[n] for n in nodes})}
 
 def sequence(start, end, factor):
     """ Like `range()` but each term is `factor` * previous term.
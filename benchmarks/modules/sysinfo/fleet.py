@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+""" Compare sysinfo records from many nodes: group identical nodes and find outliers.
+
+    Usage:
+        fleet.py SYSINFO_JSON...
+
+    where each SYSINFO_JSON is either a `$HOSTNAME.sysinfo.json` file written by `sysinfo.py` or a
+    `sysinfo.json` file collating these, as written by the `Sysinfo` test.
+
+    Nodes are grouped by the fingerprint of their hardware, firmware and kernel from `sysinfo.py`, as
+    logged with the perflogs of tests.  For each value which differs between nodes, nodes without the
+    most common value are reported as outliers, e.g. a node with a different DIMM type, a NIC at a
+    lower link rate or different ring settings.  A single slow node dominates the results of
+    multi-node benchmarks, so the outliers are also printed as a Slurm `--exclude` option, with a
+    compressed hostlist, e.g. `--exclude=nid[001-003,010]`.
+"""
+
+import fnmatch, json, os, sys
+import pandas as pd
+if __package__:
+    from .sysinfo import fingerprint, fingerprint_info
+    from ..reframe_extras import compress_hostlist
+else: # run as a script, next to `sysinfo.py` and below `reframe_extras.py`
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from sysinfo import fingerprint, fingerprint_info
+    from reframe_extras import compress_hostlist
+
+# Columns which differ between otherwise identical nodes, as fnmatch patterns:
+VOLATILE_COLUMNS = [
+    'hostname',
+    'cpu.CPU MHz',              # current frequency
+    'cpu.CPU(s) scaling MHz',
+    'cpu.BogoMIPS',             # measured at boot
+    'numa.*.memory',            # depends on kernel reservations
+    'memory.total',             # depends on kernel reservations
+    'net.*.descr',              # includes the PCI slot
+]
+
+# Value of columns a node does not have, e.g. for a missing network device:
+MISSING = '(missing)'
+
+def load_sysinfo(paths):
+    """ Load sysinfo records from json files.
+
+        Args:
+            paths: sequence of paths to `$HOSTNAME.sysinfo.json` or collated `sysinfo.json` files
+
+        Returns a dict where keys are hostnames and values are the nested dicts from `sysinfo.get_info()`.
+    """
+    sysinfos = {}
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        if 'hostname' in data: # single host
+            data = {data['hostname']: data}
+        sysinfos.update(data)
+    return sysinfos
+
+def flatten(info, prefix=''):
+    """ Flatten a nested sysinfo dict into a dict of dotted keys -> str, e.g. 'net.eth0.speed'.
+
+        Lists of `key=value` items, e.g. ethtool ring parameters, give one key per item, e.g.
+        'net.eth0.ring_curr.RX'.  Other lists are joined with commas.
+    """
+    flat = {}
+    for k, v in info.items():
+        key = prefix + k
+        if isinstance(v, dict):
+            flat.update(flatten(v, key + '.'))
+        elif isinstance(v, list) and v and all(isinstance(item, str) and '=' in item for item in v):
+            flat.update(flatten(dict(item.split('=', 1) for item in v), key + '.'))
+        elif isinstance(v, list):
+            flat[key] = ','.join(str(item) for item in v)
+        else:
+            flat[key] = str(v)
+    return flat
+
+def sysinfo_table(sysinfos):
+    """ Return a pandas.DataFrame with a row per host and a column per dotted key from `flatten()`.
+
+        Args:
+            sysinfos: dict as returned by `load_sysinfo()`
+
+        All values are str, with `MISSING` where a host has no value for a column.
+    """
+    table = pd.DataFrame.from_dict({host: flatten(info) for host, info in sysinfos.items()}, orient='index', dtype=object)
+    table = table.sort_index().sort_index(axis=1)
+    return table.fillna(MISSING)
+
+def fingerprint_columns(table):
+    """ Return the columns of `table` describing the hardware, firmware and kernel, i.e. those not in `VOLATILE_COLUMNS` """
+    return [c for c in table.columns if not any(fnmatch.fnmatchcase(c, pattern) for pattern in VOLATILE_COLUMNS)]
+
+def node_fingerprints(sysinfos):
+    """ Return a pandas.Series of hostname -> fingerprint, from `sysinfo.fingerprint_info()` of the node's record """
+    fingerprints = {host: fingerprint(fingerprint_info(info)) for host, info in sysinfos.items()}
+    return pd.Series(fingerprints, name='fingerprint', dtype=object).sort_index()
+
+def group_nodes(sysinfos):
+    """ Group identical nodes.
+
+        Args:
+            sysinfos: dict as returned by `load_sysinfo()`
+
+        Returns a pandas.DataFrame indexed by fingerprint, with columns 'nodes' (number of nodes) and
+        'hostnames' (comma-separated), largest group first.
+    """
+    fingerprints = node_fingerprints(sysinfos)
+    groups = pd.DataFrame({
+        'nodes': fingerprints.value_counts(),
+        'hostnames': fingerprints.groupby(fingerprints).apply(lambda s: ','.join(s.index)),
+    })
+    groups.index.name = 'fingerprint'
+    return groups.sort_values('nodes', ascending=False, kind='stable')
+
+def find_outliers(table):
+    """ Find nodes which differ from the rest.
+
+        For each of the `fingerprint_columns()` with more than one value, nodes without the most common
+        value are outliers.  If values are equally common the first in sort order is taken as the most
+        common one.
+
+        Returns a pandas.DataFrame with a row per outlier value and columns 'hostname', 'column', 'value',
+        'common_value' and 'common_nodes' (number of nodes with the most common value).
+    """
+    rows = []
+    for column in fingerprint_columns(table):
+        counts = table[column].value_counts()
+        if len(counts) < 2:
+            continue
+        common = sorted(counts.index, key=lambda v: (-counts[v], v))[0]
+        for host, value in table[column].items():
+            if value != common:
+                rows.append([host, column, value, common, counts[common]])
+    return pd.DataFrame(rows, columns=['hostname', 'column', 'value', 'common_value', 'common_nodes'])
+
+def main():
+    """ CLI entry point for usage in docstring. """
+    if len(sys.argv) < 2:
+        exit('Invalid command line %r, see docstring for usage.' % ' '.join(sys.argv))
+    sysinfos = load_sysinfo(sys.argv[1:])
+    table = sysinfo_table(sysinfos)
+    pd.options.display.max_colwidth = None
+    pd.options.display.width = None
+
+    groups = group_nodes(sysinfos)
+    print('%i nodes in %i groups:' % (len(table), len(groups)))
+    print(groups.to_string())
+    outliers = find_outliers(table)
+    if outliers.empty:
+        print('\nNo outliers.')
+        return
+    print('\nOutliers:')
+    print(outliers.to_string(index=False))
+    print('\n--exclude=%s' % compress_hostlist(sorted(set(outliers['hostname']))))
+
+if __name__ == '__main__':
+    main()
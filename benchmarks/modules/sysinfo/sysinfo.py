@@ -3,149 +3,286 @@
 
     Usage:
         sysinfo.py
-        
-    Information about the current host is saved to a file `$HOSTNAME.sysinfo.json`.
-    
-    It requires the following shell commands to be available:
+        sysinfo.py --fingerprint
+
+    In the first form, information about the current host is saved to a file `$HOSTNAME.sysinfo.json`.
+
+    In the second form, a JSON object with the fingerprint of the current host and the information
+    it is computed from (kernel, firmware and main hardware) is printed, see `get_fingerprint_info()`.
+
+    Information is read from `/proc` and `/sys` where possible.  The following shell commands are
+    used if available, and run concurrently:
     - lscpu
     - lspci
-    - free
-    
+    - ethtool
+
+    Besides hardware, the kernel and firmware versions (BIOS, CPU microcode and network adaptor
+    firmware) are recorded so that nodes can be compared with `fleet.py`.
+
     Root should not be required.
 """
 
-import subprocess, pprint, collections, os, glob, socket, json, sys
+import subprocess, pprint, collections, os, glob, socket, json, sys, hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of commands run at the same time by `get_info()`.
+MAX_WORKERS = 8
+
+# Keys of `cpu_info()`, `net_info()` and of its 'driver' list used in fingerprints:
+FINGERPRINT_CPU_KEYS = ['Model name', 'CPU(s)', 'Socket(s)', 'Microcode']
+FINGERPRINT_NET_KEYS = ['speed', 'card', 'rate', 'link_layer', 'driver']
+FINGERPRINT_DRIVER_KEYS = ['driver', 'version', 'firmware-version']
 
 def read_file(path, default=''):
-    if not os.path.exists(path):
+    """ Return the stripped content of file `path`, or `default` if it can't be read """
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError: # e.g. missing, or the speed of an interface which is down
         return default
-    with open(path) as f:
-        content = f.read().strip()
-    return content
 
-def get_info():
-    """ Return a nested dict with information from the current host """
+def run(cmd):
+    """ Return the stdout (str) of command `cmd`, a list of str, or '' if it can't be run """
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True).stdout
+    except OSError:
+        return ''
 
-    info = {'hostname': socket.gethostname()}
+def key_values(lines):
+    """ Convert `key: value` lines to a list of `key=value` str, skipping empty lines """
+    return ['%s=%s' % tuple(v.strip() for v in line.split(':', 1)) for line in lines if ':' in line]
 
-    # os:
-    uname = subprocess.run(['uname', '-r'], capture_output=True, text=True)
+def os_info():
     with open('/etc/os-release') as f:
-        release = dict(line.replace('"', '').split('=') for line in f.read().splitlines() if line)
-    info['os'] = {
+        release = dict(line.replace('"', '').split('=', 1) for line in f.read().splitlines() if line)
+    return {
         'release': release,
-        'kernel': uname.stdout.strip()
+        'kernel': os.uname().release,
     }
-    
-    # chassis:
+
+def chassis_info():
     DMI_ROOT = '/sys/devices/virtual/dmi/id/'
-    info['chassis'] = {
+    return {
         'product_name': read_file(os.path.join(DMI_ROOT, 'product_name')),
         'sys_vendor': read_file(os.path.join(DMI_ROOT, 'sys_vendor')),
+        'bios_version': read_file(os.path.join(DMI_ROOT, 'bios_version')),
+        'bios_date': read_file(os.path.join(DMI_ROOT, 'bios_date')),
     }
-    
-    # cpu info:
+
+def cpu_info(lscpu):
+    """ Return a dict of str from the output of `lscpu`, or from `/proc/cpuinfo` with the same keys if it is empty.
+
+        The CPU microcode version, if known, is added as 'Microcode'.
+    """
+    processors = [dict((k.strip(), v.strip()) for k, _, v in (line.partition(':') for line in block.splitlines()))
+                  for block in read_file('/proc/cpuinfo').split('\n\n') if block.strip()]
+    first = processors[0] if processors else {}
+
     cpuinfo = {} # key->str, value->str
-    lscpu = subprocess.run(['lscpu'], capture_output=True, text=True)
-    for line in lscpu.stdout.splitlines():
-        if not line.isspace():
-            k, v = line.split(':')
+    for line in lscpu.splitlines():
+        if ':' in line:
+            k, v = line.split(':', 1)
             cpuinfo[k.strip()] = v.strip()
-    info['cpu'] = cpuinfo
+    if 'microcode' in first:
+        cpuinfo['Microcode'] = first['microcode']
+    if lscpu.strip():
+        return cpuinfo
 
-    # network (adaptor) info:
-    info['net'] = {}
-    NETROOT = '/sys/class/net'
-    devnames = [dev for dev in os.listdir(NETROOT) if os.path.exists(os.path.join(NETROOT, dev, 'device'))]
-    for dev in devnames:
-        speed = read_file(os.path.join(NETROOT, dev, 'speed'))
-        if not speed or int(speed) < 1:
-            continue
-        info['net'][dev] = {}
-        info['net'][dev]['speed'] = '%s Mbits/s' % speed # Mbits/sec as per https://www.kernel.org/doc/Documentation/ABI/testing/sysfs-class-net
-        vendor_id = read_file(os.path.join(NETROOT, dev, 'device/vendor'))
-        device_id = read_file(os.path.join(NETROOT, dev, 'device/device'))
-        pci_id = os.path.basename(os.path.realpath(os.path.join(NETROOT, dev, 'device')))  # e.g. '0000:82:00.1'
-        lspci = subprocess.run(['lspci', '-d', '%s:%s' % (vendor_id, device_id), '-nn'], capture_output=True, text=True)
-        for descr in lspci.stdout.splitlines():
-            if descr.split()[0] in pci_id: # descr[0] e.g. '82:00.1'
-                info['net'][dev]['descr'] = descr
-                break
-        
-        # mellanox-specific:
-        card = glob.glob(os.path.join(NETROOT, dev, 'device/infiniband/*'))
-        if card:
-            info['net'][dev]['card'] = os.path.basename(card[0]) # e.g. 'mlx5_0'
-        port_paths = glob.glob(os.path.join(NETROOT, dev, 'device', 'infiniband', 'mlx*', 'ports', '*'))
-        if port_paths:
-            assert len(port_paths) == 1
-            info['net'][dev]['port'] = os.path.basename(port_paths[0]) # e.g. '1'
-            info['net'][dev]['rate'] = read_file(os.path.join(port_paths[0], 'rate')) # e.g. "100 Gb/sec (4X EDR)"
-            info['net'][dev]['link_layer'] = read_file(os.path.join(port_paths[0], 'link_layer')) # e.g. "InfiniBand"
-            
-        # pause options:
-        ethtool_pause = subprocess.run(['ethtool', '--show-pause', dev], capture_output=True, text=True)
-        pause_info = []
-        for line in ethtool_pause.stdout.splitlines()[1:]:
-            if not line:
-                continue
-            pause_info.append('%s=%s' % tuple(v.strip() for v in line.split(':')))
-        #info['net'][dev]['pause_opts'] = ','.join(pause_info)
-        info['net'][dev]['pause_opts'] = pause_info
-
-        #  RX/TX ring parameters
-        ethtool_ring = subprocess.run(['ethtool', '--show-ring', dev], capture_output=True, text=True)
-        ring_info_max = []
-        ring_info_curr = []
-        for line in ethtool_ring.stdout.splitlines()[1:]:
-            if not line:
-                continue
-            if 'Pre-set maximums' in line:
-                ring_info = ring_info_max
-            elif 'Current hardware settings' in line:
-                ring_info = ring_info_curr
-            else:
-                ring_info.append('%s=%s' % tuple(v.strip() for v in line.split(':')))
-        # info['net'][dev]['ring_max'] = ','.join(ring_info_max)
-        # info['net'][dev]['ring_curr'] = ','.join(ring_info_curr)
-        info['net'][dev]['ring_max'] = ring_info_max
-        info['net'][dev]['ring_curr'] = ring_info_curr
-    
-        # features:
-        ethtool_features = subprocess.run(['ethtool', '--show-features', dev], capture_output=True, text=True)
-        feature_info = []
-        for line in ethtool_features.stdout.splitlines()[1:]:
-            if not line:
-                continue
-            feature_info.append('%s=%s' % tuple(v.strip() for v in line.split(':')))
-        # info['net'][dev]['features'] = ','.join(feature_info)
-        info['net'][dev]['features'] = feature_info
-
-    # memory info:
-    # size:
-    free = subprocess.run(['free', '-h', '--si'], capture_output=True, text=True)
-    lines = [line.split() for line in free.stdout.splitlines()]
-    if lines[0][0] != 'total' or lines[1][0] != 'Mem:':
-        raise ValueError('unexpected result from free:\n%s' % free.stdout)
-    meminfo = {'total': lines[1][1]}
+    cpuinfo['Architecture'] = os.uname().machine
+    cpuinfo['CPU(s)'] = str(len(processors))
+    for lscpu_key, cpuinfo_key in [('Vendor ID', 'vendor_id'), ('Model name', 'model name'), ('CPU family', 'cpu family'),
+                                   ('Model', 'model'), ('Stepping', 'stepping'), ('Flags', 'flags')]:
+        if cpuinfo_key in first:
+            cpuinfo[lscpu_key] = first[cpuinfo_key]
+    sockets = {p.get('physical id') for p in processors}
+    cpuinfo['Socket(s)'] = str(len(sockets))
+    return cpuinfo
+
+def numa_info():
+    """ Return a dict of NUMA node name (e.g. 'node0') -> dict with its CPU list, memory and distances to all nodes """
+    numa = {}
+    for node in sorted(glob.glob('/sys/devices/system/node/node[0-9]*'), key=lambda p: int(p.rsplit('node', 1)[1])):
+        memtotal = [line.split(':', 1)[1].strip() for line in read_file(os.path.join(node, 'meminfo')).splitlines()
+                    if 'MemTotal:' in line]
+        numa[os.path.basename(node)] = {
+            'cpus': read_file(os.path.join(node, 'cpulist')),
+            'memory': memtotal[0] if memtotal else '',
+            'distance': read_file(os.path.join(node, 'distance')),
+        }
+    return numa
+
+def human_size_si(size):
+    """ Format `size` in bytes as `free -h --si` does, e.g. '270G' or '7.7G' """
+    power = 1
+    for unit in 'BKMGTPE':
+        if unit == 'B':
+            text = '%d%s' % (size, unit)
+        else:
+            text = '%.1f%s' % (size / power, unit)
+            if len(text) > 4:
+                text = '%d%s' % (size // power, unit)
+        if len(text) <= 4:
+            return text
+        power *= 1000
+    return text
+
+def memory_info():
+    meminfo = dict(line.split(':', 1) for line in read_file('/proc/meminfo').splitlines() if ':' in line)
+    total_kb = int(meminfo['MemTotal'].split()[0])
+    info = {'total': human_size_si(total_kb * 1024)}
     # types:
     mem_types = []
     for dimm in glob.glob('/sys/devices/system/edac/mc/mc*/dimm*'):
         mem_type = read_file(os.path.join(dimm, 'dimm_mem_type'))
         mem_types.append(mem_type)
-    meminfo['types'] = mem_types[0] if len(set(mem_types)) == 1 else mem_types
-    info['memory'] = meminfo
+    info['types'] = mem_types[0] if len(set(mem_types)) == 1 else mem_types
+    return info
+
+def net_devices():
+    """ Return the names of network devices backed by hardware with a known link speed """
+    NETROOT = '/sys/class/net'
+    devnames = []
+    for dev in sorted(os.listdir(NETROOT)):
+        if not os.path.exists(os.path.join(NETROOT, dev, 'device')):
+            continue
+        speed = read_file(os.path.join(NETROOT, dev, 'speed'))
+        if not speed.lstrip('-').isdigit() or int(speed) < 1:
+            continue
+        devnames.append(dev)
+    return devnames
+
+def net_info(dev, lspci, ethtool_pause, ethtool_ring, ethtool_features, ethtool_driver=''):
+    """ Return a dict of information about network device `dev` from sysfs and the outputs of `lspci -nn` and
+        `ethtool --show-pause`, `--show-ring`, `--show-features` and `--driver` for it.
+    """
+    NETROOT = '/sys/class/net'
+    info = {}
+    info['speed'] = '%s Mbits/s' % read_file(os.path.join(NETROOT, dev, 'speed')) # Mbits/sec as per https://www.kernel.org/doc/Documentation/ABI/testing/sysfs-class-net
+    pci_id = os.path.basename(os.path.realpath(os.path.join(NETROOT, dev, 'device')))  # e.g. '0000:82:00.1'
+    for descr in lspci.splitlines():
+        slot = descr.split()[0] if descr.split() else None # e.g. '82:00.1'
+        if slot and (pci_id == slot or pci_id.endswith(':' + slot)):
+            info['descr'] = descr
+            break
+
+    # mellanox-specific:
+    card = glob.glob(os.path.join(NETROOT, dev, 'device/infiniband/*'))
+    if card:
+        info['card'] = os.path.basename(card[0]) # e.g. 'mlx5_0'
+    port_paths = glob.glob(os.path.join(NETROOT, dev, 'device', 'infiniband', 'mlx*', 'ports', '*'))
+    if port_paths:
+        assert len(port_paths) == 1
+        info['port'] = os.path.basename(port_paths[0]) # e.g. '1'
+        info['rate'] = read_file(os.path.join(port_paths[0], 'rate')) # e.g. "100 Gb/sec (4X EDR)"
+        info['link_layer'] = read_file(os.path.join(port_paths[0], 'link_layer')) # e.g. "InfiniBand"
+
+    # pause options:
+    info['pause_opts'] = key_values(ethtool_pause.splitlines()[1:])
 
+    #  RX/TX ring parameters
+    ring_info_max = []
+    ring_info_curr = []
+    ring_info = ring_info_max
+    for line in ethtool_ring.splitlines()[1:]:
+        if 'Pre-set maximums' in line:
+            ring_info = ring_info_max
+        elif 'Current hardware settings' in line:
+            ring_info = ring_info_curr
+        else:
+            ring_info.extend(key_values([line]))
+    info['ring_max'] = ring_info_max
+    info['ring_curr'] = ring_info_curr
+
+    # features:
+    info['features'] = key_values(ethtool_features.splitlines()[1:])
+
+    # driver and firmware versions:
+    info['driver'] = key_values(ethtool_driver.splitlines())
     return info
 
+def get_info(max_workers=MAX_WORKERS):
+    """ Return a nested dict with information from the current host.
+
+        External commands are run concurrently by up to `max_workers` threads, while the rest is
+        read from `/proc` and `/sys`.
+    """
+
+    devnames = net_devices()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        lscpu = pool.submit(run, ['lscpu'])
+        lspci = pool.submit(run, ['lspci', '-nn']) if devnames else None
+        ethtool = {dev: [pool.submit(run, ['ethtool', option, dev])
+                         for option in ('--show-pause', '--show-ring', '--show-features', '--driver')]
+                   for dev in devnames}
+
+        info = {'hostname': socket.gethostname()}
+        info['os'] = os_info()
+        info['chassis'] = chassis_info()
+        info['cpu'] = cpu_info(lscpu.result())
+        info['numa'] = numa_info()
+        info['net'] = {dev: net_info(dev, lspci.result(), *[f.result() for f in ethtool[dev]]) for dev in devnames}
+        info['memory'] = memory_info()
+
+    return info
+
+def fingerprint_info(info):
+    """ Return the kernel, firmware and main hardware from nested dict `info` from `get_info()`.
+
+        Values which differ between otherwise identical nodes, e.g. the hostname, CPU frequency or
+        memory left by kernel reservations, are left out, so these nodes give the same dict.
+    """
+    net = {}
+    for dev, dev_info in info['net'].items():
+        net[dev] = {k: v for k, v in dev_info.items() if k in FINGERPRINT_NET_KEYS}
+        net[dev]['driver'] = [kv for kv in dev_info.get('driver', []) if kv.split('=', 1)[0] in FINGERPRINT_DRIVER_KEYS]
+    return {
+        'os': {'release': info['os']['release'].get('PRETTY_NAME', ''), 'kernel': info['os']['kernel']},
+        'chassis': info['chassis'],
+        'cpu': {k: info['cpu'][k] for k in FINGERPRINT_CPU_KEYS if k in info['cpu']},
+        'numa': {node: v['cpus'] for node, v in info['numa'].items()},
+        'memory': {'types': info['memory']['types']},
+        'net': net,
+    }
+
+def get_fingerprint_info():
+    """ Return `fingerprint_info()` for the current host.
+
+        This is cheaper than `get_info()`: only `lscpu`, as for `get_info()`, and `ethtool --driver`,
+        once per network device, are run.
+    """
+    devnames = net_devices()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        lscpu = pool.submit(run, ['lscpu'])
+        drivers = {dev: pool.submit(run, ['ethtool', '--driver', dev]) for dev in devnames}
+        info = {
+            'os': os_info(),
+            'chassis': chassis_info(),
+            'cpu': cpu_info(lscpu.result()),
+            'numa': numa_info(),
+            'memory': memory_info(),
+            'net': {dev: net_info(dev, '', '', '', '', drivers[dev].result()) for dev in devnames},
+        }
+    return fingerprint_info(info)
+
+def fingerprint(info):
+    """ Return a short hash (str) identifying nested dict `info`, e.g. from `fingerprint_info()` """
+    return hashlib.sha1(json.dumps(info, sort_keys=True).encode()).hexdigest()[:8]
+
 def interrogate_host():
     """ CLI entry point for first usage in docstring. """
     info = get_info()
     with open('%s.sysinfo.json' % info['hostname'], 'w') as f:
         json.dump(info, f, indent=2)
 
+def print_fingerprint():
+    """ CLI entry point for second usage in docstring. """
+    info = get_fingerprint_info()
+    print(json.dumps({'fingerprint': fingerprint(info), 'info': info}))
+
 if __name__ == '__main__':
     if len(sys.argv) == 1:
         interrogate_host()
+    elif sys.argv[1:] == ['--fingerprint']:
+        print_fingerprint()
     else:
         exit('Invalid command line %r, see docstring for usage.' % ' '.join(sys.argv))
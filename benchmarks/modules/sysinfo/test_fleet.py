@@ -0,0 +1,121 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.modules.sysinfo import fleet
+from benchmarks.modules.sysinfo.fleet import (MISSING, find_outliers, fingerprint_columns, flatten, group_nodes, load_sysinfo,
+                                              sysinfo_table)
+
+# Record of a node from `sysinfo.get_info()`, with only some of the values
+NODE_INFO = {
+    "hostname": "nid001",
+    "os": {"release": {"PRETTY_NAME": "Rocky Linux 8.8"}, "kernel": "4.18.0-477.10.1.el8_8.x86_64"},
+    "chassis": {"vendor": "HPE", "product": "ProLiant XL225n Gen10 Plus"},
+    "cpu": {"Model name": "AMD EPYC 7742 64-Core Processor", "CPU(s)": "256", "Socket(s)": "2", "Microcode": "0x830104d",
+            "CPU MHz": "2245.781"},
+    "numa": {"node0": {"cpus": "0-63,128-191", "memory": "257000 MB"}, "node1": {"cpus": "64-127,192-255", "memory": "258000 MB"}},
+    "memory": {"types": ["DDR4 3200 MT/s"], "total": "515000 MB"},
+    "net": {"ib0": {"speed": "100000", "card": "mlx5_0", "rate": "100 Gb/sec (4X EDR)", "link_layer": "InfiniBand",
+                    "driver": ["driver=mlx5_core", "version=5.8-2.0.3", "firmware-version=16.35.2000", "bus-info=0000:41:00.0"],
+                    "ring_curr": ["RX=1024", "TX=1024"], "descr": "Mellanox ConnectX-6 at 0000:41:00.0"}},
+}
+
+def node_info(hostname, changes=()):
+    """ Return `NODE_INFO` for `hostname`, with the values of the (dotted key, value) items of `changes` """
+    info = copy.deepcopy(NODE_INFO)
+    info["hostname"] = hostname
+    for key, value in changes:
+        *parents, name = key.split(".")
+        d = info
+        for parent in parents:
+            d = d[parent]
+        d[name] = value
+    return info
+
+@pytest.fixture
+# Fixture returning the records of five nodes: nid001 to nid003 only differ by volatile values, nid004 has slower
+# DIMMs and nid005 other ring settings
+def sysinfos():
+
+    return {
+        "nid001": node_info("nid001"),
+        "nid002": node_info("nid002", [("cpu.CPU MHz", "1500.000"), ("memory.total", "514000 MB")]),
+        "nid003": node_info("nid003", [("numa.node1.memory", "257500 MB")]),
+        "nid004": node_info("nid004", [("memory.types", ["DDR4 2933 MT/s"])]),
+        "nid005": node_info("nid005", [("net.ib0.ring_curr", ["RX=512", "TX=1024"])]),
+    }
+
+# Test that records are loaded from files of single hosts and collated files
+def test_load_sysinfo(sysinfos, tmp_path):
+
+    (tmp_path / "nid001.sysinfo.json").write_text(json.dumps(sysinfos["nid001"]))
+    (tmp_path / "sysinfo.json").write_text(json.dumps({host: sysinfos[host] for host in ["nid002", "nid003"]}))
+    loaded = load_sysinfo([str(tmp_path / "nid001.sysinfo.json"), str(tmp_path / "sysinfo.json")])
+    assert loaded == {host: sysinfos[host] for host in ["nid001", "nid002", "nid003"]}
+
+# Test that nested records are flattened to dotted keys, with a key per item of `key=value` lists
+def test_flatten():
+
+    flat = flatten(NODE_INFO)
+    assert flat["os.release.PRETTY_NAME"] == "Rocky Linux 8.8"
+    assert flat["numa.node1.cpus"] == "64-127,192-255"
+    assert flat["net.ib0.ring_curr.RX"] == "1024"
+    assert flat["net.ib0.driver.firmware-version"] == "16.35.2000"
+    assert flat["memory.types"] == "DDR4 3200 MT/s"
+    assert flatten({"a": {"b": [1, 2], "c": []}}) == {"a.b": "1,2", "a.c": ""}
+
+# Test that the table has a row per host, with missing values for devices a host doesn't have, and that volatile
+# columns are left out of comparisons
+def test_sysinfo_table(sysinfos):
+
+    sysinfos["nid006"] = node_info("nid006", [("net", {})])
+    table = sysinfo_table(sysinfos)
+    assert list(table.index) == ["nid001", "nid002", "nid003", "nid004", "nid005", "nid006"]
+    assert table.loc["nid006", "net.ib0.speed"] == MISSING
+    assert table.loc["nid001", "net.ib0.speed"] == "100000"
+
+    columns = fingerprint_columns(table)
+    assert "memory.types" in columns and "net.ib0.ring_curr.RX" in columns
+    for volatile in ["hostname", "cpu.CPU MHz", "numa.node0.memory", "memory.total", "net.ib0.descr"]:
+        assert volatile not in columns
+
+# Test that nodes are grouped by fingerprint, ignoring volatile values and values left out of fingerprints
+def test_group_nodes(sysinfos):
+
+    groups = group_nodes(sysinfos)
+    assert groups["nodes"].tolist() == [4, 1]
+    assert groups["hostnames"].tolist() == ["nid001,nid002,nid003,nid005", "nid004"]
+    assert groups.index.name == "fingerprint"
+
+# Test that nodes without the most common value of a column are outliers, ignoring volatile values
+def test_find_outliers(sysinfos):
+
+    outliers = find_outliers(sysinfo_table(sysinfos))
+    assert outliers.values.tolist() == [
+        ["nid004", "memory.types", "DDR4 2933 MT/s", "DDR4 3200 MT/s", 4],
+        ["nid005", "net.ib0.ring_curr.RX", "512", "1024", 4],
+    ]
+    assert find_outliers(sysinfo_table({host: sysinfos[host] for host in ["nid001", "nid002", "nid003"]})).empty
+
+# Test that the command line prints the groups and outliers, with a compressed `--exclude` hostlist
+def test_main(sysinfos, tmp_path, monkeypatch, capsys):
+
+    (tmp_path / "sysinfo.json").write_text(json.dumps(sysinfos))
+    monkeypatch.setattr(sys, "argv", ["fleet.py", str(tmp_path / "sysinfo.json")])
+    fleet.main()
+    out = capsys.readouterr().out
+    assert out.startswith("5 nodes in 2 groups:\n")
+    assert out.endswith("\n--exclude=nid[004-005]\n")
+
+# Test that fleet.py can be run as a script, as well as imported from its package
+def test_script(sysinfos, tmp_path):
+
+    (tmp_path / "sysinfo.json").write_text(json.dumps(sysinfos))
+    script = os.path.join(os.path.dirname(fleet.__file__), "fleet.py")
+    result = subprocess.run([sys.executable, script, str(tmp_path / "sysinfo.json")], stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, cwd=str(tmp_path), check=True)
+    assert result.stdout.decode().endswith("\n--exclude=nid[004-005]\n")
@@ -0,0 +1,93 @@
+import numpy as np
+
+# Example format, one file `rfm_telemetry.<host>.csv` per node with cumulative counters: CPU time
+# (busy and total jiffies), used memory (kB), bytes received/sent by the network interfaces other
+# than the loopback, and by the Infiniband ports (empty if there are none):
+"""
+time,cpu_busy,cpu_total,mem_used_kb,net_rx_bytes,net_tx_bytes,ib_rcv_bytes,ib_xmit_bytes
+1760860800.125,1204851,98127361,5204224,889117236,120332671,,
+1760860801.131,1204951,98127461,5207296,889127236,120342671,,
+"""
+
+# Sampler run on each node until the file `rfm_telemetry.stop` appears, taking a sample every
+# `$1` seconds.  Only the first sampler started on a node records, so that it can be launched with
+# any number of tasks per node.
+TELEMETRY_SAMPLER = r"""#!/bin/sh
+interval="$1"
+host=$(cat /proc/sys/kernel/hostname)
+mkdir rfm_telemetry.$host.lock 2>/dev/null || exit 0
+out=rfm_telemetry.$host.csv
+echo "time,cpu_busy,cpu_total,mem_used_kb,net_rx_bytes,net_tx_bytes,ib_rcv_bytes,ib_xmit_bytes" > $out
+while [ ! -e rfm_telemetry.stop ]; do
+    now=$(date +%s.%N)
+    cpu=$(awk '/^cpu /{t=0; for (i=2; i<=NF; i++) t+=$i; print t-$5-$6 "," t; exit}' /proc/stat)
+    mem=$(awk '/^MemTotal:/{t=$2} /^MemAvailable:/{a=$2} END{print t-a}' /proc/meminfo)
+    rx=0; tx=0
+    for dev in /sys/class/net/*; do
+        [ "${dev##*/}" = lo ] && continue
+        rx=$((rx + $(cat $dev/statistics/rx_bytes 2>/dev/null || echo 0)))
+        tx=$((tx + $(cat $dev/statistics/tx_bytes 2>/dev/null || echo 0)))
+    done
+    ibrx=''; ibtx=''
+    for counters in /sys/class/infiniband/*/ports/*/counters; do
+        [ -r $counters/port_rcv_data ] || continue
+        # in units of 4 bytes
+        ibrx=$((${ibrx:-0} + 4 * $(cat $counters/port_rcv_data)))
+        ibtx=$((${ibtx:-0} + 4 * $(cat $counters/port_xmit_data)))
+    done
+    echo "$now,$cpu,$mem,$rx,$tx,$ibrx,$ibtx" >> $out
+    sleep "$interval"
+done
+"""
+
+
+def read_telemetry(path):
+    """ Read the samples of a node into a NumPy structured array, with a field per column and NaN
+        for missing values, e.g. the Infiniband counters of nodes without Infiniband.
+    """
+    samples = np.genfromtxt(path, delimiter=',', names=True, dtype=float)
+    return np.atleast_1d(samples)
+
+
+def telemetry_summary(paths):
+    """ Summarise the samples of each node in `paths`.
+
+        Returns a dict of name -> (value, unit) with those of the following which could be computed,
+        i.e. for which there are at least two samples:
+            - `peak_memory`: largest used memory of a node
+            - `mean_cpu_utilization`: CPU utilisation of each node over the run, averaged over nodes
+            - `mean_nic_throughput`: bytes received and sent per second by the network interfaces
+              of each node over the run, averaged over nodes
+            - `peak_nic_throughput`: largest bytes received and sent per second by a node between
+              two samples
+            - `mean_ib_throughput` and `peak_ib_throughput`: as above for the Infiniband ports
+    """
+    nodes = [s for s in map(read_telemetry, paths) if len(s) >= 2]
+    if not nodes:
+        return {}
+
+    def rates(samples, *fields):
+        counts = sum(samples[field] for field in fields)
+        return np.diff(counts) / np.diff(samples['time'])
+
+    def run_rate(samples, *fields):
+        counts = sum(samples[field] for field in fields)
+        return (counts[-1] - counts[0]) / (samples['time'][-1] - samples['time'][0])
+
+    summary = {
+        'peak_memory': (max(np.nanmax(s['mem_used_kb']) for s in nodes) / 2**20, 'GiB'),
+        'mean_cpu_utilization': (np.mean([100 * run_rate(s, 'cpu_busy') / run_rate(s, 'cpu_total') for s in nodes]), '%'),
+        'mean_nic_throughput': (np.mean([run_rate(s, 'net_rx_bytes', 'net_tx_bytes') for s in nodes]) / 1e6, 'MB/s'),
+        'peak_nic_throughput': (max(np.max(rates(s, 'net_rx_bytes', 'net_tx_bytes')) for s in nodes) / 1e6, 'MB/s'),
+    }
+    ib_nodes = [s for s in nodes if not np.isnan(s['ib_rcv_bytes']).any()]
+    if ib_nodes:
+        summary['mean_ib_throughput'] = (np.mean([run_rate(s, 'ib_rcv_bytes', 'ib_xmit_bytes') for s in ib_nodes]) / 1e6, 'MB/s')
+        summary['peak_ib_throughput'] = (max(np.max(rates(s, 'ib_rcv_bytes', 'ib_xmit_bytes')) for s in ib_nodes) / 1e6, 'MB/s')
+    return {name: (float(value), unit) for name, (value, unit) in summary.items()}
+
+
+if __name__ == '__main__':
+    import sys
+    for name, (value, unit) in telemetry_summary(sys.argv[1:]).items():
+        print(f'{name}: {value:.4g} {unit}')
@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks.modules.affinity import RankAffinity, affinity_report, format_cpu_list, parse_cpu_list, read_affinity_out
+
+# NUMA nodes of a host with two sockets of 32 CPUs, one NUMA node per socket
+NUMA_NODES = {0: (frozenset(range(0, 32)), 0), 1: (frozenset(range(32, 64)), 1)}
+
+def rank(n, cpus, host="node001"):
+    """ Return the RankAffinity of rank `n` on `host`, allowed on the CPUs of Linux CPU list `cpus` """
+    return RankAffinity(n, host, parse_cpu_list(cpus), frozenset({0, 1}), NUMA_NODES)
+
+# Test that Linux CPU lists round-trip
+@pytest.mark.parametrize("cpu_list, cpus", [
+    ("0-3,8", {0, 1, 2, 3, 8}),
+    ("5", {5}),
+    ("0,2,4-5", {0, 2, 4, 5}),
+    ("", set()),
+])
+def test_cpu_list_round_trip(cpu_list, cpus):
+
+    assert parse_cpu_list(cpu_list) == cpus
+    assert format_cpu_list(cpus) == cpu_list
+
+# Test that the output of the probe is read into ranks sorted by rank, ignoring other lines
+def test_read_affinity_out(tmp_path):
+
+    path = tmp_path / "rfm_affinity.out"
+    path.write_text("affinity rank=1 host=node001 cpus=32-35 mems=0-1 node0=0-31@0 node1=32-63@1\n"
+                    "some other output\n"
+                    "affinity rank=0 host=node001 cpus=0-3 mems=0-1 node0=0-31@0 node1=32-63@1\n")
+    assert read_affinity_out(str(path)) == [rank(0, "0-3"), rank(1, "32-35")]
+
+# Test that well-pinned ranks give a report without warnings
+def test_affinity_report():
+
+    report = affinity_report([rank(0, "0-3"), rank(1, "32-35"), rank(2, "0-3", "node002")], 3, 4)
+    assert report["warnings"] == []
+    assert report["ranks"][1] == {"rank": 1, "host": "node001", "cpus": "32-35", "mems": "0-1", "numa_nodes": [1], "sockets": [1]}
+    assert [r["host"] for r in report["ranks"]] == ["node001", "node001", "node002"]
+
+# Test the warnings for the problems found
+@pytest.mark.parametrize("ranks, num_tasks, num_cpus_per_task, warnings", [
+    ([rank(0, "0-3")], 3, 4, ["2 of 3 ranks did not report their affinity, e.g. rank 1"]),
+    ([rank(0, "0-1"), rank(1, "2-3")], 2, 4, ["node001 is oversubscribed: 8 threads of 2 ranks on 4 CPUs"]),
+    ([rank(0, "0-3"), rank(1, "2-5")], 2, 2, ["2 ranks on node001 share CPUs with other ranks, e.g. rank 0"]),
+    ([rank(0, "0-63"), rank(1, "0-63")], 2, 4, ["2 ranks on node001 are not bound, e.g. rank 0"]),
+    ([rank(0, "30-33"), rank(1, "34-37")], 2, 4, ["rank 0 on node001 spans 2 sockets: CPUs 30-33"]),
+])
+def test_affinity_report_warnings(ranks, num_tasks, num_cpus_per_task, warnings):
+
+    assert affinity_report(ranks, num_tasks, num_cpus_per_task)["warnings"] == warnings
+
+# Test that ranks whose threads need more than a socket may span sockets, and that a single rank may use all CPUs
+def test_affinity_report_allowed():
+
+    assert affinity_report([rank(0, "0-39"), rank(1, "0-39", "node002")], 2, 40)["warnings"] == []
+    assert affinity_report([rank(0, "0-63")], 1, 64)["warnings"] == []
@@ -0,0 +1,143 @@
+import pytest
+
+from benchmarks.modules.imb import ImbColumn, imb_column, iter_imb_out, read_imb_out, read_imb_tables
+
+# Output of IMB-MPI1 with PingPong and Uniband over 2 processes and Allreduce over 2 and 4 processes
+IMB_MPI1_OUTPUT = """#------------------------------------------------------------
+#    Intel(R) MPI Benchmarks 2019 Update 6, MPI-1 part
+#------------------------------------------------------------
+# List of Benchmarks to run:
+
+# PingPong
+# Uniband
+# Allreduce
+
+#---------------------------------------------------
+# Benchmarking PingPong
+# #processes = 2
+#---------------------------------------------------
+       #bytes #repetitions      t[usec]   Mbytes/sec
+            0         1000         2.25         0.00
+            1         1000         2.30         0.43
+      4194304           10       850.00      4934.42
+
+#---------------------------------------------------
+# Benchmarking Uniband
+# #processes = 2
+#---------------------------------------------------
+       #bytes #repetitions   Mbytes/sec      Msg/sec
+            0         1000         0.00      2189915
+            1         1000         1.98      1984211
+
+#----------------------------------------------------------------
+# Benchmarking Allreduce
+# #processes = 2
+# ( 2 additional processes waiting in MPI_Barrier)
+#----------------------------------------------------------------
+       #bytes #repetitions  t_min[usec]  t_max[usec]  t_avg[usec]
+            0         1000         0.03         0.04         0.03
+            4         1000         1.10         1.30         1.20
+
+#----------------------------------------------------------------
+# Benchmarking Allreduce
+# #processes = 4
+#----------------------------------------------------------------
+       #bytes #repetitions  t_min[usec]  t_max[usec]  t_avg[usec]
+            0         1000         0.03         0.05         0.04
+            4         1000         1.90         2.20         2.00
+
+
+# All processes entering MPI_Finalize
+"""
+
+# Output of IMB-RMA with a benchmark run in two modes
+IMB_RMA_OUTPUT = """#---------------------------------------------------
+# Benchmarking Unidir_Put
+# #processes = 2
+#---------------------------------------------------
+#
+#    MODE: NON-AGGREGATE
+#
+       #bytes #repetitions      t[usec]   Mbytes/sec
+            0         1000         0.04         0.00
+            8         1000         1.50         5.33
+
+#---------------------------------------------------
+# Benchmarking Unidir_Put
+# #processes = 2
+#---------------------------------------------------
+#
+#    MODE: AGGREGATE
+#
+       #bytes #repetitions      t[usec]   Mbytes/sec
+            0         1000         0.02         0.00
+            8         1000         0.75        10.67
+"""
+
+@pytest.fixture
+# Fixture writing `IMB_MPI1_OUTPUT` and returning its path
+def imb_mpi1(tmp_path):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(IMB_MPI1_OUTPUT)
+    return str(path)
+
+# Test that column titles give names, units and types, from the registry or the title
+def test_imb_column():
+
+    assert imb_column("#bytes") == ImbColumn("#bytes", "bytes", "B", int)
+    assert imb_column("Mbytes/sec") == ImbColumn("Mbytes/sec", "bandwidth", "Mbytes/sec", float)
+    assert imb_column("t_avg[usec]") == ImbColumn("t_avg[usec]", "t_avg", "usec", float)
+    assert imb_column("t[usec]") == ImbColumn("t[usec]", "t", "usec", float)
+
+# Test that all the results tables of a file are read in order, with their benchmark and number of processes
+def test_read_imb_tables(imb_mpi1):
+
+    tables = read_imb_tables(imb_mpi1)
+    assert [(t.benchmark, t.n_procs, t.mode) for t in tables] == [
+        ("PingPong", 2, None), ("Uniband", 2, None), ("Allreduce", 2, None), ("Allreduce", 4, None),
+    ]
+    pingpong = tables[0]
+    assert [c.name for c in pingpong.columns] == ["bytes", "repetitions", "t", "bandwidth"]
+    assert pingpong.column("bytes").tolist() == [0, 1, 4194304]
+    assert pingpong.column("t").tolist() == [2.25, 2.3, 850.0]
+    assert tables[3].column("t_avg").tolist() == [0.04, 2.0]
+    with pytest.raises(KeyError, match="No column message_rate"):
+        pingpong.column("message_rate")
+    # arrays are shared through the cache
+    assert read_imb_tables(imb_mpi1) is tables
+    with pytest.raises(ValueError):
+        pingpong.column("t")[0] = 0
+
+# Test that the tables of a benchmark are returned by number of processes
+def test_read_imb_out(imb_mpi1):
+
+    allreduce = read_imb_out(imb_mpi1, "allreduce")
+    assert sorted(allreduce) == [2, 4]
+    assert allreduce[4][4].tolist() == [0.04, 2.0]
+    assert read_imb_out(imb_mpi1, "PingPong")[2][3].tolist() == [0.0, 0.43, 4934.42]
+    assert read_imb_out(imb_mpi1, "Barrier") == {}
+    # without a benchmark, the first table for each number of processes
+    assert [data[0].tolist() for data in read_imb_out(imb_mpi1).values()] == [[0, 1, 4194304], [0, 4]]
+
+# Test that benchmarks run in several modes give a table per mode, the first of which is returned by `read_imb_out()`
+def test_read_imb_modes(tmp_path):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(IMB_RMA_OUTPUT)
+    assert [(t.benchmark, t.mode) for t in iter_imb_out(str(path))] == [
+        ("Unidir_Put", "NON-AGGREGATE"), ("Unidir_Put", "AGGREGATE"),
+    ]
+    assert read_imb_out(str(path), "unidir_put")[2][2].tolist() == [0.04, 1.5]
+
+# Test that results tables which can't be read are rejected
+@pytest.mark.parametrize("output, error", [
+    (IMB_MPI1_OUTPUT.replace("# #processes = 4\n", ""), "expected \"# #processes = \" before the results of Allreduce"),
+    (IMB_MPI1_OUTPUT.replace("2.30         0.43", "2.30"), "Results of PingPong .* do not match columns"),
+])
+def test_read_imb_invalid(tmp_path, output, error):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(output)
+    with pytest.raises(ValueError, match=error):
+        read_imb_tables(str(path))
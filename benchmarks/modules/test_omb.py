@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from benchmarks.modules.omb import OmbColumn, omb_column, read_omb_out, read_omb_table
+
+# Outputs of OMB benchmarks with the formats listed in `omb`
+BW_OUTPUT = """
+# OSU MPI Bandwidth Test v5.6.2
+# Size      Bandwidth (MB/s)
+1                       7.59
+2                      14.52
+4194304              9876.54
+"""
+
+MBW_MR_OUTPUT = """# OSU MPI Multiple Bandwidth / Message Rate Test v5.6.2
+# [ pairs: 1 ] [ window size: 64 ]
+# Size                  MB/s        Messages/s
+1                       7.79        7790845.03
+2                      15.93        7962625.43
+"""
+
+IALLREDUCE_OUTPUT = """# OSU MPI Non-blocking Allreduce Latency Test v5.6.2
+# Overall = Coll. Init + Compute + MPI_Test + MPI_Wait
+
+# Size           Overall(us)       Compute(us)    Pure Comm.(us)        Overlap(%)
+4                      12.20              6.68              5.23             -5.73
+8                      12.40              6.70              5.30             -4.00
+"""
+
+BARRIER_OUTPUT = """# OSU MPI Barrier Latency Test v5.6.2
+# Avg Latency(us)
+             3.20
+"""
+
+# Test that column titles give names, units and types, from the registry or the title
+def test_omb_column():
+
+    assert omb_column("Size") == OmbColumn("Size", "size", "B", int)
+    assert omb_column("Messages/s") == OmbColumn("Messages/s", "message_rate", "messages/s", float)
+    assert omb_column("Bandwidth (MB/s)") == OmbColumn("Bandwidth (MB/s)", "bandwidth", "MB/s", float)
+    assert omb_column("Pure Comm.(us)") == OmbColumn("Pure Comm.(us)", "pure_comm", "us", float)
+    assert omb_column("Overlap(%)") == OmbColumn("Overlap(%)", "overlap", "%", float)
+    assert omb_column("Latency") == OmbColumn("Latency", "latency", None, float)
+
+# Test reading the results tables of the different OMB output formats
+@pytest.mark.parametrize("output, benchmark, names, first_row", [
+    (BW_OUTPUT, "OSU MPI Bandwidth Test", ["size", "bandwidth"], (1, 7.59)),
+    (MBW_MR_OUTPUT, "OSU MPI Multiple Bandwidth / Message Rate Test", ["size", "bandwidth", "message_rate"], (1, 7.79, 7790845.03)),
+    (IALLREDUCE_OUTPUT, "OSU MPI Non-blocking Allreduce Latency Test",
+     ["size", "overall", "compute", "pure_comm", "overlap"], (4, 12.2, 6.68, 5.23, -5.73)),
+    (BARRIER_OUTPUT, "OSU MPI Barrier Latency Test", ["avg_latency"], (3.2,)),
+])
+def test_read_omb_table(tmp_path, output, benchmark, names, first_row):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(output)
+    table = read_omb_table(str(path))
+    assert table.benchmark == benchmark
+    assert [c.name for c in table.columns] == names
+    assert next(zip(*table.data)) == pytest.approx(first_row)
+    assert read_omb_out(str(path)) is table.data
+
+# Test column access and the types of the columns
+def test_omb_table_columns(tmp_path):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(BW_OUTPUT)
+    table = read_omb_table(str(path))
+    assert table.column("size").dtype == int
+    assert table.column("size").tolist() == [1, 2, 4194304]
+    assert np.allclose(table.column("bandwidth"), [7.59, 14.52, 9876.54])
+    with pytest.raises(KeyError, match="No column latency"):
+        table.column("latency")
+    # arrays are shared through the cache
+    with pytest.raises(ValueError):
+        table.column("size")[0] = 0
+
+# Test that parsed outputs are cached until the file changes
+def test_read_omb_table_cached(tmp_path):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(BW_OUTPUT)
+    assert read_omb_table(str(path)) is read_omb_table(str(path))
+    path.write_text(BW_OUTPUT + "8388608             10000.00\n")
+    assert read_omb_table(str(path)).column("size").tolist() == [1, 2, 4194304, 8388608]
+
+# Test that outputs which are not OMB results tables are rejected
+@pytest.mark.parametrize("output, error", [
+    ("Segmentation fault\n", "Could not find the name of an OSU benchmark"),
+    ("# OSU MPI Bandwidth Test v5.6.2\n", "Could not find the column titles"),
+    (BW_OUTPUT + "8                      29.10     1.0\n", "do not match columns"),
+])
+def test_read_omb_table_invalid(tmp_path, output, error):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text(output)
+    with pytest.raises(ValueError, match=error):
+        read_omb_table(str(path))
@@ -0,0 +1,64 @@
+import pytest
+
+from benchmarks.modules.perf_stat import PerfStat, perf_stat_files, perf_stat_metrics, read_perf_stat
+
+# Output of `PERF_STAT_WRAPPER` for rank 0, over 0.5 s
+RANK0_OUTPUT = """# started on Mon Oct 19 08:00:00 2026
+
+1000000000,,cycles:u,500000000,100.00,,
+2000000000,,instructions:u,500000000,100.00,2.00,insn per cycle
+4000000,,cache-misses:u,500000000,100.00,,
+1000000,,LLC-load-misses:u,500000000,100.00,,
+<not supported>,,LLC-store-misses:u,0,100.00,,
+# time,1760860800.25,1760860800.75
+"""
+
+# Output of `PERF_STAT_WRAPPER` for rank 1, over 1 s
+RANK1_OUTPUT = """1000000000,,cycles,1000000000,100.00,,
+2000000000,,instructions,1000000000,100.00,2.00,insn per cycle
+4000000,,cache-misses,1000000000,100.00,,
+3000000,,LLC-load-misses,1000000000,100.00,,
+1000000,,LLC-store-misses,1000000000,100.00,,
+# time,1760860800.0,1760860801.0
+"""
+
+@pytest.fixture
+# Fixture writing the outputs of ranks 0 and 1 and returning their directory
+def perf_stat_dir(tmp_path):
+
+    (tmp_path / "rfm_perf_stat.0.csv").write_text(RANK0_OUTPUT)
+    (tmp_path / "rfm_perf_stat.1.csv").write_text(RANK1_OUTPUT)
+    (tmp_path / "rfm_job.out").write_text("")
+    return tmp_path
+
+# Test that counters are read without event modifiers, with None for events which were not counted
+def test_read_perf_stat(perf_stat_dir):
+
+    stat = read_perf_stat(str(perf_stat_dir / "rfm_perf_stat.0.csv"))
+    assert stat.counters == {"cycles": 1e9, "instructions": 2e9, "cache-misses": 4e6, "LLC-load-misses": 1e6, "LLC-store-misses": None}
+    assert stat.elapsed == pytest.approx(0.5)
+
+    (perf_stat_dir / "unavailable.csv").write_text("# perf stat unavailable on node001\n")
+    assert read_perf_stat(str(perf_stat_dir / "unavailable.csv")) == PerfStat({}, None)
+
+# Test that metrics are derived from the counters summed over ranks and the longest elapsed time
+def test_perf_stat_metrics(perf_stat_dir):
+
+    paths = perf_stat_files(str(perf_stat_dir))
+    assert paths == [str(perf_stat_dir / "rfm_perf_stat.0.csv"), str(perf_stat_dir / "rfm_perf_stat.1.csv")]
+    metrics = perf_stat_metrics(paths)
+    # an event not counted on one rank has no total
+    assert sorted(metrics) == ["cache_misses_per_kinst", "ipc"]
+    assert metrics["ipc"] == (pytest.approx(2.0), "insn/cycle")
+    assert metrics["cache_misses_per_kinst"] == (pytest.approx(2.0), "misses/kinst")
+
+    metrics = perf_stat_metrics(paths[1:])
+    assert metrics["llc_misses_per_kinst"] == (pytest.approx(2.0), "misses/kinst")
+    assert metrics["llc_bandwidth"] == (pytest.approx(4e6 * 64 / 1e9), "GB/s")
+
+# Test that no metrics are derived where perf stat was unavailable
+def test_perf_stat_metrics_unavailable(tmp_path):
+
+    (tmp_path / "rfm_perf_stat.0.csv").write_text("# perf stat unavailable on node001\n")
+    assert perf_stat_metrics(perf_stat_files(str(tmp_path))) == {}
+    assert perf_stat_metrics([]) == {}
@@ -0,0 +1,68 @@
+import collections
+
+import pytest
+
+from benchmarks.modules.profiling import collapse_perf_script, hot_spots, write_folded
+
+# Output of `perf script` with four samples: headers with and without CPU and thread IDs, an unknown
+# symbol, a recursive call and a last sample without a trailing blank line
+PERF_SCRIPT_OUTPUT = """IMB-MPI1 12345 1234.567890:     250000 cycles:u:
+            55d1c2e3f4a5 compute+0x15 (/path/to/bin)
+            55d1c2e3f400 main+0x20 (/path/to/bin)
+            7f0d3c829d8f __libc_start_main+0xf3 (/usr/lib64/libc-2.28.so)
+
+IMB-MPI1 12345/12346 [003] 1234.568890:     250000 cycles:u:
+            55d1c2e3f4a5 compute+0x15 (/path/to/bin)
+            55d1c2e3f400 main+0x20 (/path/to/bin)
+            7f0d3c829d8f __libc_start_main+0xf3 (/usr/lib64/libc-2.28.so)
+
+IMB-MPI1 12345 1234.569890:     250000 cycles:u:
+            7f0d3c0000aa [unknown] ([unknown])
+            55d1c2e3f500 solve+0x8 (/path/to/bin)
+            55d1c2e3f501 solve+0x40 (/path/to/bin)
+            55d1c2e3f400 main+0x20 (/path/to/bin)
+
+IMB-MPI1 12345 1234.570890:     250000 cycles:u:
+            55d1c2e3f500 solve+0x8 (/path/to/bin)
+            55d1c2e3f400 main+0x20 (/path/to/bin)"""
+
+@pytest.fixture
+# Fixture returning the stacks collapsed from `PERF_SCRIPT_OUTPUT`
+def stacks(tmp_path):
+
+    path = tmp_path / "rfm_perf.0.script"
+    path.write_text(PERF_SCRIPT_OUTPUT)
+    return collapse_perf_script(str(path))
+
+# Test that samples are collapsed to stacks from the command name to the innermost function, without offsets or modules
+def test_collapse_perf_script(stacks):
+
+    assert stacks == collections.Counter({
+        ("IMB-MPI1", "__libc_start_main", "main", "compute"): 2,
+        ("IMB-MPI1", "main", "solve", "solve", "[unknown]"): 1,
+        ("IMB-MPI1", "main", "solve"): 1,
+    })
+
+# Test that hot spots count samples in each function itself and in its callees, once per sample for recursive calls,
+# ordered by self then total samples
+def test_hot_spots(stacks):
+
+    assert hot_spots(stacks) == [
+        ("compute", 50.0, 50.0),
+        ("solve", 25.0, 50.0),
+        ("[unknown]", 25.0, 25.0),
+        ("main", 0.0, 100.0),
+        ("__libc_start_main", 0.0, 50.0),
+    ]
+    assert [function for function, _, _ in hot_spots(stacks, top=2)] == ["compute", "solve"]
+    assert hot_spots(collections.Counter()) == []
+
+# Test that collapsed stacks are written in the folded format of FlameGraph
+def test_write_folded(stacks, tmp_path):
+
+    write_folded(stacks, str(tmp_path / "rfm_perf.folded"))
+    assert (tmp_path / "rfm_perf.folded").read_text().splitlines() == [
+        "IMB-MPI1;__libc_start_main;main;compute 2",
+        "IMB-MPI1;main;solve 1",
+        "IMB-MPI1;main;solve;solve;[unknown] 1",
+    ]
@@ -0,0 +1,540 @@
+import json
+import os
+import types
+
+import pytest
+import reframe.core.config
+import reframe.core.logging
+
+import benchmarks.modules.reframe_extras as reframe_extras
+from benchmarks.modules.reframe_extras import (AdaptiveScalingTest, BuildCache, CachedRunTest, NetworkTopology, PbsInfo,
+                                               ScalingCase, Scheduler_Info, SgeInfo, StaticInfo, compress_hostlist,
+                                               expand_hostlist, local_size_between, placement_nodes, read_topology,
+                                               perflog_dir, round_robin, scaling_config, scaling_sweep, scheduler_info,
+                                               scheduler_nodes, slurm_node_info, socket_aligned, tasks_divide,
+                                               ttl_cache)
+
+# Test that an executable stored in the build cache is fetched by hardlinking it
+def test_build_cache_store_fetch(tmp_path):
+
+    cache = BuildCache(str(tmp_path / "builds"), 1024)
+    exe = tmp_path / "stage" / "exe"
+    exe.parent.mkdir()
+    exe.write_bytes(b"binary")
+    key = "ab" + "0" * 62
+
+    # entries are sharded by the first two characters of their key
+    assert cache.path(key) == str(tmp_path / "builds" / "ab" / key)
+    assert not os.path.exists(cache.path(key))
+    cache.store(key, str(exe))
+    assert os.path.exists(cache.path(key))
+    # no temporary files are left behind
+    assert os.listdir(tmp_path / "builds" / "ab") == [key]
+
+    # fetching replaces any existing file at the destination
+    dest = tmp_path / "other" / "bin" / "exe"
+    dest.parent.mkdir(parents=True)
+    dest.write_bytes(b"stale")
+    cache.fetch(key, str(dest))
+    assert dest.read_bytes() == b"binary"
+    assert os.stat(dest).st_ino == os.stat(cache.path(key)).st_ino
+
+# Test that the least recently used entries are evicted once the cache is too large
+def test_build_cache_evict(tmp_path):
+
+    cache = BuildCache(str(tmp_path / "builds"), 20)
+    keys = [c * 64 for c in "abc"]
+    for key in keys:
+        src = tmp_path / key
+        src.write_bytes(b"0123456789")
+        if key == keys[2]:
+            # make `a` more recently used than `b`, then store `c`
+            os.utime(cache.path(keys[0]), (1, 1))
+            os.utime(cache.path(keys[1]), (2, 2))
+            cache.fetch(keys[0], str(tmp_path / "exe"))
+        cache.store(key, str(src))
+
+    assert os.path.exists(cache.path(keys[0]))
+    assert not os.path.exists(cache.path(keys[1]))
+    assert os.path.exists(cache.path(keys[2]))
+
+# Test double with the replay methods of `CachedRunTest`, outside of a ReFrame session
+class CachedRun:
+    saved_output_dir = CachedRunTest.saved_output_dir
+    replayed_files = CachedRunTest.replayed_files
+    replay_saved_output = CachedRunTest.replay_saved_output
+
+    def __init__(self, tmp_path, **variables):
+        self.use_cache = str(tmp_path / "cache")
+        self.cache_replay = "link"
+        self.cache_files = None
+        self.outputdir = str(tmp_path / "output" / "sys" / "part" / "env" / "Test")
+        self.stagedir = str(tmp_path / "stage" / "sys" / "part" / "env" / "Test")
+        self.job = types.SimpleNamespace(stdout="rfm_job.out", stderr="rfm_job.err")
+        vars(self).update(variables)
+        os.makedirs(self.stagedir)
+
+@pytest.fixture
+# Fixture saving the output of a test in `<tmp_path>/cache`, with `<tmp_path>/output` as the ReFrame output prefix
+def saved_output(tmp_path, monkeypatch):
+
+    saved = tmp_path / "cache" / "sys" / "part" / "env" / "Test"
+    (saved / "rsl").mkdir(parents=True)
+    for name, content in [("rfm_job.out", "hello"), ("rfm_job.err", ""), ("result.txt", "v=42"), ("rsl/rsl.out.0000", "ok"), ("big.dat", "big")]:
+        (saved / name).write_text(content)
+    monkeypatch.setattr("reframe.core.runtime.runtime", lambda: types.SimpleNamespace(output_prefix=str(tmp_path / "output")))
+    return saved
+
+# Test that all saved files are hardlinked into the stage directory by default, replacing the output of the no-op run
+def test_cached_run_replay_all(tmp_path, saved_output):
+
+    test = CachedRun(tmp_path)
+    with open(os.path.join(test.stagedir, "rfm_job.out"), "w") as f:
+        f.write("noop")
+    test.replay_saved_output()
+
+    assert test.replayed_files(str(saved_output)) == ["big.dat", "result.txt", "rfm_job.err", "rfm_job.out", os.path.join("rsl", "rsl.out.0000")]
+    for relpath in test.replayed_files(str(saved_output)):
+        staged = os.path.join(test.stagedir, relpath)
+        assert os.stat(staged).st_ino == os.stat(saved_output / relpath).st_ino
+    with open(os.path.join(test.stagedir, "rfm_job.out")) as f:
+        assert f.read() == "hello"
+
+# Test that only the files matching `cache_files`, by relative path or file name, and the job's output are replayed
+def test_cached_run_replay_cache_files(tmp_path, saved_output):
+
+    test = CachedRun(tmp_path, cache_files=["rsl.out.*", "result.txt"], cache_replay="copy")
+    test.replay_saved_output()
+
+    assert sorted(os.listdir(test.stagedir)) == ["result.txt", "rfm_job.err", "rfm_job.out", "rsl"]
+    assert os.listdir(os.path.join(test.stagedir, "rsl")) == ["rsl.out.0000"]
+    # copies are independent of the saved files
+    assert os.stat(os.path.join(test.stagedir, "result.txt")).st_ino != os.stat(saved_output / "result.txt").st_ino
+
+# Test that replay errors are reported and that nothing is replayed without `use_cache`
+def test_cached_run_replay_errors(tmp_path, saved_output):
+
+    with pytest.raises(ValueError, match="invalid cache_replay"):
+        CachedRun(tmp_path, cache_replay="move").replay_saved_output()
+
+    test = CachedRun(tmp_path / "other", use_cache=str(tmp_path / "missing"))
+    with pytest.raises(ValueError, match="does not exist"):
+        test.replay_saved_output()
+
+    test = CachedRun(tmp_path / "disabled", use_cache=False)
+    test.replay_saved_output()
+    assert os.listdir(test.stagedir) == []
+
+# Test that results are cached by arguments until they are older than the time to live
+def test_ttl_cache(monkeypatch):
+
+    now = [100.0]
+    monkeypatch.setattr(reframe_extras.time, "monotonic", lambda: now[0])
+    calls = []
+    @ttl_cache(60)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(2) == 4
+    assert square(3) == 9
+    now[0] += 59
+    assert square(2) == 4
+    assert calls == [2, 3]
+    # expired
+    now[0] += 1
+    assert square(2) == 4
+    assert calls == [2, 3, 2]
+    square.cache_clear()
+    assert square(3) == 9
+    assert calls == [2, 3, 2, 3]
+
+# Output of `sinfo --Node --long` for a default partition with nodes in various states and a second partition
+SINFO_OUTPUT = """Mon Oct 19 08:00:00 2026
+NODELIST   NODES PARTITION       STATE CPUS    S:C:T MEMORY TMP_DISK WEIGHT AVAIL_FE REASON
+nid001         1  standard*       idle 128   2:32:2 256000        0      1   (null) none
+nid002         1  standard*  allocated 128   2:32:2 256000        0      1   (null) none
+nid003         1  standard*      down* 128   2:32:2 256000        0      1   (null) Not_responding
+nid004         1  standard*    drained 128   2:32:2 256000        0      1   (null) maintenance
+gpu001         1        gpu       idle  64   2:16:2 512000        0      1   (null) none
+"""
+
+# Output of `pbsnodes -a` for Torque nodes in various states
+PBSNODES_OUTPUT = """node01
+     state = free
+     np = 16
+     properties = batch
+
+node02
+     state = down,offline
+     np = 16
+
+node03
+     state = job-exclusive
+     np = 16
+"""
+
+# Output of `qhost` for SGE hosts, one of which doesn't report its load, and of `qselect` for a queue
+QHOST_OUTPUT = """HOSTNAME                ARCH         NCPU NSOC NCOR NTHR  LOAD  MEMTOT  MEMUSE  SWAPTO  SWAPUS
+----------------------------------------------------------------------------------------------
+global                  -               -    -    -    -     -       -       -       -       -
+node01.cluster          lx-amd64       32    2   16   32  0.01  125.8G    2.1G    4.0G     0.0
+node02.cluster          lx-amd64       32    2   16   32     -  125.8G       -    4.0G       -
+node03.cluster          lx-amd64       32    2   16   32  1.00  125.8G    2.1G    4.0G     0.0
+node04.cluster          lx-amd64       32    2   16   32  1.00  125.8G    2.1G    4.0G     0.0
+"""
+QSELECT_OUTPUT = """all.q@node01.cluster
+all.q@node02.cluster
+all.q@node03.cluster
+"""
+
+# Outputs of the scheduler commands used by `scheduler_commands`
+SCHEDULER_OUTPUTS = {"sinfo": SINFO_OUTPUT, "pbsnodes": PBSNODES_OUTPUT, "qhost": QHOST_OUTPUT, "qselect": QSELECT_OUTPUT}
+
+@pytest.fixture
+# Fixture replacing the scheduler commands with `SCHEDULER_OUTPUTS`, returning the list of commands run
+def scheduler_commands(monkeypatch):
+
+    commands = []
+    def run(cmd, **kwargs):
+        commands.append(cmd)
+        return types.SimpleNamespace(stdout=SCHEDULER_OUTPUTS[cmd[0]].encode())
+    monkeypatch.setattr(reframe_extras.subprocess, "run", run)
+    cached = [reframe_extras.sinfo_nodes_output, scheduler_nodes, reframe_extras.pbs_node_info,
+              reframe_extras.sge_host_info, reframe_extras.sge_queue_hosts]
+    for fn in cached:
+        fn.cache_clear()
+    yield commands
+    for fn in cached:
+        fn.cache_clear()
+
+# Test that the nodes of a Slurm partition are filtered, with `sinfo` run once for all filters
+def test_scheduler_nodes(scheduler_commands):
+
+    assert [node["S:C:T"] for node in slurm_node_info()] == ["2:32:2"] * 4 + ["2:16:2"]
+
+    def names(nodes):
+        return [node["NODELIST"] for node in nodes]
+    # default partition only
+    assert names(scheduler_nodes(None, None, (), ())) == ["nid001", "nid002", "nid003", "nid004"]
+    assert names(scheduler_nodes(None, "nid[001-002]", (), ())) == ["nid003", "nid004"]
+    # states are matched without the `*` of non-responding nodes
+    assert names(scheduler_nodes(None, None, ("down", "drained"), ())) == ["nid001", "nid002"]
+    assert names(scheduler_nodes(None, None, (), ("idle",))) == ["nid001"]
+    assert scheduler_commands == [["sinfo", "--Node", "--long"]]
+
+    # repeated queries are served from the cache
+    assert scheduler_nodes(None, None, (), ()) is scheduler_nodes(None, None, (), ())
+    assert len(scheduler_commands) == 1
+
+# Test that hostlist expressions are expanded and compressed back without Slurm
+@pytest.mark.parametrize("hostlist, hostnames", [
+    # single hosts
+    ("login", ["login"]),
+    ("nid001", ["nid001"]),
+    ("nid001,login", ["nid001", "login"]),
+    # ranges and lists with zero padding
+    ("nid[001-128,200]", ["nid%03d" % i for i in range(1, 129)] + ["nid200"]),
+    ("n[08-11]", ["n08", "n09", "n10", "n11"]),
+    ("n[9-11]", ["n9", "n10", "n11"]),
+    # numbers of different widths stay in separate groups
+    ("n[8-9],n[010-011]", ["n8", "n9", "n010", "n011"]),
+    # several bracketed groups per name and suffixes
+    ("r[1-2]n[01-02]", ["r1n01", "r1n02", "r2n01", "r2n02"]),
+    ("c[1-2]-ib", ["c1-ib", "c2-ib"]),
+])
+def test_hostlist_round_trip(hostlist, hostnames):
+
+    assert expand_hostlist(hostlist) == hostnames
+    assert expand_hostlist(compress_hostlist(hostnames)) == hostnames
+
+# Test that names are compressed into ranges grouped by prefix, sorted and without duplicates
+def test_compress_hostlist():
+
+    assert compress_hostlist(["nid%03d" % i for i in range(1, 129)] + ["nid200"]) == "nid[001-128,200]"
+    assert compress_hostlist(["nid003", "nid001", "nid002", "nid001", "login"]) == "nid[001-003],login"
+    assert compress_hostlist(["r1n01", "r1n02", "r2n01", "r2n02"]) == "r1n[01-02],r2n[01-02]"
+    assert compress_hostlist(["n8", "n010", "n9"]) == "n[8-9],n010"
+    assert compress_hostlist(["nid001"]) == "nid001"
+    assert compress_hostlist([]) == ""
+
+# Test that invalid hostlist expressions are rejected
+@pytest.mark.parametrize("hostlist", ["nid[001-003", "nid[a-b]", "nid[1-2]]"])
+def test_expand_hostlist_invalid(hostlist):
+
+    with pytest.raises(ValueError):
+        expand_hostlist(hostlist)
+
+# Stand-in for a ReFrame partition, with the properties used by the scheduler backends
+def partition(scheduler="slurm", access=(), extras=None, num_cpus=None, num_sockets=None, num_cpus_per_core=None):
+    processor = types.SimpleNamespace(num_cpus=num_cpus, num_sockets=num_sockets, num_cpus_per_core=num_cpus_per_core)
+    return types.SimpleNamespace(fullname="sys:" + scheduler, access=list(access), extras=extras or {}, processor=processor,
+                                 scheduler=types.SimpleNamespace(registered_name=scheduler))
+
+# Test that the Slurm backend summarises the sockets and cores of the usable nodes
+def test_slurm_backend(scheduler_commands):
+
+    info = scheduler_info(partition("slurm", access=["--exclude=nid002"]), exclude_states=["down", "drained"])
+    assert isinstance(info, Scheduler_Info)
+    assert (info.num_nodes, info.sockets_per_node, info.pcores_per_node, info.lcores_per_node) == (1, 2, 64, 128)
+    assert str(info) == "Scheduler_Info(num_nodes=1, sockets_per_node=2, pcores_per_node=64, lcores_per_node=128)"
+
+    # nodes must all have the same topology
+    with pytest.raises(ValueError, match="differs between nodes"):
+        Scheduler_Info(partition("slurm", access=["--partition=gpu"]))
+    with pytest.raises(ValueError, match="no nodes found"):
+        Scheduler_Info(None, only_states=["mixed"])
+
+# Test that the PBS backend counts the CPUs of the nodes not in excluded states, or takes them from the configuration
+def test_pbs_backend(scheduler_commands):
+
+    info = scheduler_info(partition("torque"), exclude_states=["down", "offline"])
+    assert isinstance(info, PbsInfo)
+    assert (info.num_nodes, info.sockets_per_node, info.pcores_per_node, info.lcores_per_node) == (2, 1, 16, 16)
+    assert PbsInfo(partition("pbs"), only_states=["free"]).num_nodes == 1
+
+    info = PbsInfo(partition("pbs", num_cpus=32, num_sockets=2, num_cpus_per_core=2))
+    assert (info.num_nodes, info.sockets_per_node, info.pcores_per_node, info.lcores_per_node) == (3, 2, 16, 32)
+
+# Test that the SGE backend uses the hosts of the queue which report their load
+def test_sge_backend(scheduler_commands):
+
+    info = scheduler_info(partition("sge", access=["-q all.q"]))
+    assert isinstance(info, SgeInfo)
+    assert (info.num_nodes, info.sockets_per_node, info.pcores_per_node, info.lcores_per_node) == (2, 2, 16, 32)
+    assert ["qselect", "-q", "all.q"] in scheduler_commands
+    assert SgeInfo(partition("sge")).num_nodes == 3
+
+# Test that the static backend is used where the configuration describes the nodes, without running any command
+def test_static_backend(scheduler_commands):
+
+    info = scheduler_info(partition("slurm", extras={"num_nodes": 4}, num_cpus=64, num_sockets=2, num_cpus_per_core=2))
+    assert isinstance(info, StaticInfo)
+    assert (info.num_nodes, info.sockets_per_node, info.pcores_per_node, info.lcores_per_node) == (4, 2, 32, 64)
+    # schedulers without a backend
+    info = scheduler_info(partition("local"))
+    assert isinstance(info, StaticInfo)
+    assert (info.num_nodes, info.sockets_per_node) == (1, 1)
+    assert info.lcores_per_node == (os.cpu_count() or 1)
+    assert scheduler_commands == []
+
+@pytest.fixture
+# Fixture making the current system a partition of 6 nodes with 2 sockets of 4 cores and 2 threads per core, and one
+# partition whose scheduler can't be queried
+def sweep_system(monkeypatch):
+
+    node = types.SimpleNamespace(num_nodes=6, sockets_per_node=2, pcores_per_node=8, lcores_per_node=16)
+    def info(part):
+        if part.fullname == "sys:broken":
+            raise OSError("no scheduler")
+        return node
+    partitions = [types.SimpleNamespace(fullname="sys:compute"), types.SimpleNamespace(fullname="sys:broken")]
+    system = types.SimpleNamespace(system=types.SimpleNamespace(partitions=partitions))
+    monkeypatch.setattr(reframe_extras, "runtime", lambda: system)
+    monkeypatch.setattr(reframe_extras, "scheduler_info", info)
+
+# Test that a default scaling sweep doubles nodes and tasks per node up to full nodes, filling nodes with threads
+def test_scaling_sweep_defaults(sweep_system):
+
+    cases = scaling_sweep()
+    assert sorted(set(case.num_nodes for case in cases)) == [1, 2, 4, 6]
+    assert [case[2:] for case in cases if case.num_nodes == 1] == [(1, 8), (2, 4), (4, 2), (8, 1)]
+    assert all(case.partition == "sys:compute" for case in cases)
+    assert cases == sorted(cases)
+    assert ScalingCase("sys:compute", 6, 8, 1).num_tasks == 48
+
+    # maximum is included whether or not it is a power of 2
+    assert sorted(set(case.num_nodes for case in scaling_sweep(min_nodes=2, max_node_factor=0.5))) == [2, 3]
+    assert list(scaling_config(core_factor=0.5)) == [("sys:compute", n * 4, 4) for n in [1, 2, 4, 6]]
+
+# Test that configurations which don't fit in the partition are never generated
+def test_scaling_sweep_limits(sweep_system):
+
+    cases = scaling_sweep(nodes=[1, 8], tasks_per_node=lambda info: [info.lcores_per_node, 32], threads_per_task=[2, 1])
+    assert cases == [ScalingCase("sys:compute", 1, 16, 1)]
+
+# Test that constraints prune configurations
+def test_scaling_sweep_constraints(sweep_system):
+
+    cases = scaling_sweep(nodes=[1], tasks_per_node=[1, 2, 4, 8], threads_per_task=[1, 2, 3, 4], constraints=[socket_aligned()])
+    assert [case[2:] for case in cases] == [(2, 1), (2, 2), (2, 4), (4, 1), (4, 2), (4, 4), (8, 1), (8, 2)]
+
+    cases = scaling_sweep(nodes=[1, 2, 4], tasks_per_node=[2, 3], threads_per_task=[1], constraints=[tasks_divide(12)])
+    assert [case.num_tasks for case in cases] == [2, 3, 4, 6, 12]
+
+    cases = scaling_sweep(tasks_per_node=[8], threads_per_task=[1], constraints=[local_size_between(1000, 50, 200)])
+    assert [case.num_tasks for case in cases] == [8, 16]
+
+# Test that a node-hours budget keeps the cheapest configurations
+def test_scaling_sweep_budget(sweep_system):
+
+    cases = scaling_sweep(tasks_per_node=[8], threads_per_task=[1], max_node_hours=8, hours_per_case=1)
+    assert [case.num_nodes for case in cases] == [1, 2, 4]
+    cases = scaling_sweep(tasks_per_node=[8], threads_per_task=[1], max_node_hours=8,
+                          hours_per_case=lambda case: 0.5 if case.num_nodes == 6 else 2)
+    assert [case.num_nodes for case in cases] == [1, 6]
+
+    with pytest.raises(ValueError, match="hours_per_case"):
+        scaling_sweep(max_node_hours=8)
+
+# Test double with the skipping methods of `AdaptiveScalingTest`, outside of a ReFrame session
+class AdaptiveScaling:
+    skip_after_efficiency_collapse = AdaptiveScalingTest.skip_after_efficiency_collapse
+    record_skipped_scale = AdaptiveScalingTest.record_skipped_scale
+
+    def __init__(self, num_nodes, smaller):
+        self.num_nodes = num_nodes
+        self.smaller_scale = "smaller"
+        self.smaller = smaller
+        self.scaling_stopped = False
+        self.min_parallel_efficiency = 0.5
+        self.display_name = "Scaling %%num_nodes=%d" % num_nodes
+        self.current_system = types.SimpleNamespace(name="sys")
+        self.current_partition = types.SimpleNamespace(name="part")
+
+    param_space = {"num_nodes": [1, 2, 4, 8, 16]}
+
+    @classmethod
+    def variant_name(cls):
+        return "Scaling"
+
+    def getdep(self, name):
+        assert name == "smaller"
+        return self.smaller
+
+    def skip(self, msg):
+        raise RuntimeError(msg)
+
+# Test that tests with more nodes than where scaling stopped are skipped, with a record of each of them next to the perflog
+def test_adaptive_scaling_skip(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(reframe_extras, "perflog_dir", lambda test: str(tmp_path / "sys" / "part"))
+    running = AdaptiveScaling(2, types.SimpleNamespace(scaling_stopped=False))
+    running.skip_after_efficiency_collapse()
+    assert not running.scaling_stopped
+
+    # only the first skipped test runs, those with more nodes are skipped because of their dependency
+    stopped = types.SimpleNamespace(scaling_stopped=True, scaling_stopped_at=4)
+    with pytest.raises(RuntimeError, match="parallel efficiency fell below 50% at 4 nodes"):
+        AdaptiveScaling(8, stopped).skip_after_efficiency_collapse()
+    records = [json.loads(line) for line in (tmp_path / "sys" / "part" / "Scaling.scaling.jsonl").read_text().splitlines()]
+    assert [(r["num_nodes"], r["scaling_stopped_at"], r["reason"]) for r in records] == [
+        (8, 4, "parallel efficiency fell below 50% at 4 nodes"),
+        (16, 4, "parallel efficiency fell below 50% at 4 nodes"),
+    ]
+    assert [r["display_name"] for r in records] == ["Scaling %num_nodes=8", "Scaling %num_nodes=16"]
+
+    # no record without a filelog perflog handler
+    monkeypatch.setattr(reframe_extras, "perflog_dir", lambda test: None)
+    with pytest.raises(RuntimeError):
+        AdaptiveScaling(8, stopped).skip_after_efficiency_collapse()
+
+# Network topology in the Slurm `topology.conf` format, with two groups of two leaf switches of three nodes
+TOPOLOGY = """# dragonfly groups
+SwitchName=s0 Nodes=nid[001-003]
+SwitchName=s1 Nodes=nid[004-006]
+SwitchName=s2 Nodes=nid[007-009]  # second group
+SwitchName=s3 Nodes=nid[010-012]
+SwitchName=g0 Switches=s[0-1]
+SwitchName=g1 Switches=s[2-3]
+"""
+
+# Test that leaf switches and groups are read from a topology description
+def test_network_topology(tmp_path):
+
+    path = tmp_path / "topology.conf"
+    path.write_text(TOPOLOGY)
+    topology = read_topology(str(path))
+    assert list(topology.switches) == ["s0", "s1", "s2", "s3"]
+    assert topology.switches["s2"] == ["nid007", "nid008", "nid009"]
+    assert topology.groups == {"g0": ["s0", "s1"], "g1": ["s2", "s3"]}
+    assert (topology.switch["nid005"], topology.group["nid005"]) == ("s1", "g0")
+
+    # leaf switches without a parent are their own group
+    topology = NetworkTopology("SwitchName=s0 Nodes=nid[001-002]\nSwitchName=s1 Nodes=nid003\n")
+    assert topology.groups == {"s0": ["s0"], "s1": ["s1"]}
+    with pytest.raises(ValueError, match="no switches with nodes"):
+        NetworkTopology("SwitchName=g0 Switches=s[0-1]\n")
+
+# Test that nodes are taken in turn from lists spanning at least two of them
+def test_round_robin():
+
+    assert round_robin([["a1", "a2"], ["b1"], ["c1", "c2"]], 4) == ["a1", "b1", "c1", "a2"]
+    assert round_robin([["a1", "a2"], [], ["c1"]], 3) == ["a1", "c1", "a2"]
+    assert round_robin([["a1", "a2"], ["b1"]], 4) is None
+    assert round_robin([["a1", "a2", "a3"], []], 2) is None
+
+# Test the nodes chosen for each placement, among all nodes or only the available ones
+def test_placement_nodes():
+
+    topology = NetworkTopology(TOPOLOGY)
+    assert placement_nodes(topology, "same-switch", 3) == ["nid001", "nid002", "nid003"]
+    assert placement_nodes(topology, "cross-switch", 4) == ["nid001", "nid004", "nid002", "nid005"]
+    assert placement_nodes(topology, "cross-group", 4) == ["nid001", "nid007", "nid002", "nid008"]
+
+    available = {"nid002", "nid004", "nid005", "nid006", "nid009", "nid011", "nid012"}
+    assert placement_nodes(topology, "same-switch", 3, available) == ["nid004", "nid005", "nid006"]
+    assert placement_nodes(topology, "cross-switch", 3, available) == ["nid002", "nid004", "nid005"]
+    assert placement_nodes(topology, "cross-group", 3, available) == ["nid002", "nid009", "nid004"]
+    # the first group hasn't enough nodes, but the second has
+    assert placement_nodes(topology, "cross-switch", 3, available - {"nid002"}) == ["nid009", "nid011", "nid012"]
+
+# Test that placements which can't be satisfied are rejected
+@pytest.mark.parametrize("placement, num_nodes, available, error", [
+    ("same-switch", 4, None, "no same-switch placement of 4 nodes"),
+    ("cross-switch", 7, None, "no cross-switch placement of 7 nodes"),
+    ("cross-group", 2, {"nid001", "nid004"}, "no cross-group placement of 2 nodes"),
+    ("random", 2, None, "invalid placement 'random'"),
+])
+def test_placement_nodes_invalid(placement, num_nodes, available, error):
+
+    with pytest.raises(ValueError, match=error):
+        placement_nodes(NetworkTopology(TOPOLOGY), placement, num_nodes, available)
+
+# Sticky options set by the `--prefix` and `--perflogdir` options or `RFM_PREFIX` and `RFM_PERFLOG_DIR` variables
+PREFIX_OPTION = "systems/prefix"
+PERFLOG_DIR_OPTION = "logging/handlers_perflog/filelog_basedir"
+
+@pytest.fixture
+# Fixture loading the configuration of the benchmarks for the `default` system as the current one, returning it to
+# add options to, and a test on the `default` partition
+def site_config(tmp_path, monkeypatch):
+
+    config_file = os.path.join(os.path.dirname(__file__), os.pardir, "reframe_config.py")
+    config = reframe.core.config.load_config(config_file)
+    config.select_subconfig("default")
+    monkeypatch.setattr(reframe_extras, "runtime", lambda: types.SimpleNamespace(site_config=config))
+    monkeypatch.chdir(tmp_path)
+    test = types.SimpleNamespace(current_system=types.SimpleNamespace(name="default"),
+                                 current_partition=types.SimpleNamespace(name="default"))
+    return config, test
+
+# Return the directory where ReFrame's own perflog handler writes the perflog of the `default` partition
+def reframe_perflog_dir(config):
+    handler = reframe.core.logging._create_filelog_handler(config, "logging/0/handlers_perflog/0")
+    return handler._prefix % {"check_system": "default", "check_partition": "default"}
+
+# Test that the perflog directory is where ReFrame writes perflogs, by default, with `--prefix` and with
+# `RFM_PERFLOG_DIR` set to a path with environment variables
+@pytest.mark.parametrize("options, perflogs", [
+    ({}, "perflogs"),
+    ({PREFIX_OPTION: "prefix"}, "prefix/perflogs"),
+    ({PREFIX_OPTION: "prefix", PERFLOG_DIR_OPTION: "logs"}, "prefix/logs"),
+    ({PREFIX_OPTION: "prefix", PERFLOG_DIR_OPTION: "$SCRATCH/perflogs"}, "scratch/perflogs"),
+])
+def test_perflog_dir(site_config, tmp_path, monkeypatch, options, perflogs):
+
+    config, test = site_config
+    monkeypatch.setenv("SCRATCH", str(tmp_path / "scratch"))
+    for option, value in options.items():
+        config.add_sticky_option(option, value)
+    assert perflog_dir(test) == str(tmp_path / perflogs / "default" / "default")
+    assert perflog_dir(test) == reframe_perflog_dir(config)
+
+# Test that there is no perflog directory without a `filelog` perflog handler
+def test_perflog_dir_no_filelog(site_config, monkeypatch):
+
+    _, test = site_config
+    monkeypatch.setattr(reframe_extras, "runtime", lambda: types.SimpleNamespace(site_config=types.SimpleNamespace(
+        get=lambda option: [{"type": "stream"}] if option == "logging/0/handlers_perflog" else None)))
+    assert perflog_dir(test) is None
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from benchmarks.modules.telemetry import read_telemetry, telemetry_summary
+
+HEADER = "time,cpu_busy,cpu_total,mem_used_kb,net_rx_bytes,net_tx_bytes,ib_rcv_bytes,ib_xmit_bytes\n"
+
+# Samples of a node without Infiniband: 75% CPU utilisation, up to 2 GiB of memory, 2 MB/s over the run and up to 3 MB/s
+NODE1_SAMPLES = HEADER + """1000.0,0,0,1048576,0,0,,
+1001.0,50,100,2097152,500000,500000,,
+1002.0,150,200,1572864,2000000,2000000,,
+"""
+
+# Samples of a node with Infiniband: 50% CPU utilisation, 1 GiB of memory, 1 MB/s and 4 MB/s on Infiniband
+NODE2_SAMPLES = HEADER + """1000.0,0,0,1048576,0,0,0,0
+1002.0,100,200,1048576,1000000,1000000,4000000,4000000
+"""
+
+@pytest.fixture
+# Fixture writing the samples of two nodes, and of a third one with a single sample, returning their paths
+def telemetry_files(tmp_path):
+
+    paths = []
+    for host, samples in [("node1", NODE1_SAMPLES), ("node2", NODE2_SAMPLES), ("node3", HEADER + "1000.0,0,0,1048576,0,0,,\n")]:
+        path = tmp_path / f"rfm_telemetry.{host}.csv"
+        path.write_text(samples)
+        paths.append(str(path))
+    return paths
+
+# Test that samples are read with a field per column, NaN for missing values and an array even for a single sample
+def test_read_telemetry(telemetry_files):
+
+    samples = read_telemetry(telemetry_files[0])
+    assert samples["net_rx_bytes"].tolist() == [0, 500000, 2000000]
+    assert np.isnan(samples["ib_rcv_bytes"]).all()
+    assert len(read_telemetry(telemetry_files[2])) == 1
+
+# Test that the samples of nodes are summarised, with the Infiniband metrics of nodes with Infiniband
+def test_telemetry_summary(telemetry_files):
+
+    summary = telemetry_summary(telemetry_files)
+    assert summary == {
+        "peak_memory": (pytest.approx(2.0), "GiB"),
+        "mean_cpu_utilization": (pytest.approx(62.5), "%"),
+        "mean_nic_throughput": (pytest.approx(1.5), "MB/s"),
+        "peak_nic_throughput": (pytest.approx(3.0), "MB/s"),
+        "mean_ib_throughput": (pytest.approx(4.0), "MB/s"),
+        "peak_ib_throughput": (pytest.approx(4.0), "MB/s"),
+    }
+    assert all(type(value) is float for value, _ in summary.values())
+
+    assert sorted(telemetry_summary(telemetry_files[:1])) == ["mean_cpu_utilization", "mean_nic_throughput",
+                                                              "peak_memory", "peak_nic_throughput"]
+
+# Test that nothing is summarised without nodes with at least two samples
+def test_telemetry_summary_empty(telemetry_files):
+
+    assert telemetry_summary(telemetry_files[2:]) == {}
+    assert telemetry_summary([]) == {}
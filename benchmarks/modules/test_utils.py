@@ -0,0 +1,64 @@
+import pytest
+import reframe.utility.sanity as sn
+from reframe.core.exceptions import SanityError
+
+from benchmarks.modules.utils import OutputScanner
+
+@pytest.fixture
+# Fixture writing a small output file and returning its path
+def output(tmp_path):
+
+    path = tmp_path / "rfm_job.out"
+    path.write_text("step 1 time 0.5\nstep 2 time 0.25\nTotal 42 Gflops\n")
+    return str(path)
+
+# Test that matches have their groups keyed by index and name, like `re` matches
+def test_output_scanner_matches(output):
+
+    scanner = OutputScanner()
+    assert scanner.matches(r"step (\d+) time (?P<time>\S+)", output) == [
+        {0: "step 1 time 0.5", 1: "1", 2: "0.5", "time": "0.5"},
+        {0: "step 2 time 0.25", 1: "2", 2: "0.25", "time": "0.25"},
+    ]
+    # patterns are matched per line
+    assert [m[1] for m in scanner.matches(r"^(\w+)", output)] == ["step", "step", "Total"]
+    assert scanner.matches(r"missing", output) == []
+
+# Test the deferred replacements for `sn.extractall()` and `sn.extractsingle()`
+def test_output_scanner_extract(output):
+
+    scanner = OutputScanner()
+    assert sn.evaluate(scanner.extractall(r"time (\S+)", output, 1, float)) == [0.5, 0.25]
+    assert sn.evaluate(scanner.extractall(r"time (?P<t>\S+)", output, "t")) == ["0.5", "0.25"]
+    assert sn.evaluate(scanner.extractsingle(r"(\S+) Gflops", output, 1, float)) == 42.0
+    assert sn.evaluate(scanner.extractsingle(r"time (\S+)", output, 1, float, item=-1)) == 0.25
+    with pytest.raises(SanityError, match="not enough matches"):
+        sn.evaluate(scanner.extractsingle(r"time (\S+)", output, 1, float, item=2))
+
+# Test that files are mapped once and matches memoized, until the file changes
+def test_output_scanner_memoized(output):
+
+    scanner = OutputScanner()
+    first = scanner.matches(r"time (\S+)", output)
+    assert scanner.matches(r"time (\S+)", output) is first
+    assert len(scanner._files) == 1
+
+    with open(output, "a") as f:
+        f.write("step 3 time 0.125\n")
+    assert [m[1] for m in scanner.matches(r"time (\S+)", output)] == ["0.5", "0.25", "0.125"]
+
+# Test that only the most recently used files are kept mapped, and that empty files can be scanned
+def test_output_scanner_max_files(tmp_path):
+
+    scanner = OutputScanner(max_files=2)
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"out{i}"))
+        with open(paths[-1], "w") as f:
+            f.write(f"value {i}\n")
+        assert scanner.matches(r"value (\d)", paths[-1])[0][1] == str(i)
+    assert sorted(key[0] for key in scanner._files) == paths[1:]
+    assert scanner.matches(r"value (\d)", paths[0])[0][1] == "0"
+
+    (tmp_path / "empty").write_text("")
+    assert scanner.matches(r"value", str(tmp_path / "empty")) == []
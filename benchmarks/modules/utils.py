@@ -1,15 +1,33 @@
+import atexit
 import os
+import collections
 import datetime
 import fnmatch
+import functools
+import hashlib
 import subprocess
 import json
+import mmap
+import re
+import shutil
 import sys
+import time
 import pprint
 
 import reframe as rfm
-from reframe.core.exceptions import BuildSystemError
+import reframe.core.runtime as rt
+import reframe.utility.sanity as sn
+import reframe.utility.typecheck as typ
+from reframe.core.exceptions import BuildSystemError, SanityError
 from reframe.core.logging import getlogger
 from reframe.utility.osext import run_command
+from benchmarks.modules.affinity import (AFFINITY_PROBE, PINNING_ENV_PREFIXES, affinity_report,
+                                         read_affinity_out)
+from benchmarks.modules.perf_stat import PERF_STAT_EVENTS, PERF_STAT_WRAPPER, perf_stat_files, perf_stat_metrics
+from benchmarks.modules.profiling import (PERF_RECORD_WRAPPER, PERF_SCRIPT_CMDS, collapse_perf_script,
+                                          write_flame_graph, write_folded, write_hot_spots)
+from benchmarks.modules.reframe_extras import LastHooks, add_perf_variable, perflog_dir
+from benchmarks.modules.telemetry import TELEMETRY_SAMPLER, telemetry_summary
 
 
 SYSFILE = 'systems/sysinfo.json' # interpreted relative to jupyter root
@@ -239,10 +257,212 @@ def identify_build_environment(current_partition):
                              f"{env_dir}")
     return env_dir, cp_dir, subdir
 
+# Identifier of the current ReFrame session, used to scope caches which must not
+# outlive a single invocation of `reframe`.
+SESSION_ID = '%s-%d' % (time.strftime('%Y%m%dT%H%M%S'), os.getpid())
 
-class SpackTest(rfm.RegressionTest):
-    build_system = 'Spack'
+@functools.lru_cache(maxsize=None)
+def spack_version():
+    """ Return the version string (str) of the `spack` in `PATH`, queried only once per session.
+
+        Returns 'unknown' if `spack` can't be run on this node.
+    """
+    try:
+        cmd = run_command(['spack', '--version'])
+    except OSError:
+        return 'unknown'
+    if cmd.returncode != 0:
+        return 'unknown'
+    return cmd.stdout.strip()
+
+# Spack environment files which are copied to the stage directory.
+SPACK_ENV_FILES = ('spack.yaml', 'compilers.yaml', 'packages.yaml')
+
+def spack_env_files(cp_dir):
+    """ Return a sorted list of paths (str) of the Spack configuration files within `cp_dir`.
+
+        Install trees (`opt`) and hidden directories (e.g. `.spack-env`) are not searched.
+    """
+    results = []
+    for dirpath, dirnames, filenames in os.walk(cp_dir):
+        dirnames[:] = [d for d in dirnames if d != 'opt' and not d.startswith('.')]
+        results.extend(os.path.join(dirpath, f) for f in filenames if f in SPACK_ENV_FILES)
+    return sorted(results)
+
+def hash_paths(*paths):
+    """ Return a hex digest (str) of the contents of the given files and directory trees.
+
+        Directories are walked in sorted order and both relative file names and
+        file contents contribute to the hash.  Paths which don't exist are ignored.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.isfile(path):
+            files = [(path, path)]
+        elif os.path.isdir(path):
+            files = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for f in sorted(filenames):
+                    full = os.path.join(dirpath, f)
+                    files.append((os.path.relpath(full, path), full))
+        else:
+            continue
+        for name, full in files:
+            digest.update(name.encode())
+            with open(full, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def spack_repo_hash(repo):
+    """ Return `hash_paths(repo)` for the custom Spack repo at `repo`, computed only once per session.
+
+        The repo is shared by all tests, so it is walked once rather than for each test.
+    """
+    return hash_paths(repo)
+
+@functools.lru_cache(maxsize=None)
+def session_concretization_cache():
+    """ Return the directory (str) holding the cached `spack.lock` files of this session.
+
+        The directory is removed when the session ends.
+    """
+    path = os.path.join(rt.runtime().stage_prefix, '.spack-concretize-cache', SESSION_ID)
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+def concretization_cache_dir(env_dir, cp_dir, spec, common, repo):
+    """ Return the directory (str) holding the cached `spack.lock` for a Spack spec in this session.
+
+        Args:
+            env_dir: str, path to the original Spack environment
+            cp_dir: str, directory with the YAML configuration files of the environment, see `spack_env_files()`
+            spec: str, Spack spec to concretize
+            common: str, path to the common settings file included by all environments
+            repo: str, path to our custom Spack repo
+
+        The cache is keyed by the environment directory, the spec, the Spack version and the hash
+        of all the configuration affecting concretization (the `common.yaml` file, the YAML files of
+        the environment and the custom repo).  It lives under the ReFrame stage prefix, in a
+        directory specific to the current session, see `session_concretization_cache()`, so locks
+        are never reused across sessions.
+    """
+    key = hashlib.sha256('\n'.join([
+        env_dir,
+        spec,
+        spack_version(),
+        hash_paths(common),
+        hash_paths(*spack_env_files(cp_dir)),
+        spack_repo_hash(repo),
+    ]).encode()).hexdigest()
+    return os.path.join(session_concretization_cache(), key[:16])
+
+
+class OutputScanner(object):
+    r""" Extract values from output files for many regex patterns, reading each file only once.
+
+        The `extractall()` and `extractsingle()` methods are deferred replacements for `sn.extractall()` and
+        `sn.extractsingle()` (with a single `tag` and no `encoding`), e.g. in performance functions:
+
+            self.perf_patterns = {
+                'flops': output_scanner.extractsingle(r'(\S+) Gflops', self.stdout, 1, float),
+                'time': output_scanner.extractsingle(r'in (\S+) seconds', self.stdout, 1, float),
+            }
+
+        Instead of re-reading the file for every pattern, files are memory-mapped once and the matches of each
+        pattern are memoized, keyed by the path, modification time and size of the file, for the `max_files` most
+        recently used files.  As with ReFrame, patterns are matched with `re.MULTILINE`, but on the raw bytes of the
+        file, so `$` does not match before a `\r\n` line ending.
+    """
+
+    def __init__(self, max_files=16, encoding='utf-8'):
+        self.max_files = max_files
+        self.encoding = encoding
+        self._regexes = {}
+        self._files = collections.OrderedDict() # (path, mtime, size) -> (mapped file, {pattern: matches})
+
+    def _mapped(self, filename):
+        st = os.stat(filename)
+        key = (os.path.abspath(filename), st.st_mtime_ns, st.st_size)
+        if key not in self._files:
+            with open(filename, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b''
+            self._files[key] = (data, {})
+            while len(self._files) > self.max_files:
+                old, _ = self._files.popitem(last=False)[1]
+                if isinstance(old, mmap.mmap):
+                    old.close()
+        self._files.move_to_end(key)
+        return self._files[key]
+
+    def matches(self, patt, filename):
+        """ Return a list of the matches of `patt` in `filename`, each as a dict of str groups keyed by index and name. """
+        data, table = self._mapped(filename)
+        if patt not in table:
+            regex = self._regexes.get(patt)
+            if regex is None:
+                regex = self._regexes[patt] = re.compile(patt.encode(self.encoding), re.MULTILINE)
+            found = []
+            for m in regex.finditer(data):
+                groups = {i: g for i, g in enumerate((m.group(0),) + m.groups())}
+                groups.update(m.groupdict())
+                found.append({k: g if g is None else g.decode(self.encoding) for k, g in groups.items()})
+            table[patt] = found
+        return table[patt]
+
+    def extractall(self, patt, filename, tag=0, conv=None):
+        """ Deferred list of the values of group `tag` of all matches of `patt` in `filename`, converted with `conv` """
+        return _scanner_extractall(self, patt, filename, tag, conv)
+
+    def extractsingle(self, patt, filename, tag=0, conv=None, item=0):
+        """ Deferred value of group `tag` of the `item`-th match of `patt` in `filename`, converted with `conv` """
+        return _scanner_extractsingle(self, patt, filename, tag, conv, item)
+
+@sn.deferrable
+def _scanner_extractall(scanner, patt, filename, tag, conv):
+    values = [m[tag] for m in scanner.matches(patt, filename)]
+    return [conv(v) for v in values] if conv else values
+
+@sn.deferrable
+def _scanner_extractsingle(scanner, patt, filename, tag, conv, item):
+    matches = scanner.matches(patt, filename)
+    try:
+        value = matches[item][tag]
+    except IndexError:
+        raise SanityError(f'not enough matches of pattern {patt!r} in file {filename!r} '
+                          f'so as to extract item {item!r}') from None
+    return conv(value) if conv else value
+
+# Scanner shared by all tests.
+output_scanner = OutputScanner()
+
+
+class SpackBuildPlugin(LastHooks):
+    """ Variables and hooks to build `spack_spec` in a copy of the Spack environment for the current partition.
+
+        This is shared by `SpackTest`, which builds and runs a benchmark, and `SpackBuild`, which only builds it.
+    """
     spack_spec = variable(str, value='', loggable=True)
+    # Concretize each unique spec only once per session and reuse its `spack.lock`
+    # in all the tests building the same spec in the same environment.
+    spack_concretization_cache = variable(typ.Bool, value=True)
+    # How to stage the Spack environment, common settings and custom repo:
+    # * 'symlink': only the `spack.yaml` of the environment, which Spack writes
+    #   to, is copied, everything else is symlinked to the original files
+    # * 'copy': everything is copied to the stage directory
+    spack_env_staging = variable(str, value='symlink')
+    # Number of CPUs of the build job, overriding the one derived from the
+    # processor of the current partition, see `setup_build_job_num_cpus`.
+    build_job_num_cpus = variable(int, type(None), value=None)
+    # Number of `spack install` processes run concurrently in the same
+    # environment.  Spack coordinates them through its install locks, so that
+    # independent dependencies are built at the same time, each with an equal
+    # share of the CPUs of the build job.
+    spack_concurrent_installs = variable(int, value=1)
+    # Name of the file, in the stage directory, where the start and end times of
+    # the build are recorded.
+    build_time_file = 'rfm_spack_build_time.txt'
 
     @run_before('compile')
     def setup_spack_environment(self):
@@ -255,18 +475,68 @@ class SpackTest(rfm.RegressionTest):
                                                    '..', 'spack'))
         common_base = 'common.yaml'
         common = os.path.realpath(os.path.join(spack_envs, common_base))
-        self.prebuild_cmds = [
-            # Copy over the common file.  It should be two levels up compared
-            # to the Spack environment, which is the stage directory.
-            f'cp {common} {self.stagedir}/{common_base}',
-            # Copy over our custom Spack repo.
-            f'cp -r {spack_envs}/repo {self.stagedir}/repo',
-            # Copy Spack environment (only specific YAML files) to the stage
-            # directory.
-            f'mkdir -p {dest}',
-            f'(cd {cp_dir}; find . \( -name "spack.yaml" -o -name "compilers.yaml" -o -name "packages.yaml" \) -print0 | xargs -0 tar cf - | tar -C {dest} -xvf -)',
-            f'spack -e {self.build_system.environment} config add "config:install_tree:root:{env_dir}/opt"',
-        ]
+        if self.spack_env_staging == 'copy':
+            self.prebuild_cmds = [
+                # Copy over the common file.  It should be two levels up compared
+                # to the Spack environment, which is the stage directory.
+                f'cp {common} {self.stagedir}/{common_base}',
+                # Copy over our custom Spack repo.
+                f'cp -r {spack_envs}/repo {self.stagedir}/repo',
+                # Copy Spack environment (only specific YAML files) to the stage
+                # directory.
+                f'mkdir -p {dest}',
+                f'(cd {cp_dir}; find . \\( -name "spack.yaml" -o -name "compilers.yaml" -o -name "packages.yaml" \\) -print0 | xargs -0 tar cf - | tar -C {dest} -xvf -)',
+            ]
+        elif self.spack_env_staging == 'symlink':
+            # Nothing reads the common file and the repo through anything but
+            # their relative location to the environment, and Spack never
+            # writes to them, so symlinks are enough and avoid copying the whole
+            # repo for every test on parallel filesystems.
+            self.prebuild_cmds = [
+                f'ln -sfn {common} {self.stagedir}/{common_base}',
+                f'ln -sfn {spack_envs}/repo {self.stagedir}/repo',
+                f'mkdir -p {self.build_system.environment}',
+            ]
+            # Of the environment, only consider the files at the top-level
+            # (e.g. system-wide `compilers.yaml` and `packages.yaml`) and those
+            # of the current partition.  Spack writes only to `spack.yaml`.
+            for path in spack_env_files(cp_dir):
+                relpath = os.path.relpath(path, cp_dir)
+                if os.path.dirname(relpath) not in ('', subdir):
+                    continue
+                if relpath == os.path.join(subdir, 'spack.yaml'):
+                    self.prebuild_cmds.append(f'cp {path} {dest}/{relpath}')
+                else:
+                    self.prebuild_cmds.append(f'ln -sfn {path} {dest}/{relpath}')
+        else:
+            raise ValueError(f'invalid spack_env_staging {self.spack_env_staging!r}: '
+                             "must be either 'symlink' or 'copy'")
+        self.prebuild_cmds.append(
+            f'spack -e {self.build_system.environment} config add "config:install_tree:root:{env_dir}/opt"')
+
+        if self.spack_concretization_cache and self.spack_spec:
+            cache_dir = concretization_cache_dir(env_dir, cp_dir, self.spack_spec,
+                                                 common, os.path.join(spack_envs, 'repo'))
+            env = self.build_system.environment
+            # The first test to get the lock concretizes the spec and saves the
+            # resulting `spack.lock`, all other tests copy it into their
+            # environment.  Adding the spec afterwards (done by ReFrame) is then
+            # a no-op for the concretizer.  `flock` serialises tests building
+            # concurrently, the atomic `mv` protects readers if it's missing.
+            self.prebuild_cmds += [
+                f'mkdir -p {cache_dir}',
+                f'''(
+    command -v flock > /dev/null && flock 9
+    if [ -f {cache_dir}/spack.lock ]; then
+        cp {cache_dir}/spack.lock {env}/spack.lock
+    else
+        spack -e {env} add {self.spack_spec} && \\
+            spack -e {env} concretize && \\
+            cp {env}/spack.lock {cache_dir}/spack.lock.$$ && \\
+            mv {cache_dir}/spack.lock.$$ {cache_dir}/spack.lock
+    fi
+) 9> {cache_dir}/lock''',
+            ]
 
         # Keep the `spack.lock` file in the output directory so that the Spack
         # environment can be faithfully reproduced later.
@@ -280,25 +550,364 @@ class SpackTest(rfm.RegressionTest):
         # inform ReFrame which Spack specs to use.
         self.build_system.specs = [self.spack_spec]
 
-    @run_before('compile')
-    def set_sge_num_slots(self):
-        if self.current_partition.scheduler.registered_name == 'sge':
-            # `self.num_tasks` or `self.num_cpus_per_task` may be `None`, here
-            # we default to `1` if not set.
-            num_tasks = self.num_tasks or 1
-            num_cpus_per_task = self.num_cpus_per_task or 1
-            # Set the total number of CPUs to be requested for the SGE scheduler.
-            self.extra_resources['mpi'] = {'num_slots': num_tasks * num_cpus_per_task}
-
     @run_after('setup')
     def setup_build_job_num_cpus(self):
         # When running a build on a compute node, ReFrame by default uses only a
         # single CPU, which is a large waste of time and resources.  With this,
-        # we force the build job to always use 16 CPUs or all available CPUs on
-        # the target partition, whichever is smaller, because on some systems
-        # using full partitions may have lower priority.
-        if not self.build_locally:
-            self.build_job.num_cpus_per_task = min(16, self.current_partition.processor.num_cpus)
+        # we size the build job from the processor of the target partition:
+        # * on partitions which allocate nodes exclusively we use the full node,
+        #   which is charged anyway
+        # * otherwise we use 16 CPUs or all available CPUs, whichever is
+        #   smaller, because on some systems using full partitions may have
+        #   lower priority.
+        # `build_job_num_cpus` overrides both.
+        if self.build_locally:
+            return
+        num_cpus = self.current_partition.processor.num_cpus
+        if self.build_job_num_cpus:
+            self.build_job.num_cpus_per_task = self.build_job_num_cpus
+        elif num_cpus:
+            if '--exclusive' in self.current_partition.access:
+                self.build_job.num_cpus_per_task = num_cpus
+            else:
+                self.build_job.num_cpus_per_task = min(16, num_cpus)
+
+    @run_before('compile')
+    def setup_build_parallelism(self):
+        # Pass to Spack the parallelism matching the CPUs we have: local builds
+        # use Spack's default of at most 16 CPUs.
+        if self.build_locally:
+            num_cpus = min(16, os.cpu_count() or 1)
+        else:
+            num_cpus = self.build_job.num_cpus_per_task or 1
+        if self.spack_concurrent_installs < 1:
+            raise ValueError(f'invalid spack_concurrent_installs {self.spack_concurrent_installs}: '
+                             'must be at least 1')
+        jobs = max(1, num_cpus // self.spack_concurrent_installs)
+        self.build_system.install_opts += ['-j', str(jobs)]
+        if self.spack_concurrent_installs > 1:
+            env = self.build_system.environment
+            # Concretize once and then start all installers on the same
+            # `spack.lock`.  The final `spack install` run by ReFrame finds
+            # everything already installed, or fails if any of them did.
+            self.build_system.preinstall_cmds += [
+                f'spack -e {env} concretize',
+                f'for i in $(seq {self.spack_concurrent_installs}); do '
+                f'spack -e {env} install -j {jobs} > spack-install-$i.log 2>&1 & done; wait',
+            ]
+
+    @run_before('compile')
+    def record_build_time(self):
+        # Bracket the whole build, including the staging of the environment,
+        # with timestamps, see `build_time`.
+        self.prebuild_cmds.insert(0, f'echo "start $(date +%s)" > {self.build_time_file}')
+        self.postbuild_cmds.append(f'echo "end $(date +%s)" >> {self.build_time_file}')
+
+    def build_time(self):
+        """ Return a deferred expression of the wall time (float seconds) of the Spack build """
+        path = os.path.join(self.stagedir, self.build_time_file)
+        return (sn.extractsingle(r'^end (\d+)', path, 1, float) -
+                sn.extractsingle(r'^start (\d+)', path, 1, float))
+
+    def last_before_performance(self):
+        # Report the build time along with the other performance variables
+        super().last_before_performance()
+        add_perf_variable(self, 'build_time', self.build_time(), 's')
+
+class AffinityProbePlugin(LastHooks):
+    """ Hooks checking the CPU and NUMA affinity of the ranks of a test, if `affinity_probe` is set.
+
+        Before the benchmark, `AFFINITY_PROBE` is run with the launcher, number of tasks and
+        environment of the test, and each rank reports the CPUs and NUMA nodes it may use.  The
+        report of `affinity_report()` is kept in the output directory and appended as a JSON line
+        to `<test>.affinity.jsonl` next to the perflog, its warnings (oversubscription, unbound or
+        shared CPUs, ranks spread over sockets) are logged, and their number is set as the
+        `affinity_warnings` tag.
+
+        The probe doesn't initialise MPI, so it sees the binding applied by the launcher (e.g.
+        `srun`, Open MPI `mpirun`), but not the pinning done in `MPI_Init` by Intel MPI.
+    """
+    affinity_probe = variable(typ.Bool, value=False)
+    # Output of the probe and report, in the stage directory.
+    affinity_file = 'rfm_affinity.txt'
+    affinity_report_file = 'rfm_affinity.json'
+
+    def last_before_run(self):
+        # Last, so that the probe uses the launcher as set up by the test.
+        super().last_before_run()
+        if not self.affinity_probe:
+            return
+        with open(os.path.join(self.stagedir, 'rfm_affinity_probe.sh'), 'w') as f:
+            f.write(AFFINITY_PROBE)
+        launcher = self.job.launcher.run_command(self.job)
+        self.prerun_cmds.append(f'{launcher} sh rfm_affinity_probe.sh > {self.affinity_file}'.lstrip())
+
+    @run_before('sanity')
+    def report_affinity(self):
+        if not self.affinity_probe:
+            return
+        path = os.path.join(self.stagedir, self.affinity_file)
+        if not os.path.exists(path):
+            getlogger().warning(f'{self.display_name}: no output of the affinity probe')
+            return
+        report = affinity_report(read_affinity_out(path), self.job.num_tasks or 1, self.num_cpus_per_task or 1)
+        report = {
+            'display_name': self.display_name,
+            'jobid': self.job.jobid,
+            'system': self.current_system.name,
+            'partition': self.current_partition.name,
+            'num_tasks': self.job.num_tasks,
+            'num_cpus_per_task': self.num_cpus_per_task,
+            'env_vars': {k: v for k, v in self.env_vars.items() if k.startswith(PINNING_ENV_PREFIXES)},
+            **report,
+        }
+        with open(os.path.join(self.stagedir, self.affinity_report_file), 'w') as f:
+            json.dump(report, f, indent=2)
+        self.keep_files += [self.affinity_file, self.affinity_report_file]
+        log_dir = perflog_dir(self)
+        if log_dir is not None:
+            os.makedirs(log_dir, exist_ok=True)
+            with open(os.path.join(log_dir, f'{type(self).variant_name()}.affinity.jsonl'), 'a') as f:
+                f.write(json.dumps(report) + '\n')
+        for warning in report['warnings']:
+            getlogger().warning(f'{self.display_name}: {warning}')
+        self.tags |= {f'affinity_warnings={len(report["warnings"])}'}
+
+
+class PerfCountersPlugin(LastHooks):
+    """ Hooks running each rank of a test under `perf stat`, if `perf_counters` is set.
+
+        The hardware counters of `perf_events` are counted for each rank and the metrics of
+        `perf_stat_metrics()` (IPC, cache misses per thousand instructions, estimated memory
+        bandwidth) are added to the performance variables.  This only needs `perf` on the compute
+        nodes: ranks run without it if it can't count the events, and metrics whose events are not
+        supported are left out.
+
+        The wrapper is prepended to `executable` after all other `run_before('run')` hooks, so
+        launcher options must be set in `job.launcher.options`, not in `executable`.
+    """
+    perf_counters = variable(typ.Bool, value=False)
+    perf_events = variable(typ.List[str], value=list(PERF_STAT_EVENTS))
+
+    def last_before_run(self):
+        super().last_before_run()
+        if not self.perf_counters:
+            return
+        with open(os.path.join(self.stagedir, 'rfm_perf_stat.sh'), 'w') as f:
+            f.write(PERF_STAT_WRAPPER)
+        self.executable = f'sh rfm_perf_stat.sh {",".join(self.perf_events)} {self.executable}'
+
+    @run_before('performance')
+    def add_perf_counter_variables(self):
+        if not self.perf_counters:
+            return
+        paths = perf_stat_files(self.stagedir)
+        self.keep_files += [os.path.basename(path) for path in paths]
+        for name, (value, unit) in perf_stat_metrics(paths).items():
+            add_perf_variable(self, name, sn.defer(value), unit)
+
+
+class ProfilePlugin(LastHooks):
+    """ Hooks profiling ranks of a test with `perf record`, if `profile` is set.
+
+        `profile` is 'all' or a comma-separated list of the ranks to profile, e.g. '0'.  Samples are
+        taken `profile_frequency` times per second with the `profile_call_graph` mode of `perf
+        record --call-graph` ('fp' needs frame pointers, 'dwarf' doesn't but makes larger files).
+        For each profiled rank, the following files are kept in the output directory:
+            - `rfm_profile.<rank>.folded`: the collapsed stacks, in the folded format of FlameGraph
+            - `rfm_profile.<rank>.svg`: a flame graph of the stacks
+            - `rfm_profile.<rank>.txt`: a table of the functions with most samples
+
+        As for `PerfCountersPlugin`, the wrapper is prepended to `executable` after all other
+        `run_before('run')` hooks, so launcher options must not be set in `executable`.
+    """
+    profile = variable(str, type(None), value=None)
+    profile_frequency = variable(int, value=999)
+    profile_call_graph = variable(str, value='fp')
+
+    def last_before_run(self):
+        super().last_before_run()
+        if not self.profile:
+            return
+        with open(os.path.join(self.stagedir, 'rfm_perf_record.sh'), 'w') as f:
+            f.write(PERF_RECORD_WRAPPER)
+        self.executable = (f'sh rfm_perf_record.sh {self.profile} {self.profile_frequency} '
+                           f'{self.profile_call_graph} {self.executable}')
+        self.postrun_cmds = PERF_SCRIPT_CMDS + self.postrun_cmds
+
+    @run_before('sanity')
+    def write_profiles(self):
+        if not self.profile:
+            return
+        scripts = sorted(fnmatch.filter(os.listdir(self.stagedir), 'rfm_perf.*.script'))
+        if not scripts:
+            getlogger().warning(f'{self.display_name}: no profile recorded, is perf available?')
+        for script in scripts:
+            rank = script.split('.')[1]
+            stacks = collapse_perf_script(os.path.join(self.stagedir, script))
+            base = os.path.join(self.stagedir, f'rfm_profile.{rank}')
+            title = f'{self.display_name} rank {rank} on {self.current_partition.fullname}'
+            write_folded(stacks, f'{base}.folded')
+            write_flame_graph(stacks, f'{base}.svg', title)
+            write_hot_spots(stacks, f'{base}.txt', title)
+            self.keep_files += [f'rfm_profile.{rank}.{ext}' for ext in ('folded', 'svg', 'txt')]
+
+
+class TelemetryPlugin(rfm.RegressionMixin):
+    """ Hooks sampling the resource usage of the nodes of a test during its run, if `telemetry` is set.
+
+        A sampler started in `prerun_cmds` records the CPU time, used memory, and network interface
+        and Infiniband port counters of each node every `telemetry_interval` seconds, until it is
+        stopped in `postrun_cmds`.  The time series are kept in the output directory as
+        `rfm_telemetry.<host>.csv`, and their `telemetry_summary()` (peak memory, mean CPU
+        utilisation, mean and peak network throughput) is added to the performance variables.
+
+        With the `srun` launcher a sampler runs on every node of the job, with `srun --overlap`, and
+        otherwise only on the node running the job script.
+    """
+    telemetry = variable(typ.Bool, value=False)
+    telemetry_interval = variable(float, value=1.0)
+
+    @run_before('run')
+    def start_telemetry(self):
+        if not self.telemetry:
+            return
+        with open(os.path.join(self.stagedir, 'rfm_telemetry.sh'), 'w') as f:
+            f.write(TELEMETRY_SAMPLER)
+        sampler = f'sh rfm_telemetry.sh {self.telemetry_interval}'
+        if self.job.launcher.registered_name in ('srun', 'srunalloc'):
+            sampler = f'srun --overlap --nodes=$SLURM_JOB_NUM_NODES --ntasks-per-node=1 {sampler}'
+        self.prerun_cmds += ['rm -rf rfm_telemetry.*.lock rfm_telemetry.stop', f'{sampler} &']
+        self.postrun_cmds = ['touch rfm_telemetry.stop', 'wait'] + self.postrun_cmds
+
+    @run_before('performance')
+    def add_telemetry_variables(self):
+        if not self.telemetry:
+            return
+        files = sorted(fnmatch.filter(os.listdir(self.stagedir), 'rfm_telemetry.*.csv'))
+        self.keep_files += files
+        summary = telemetry_summary([os.path.join(self.stagedir, f) for f in files])
+        for name, (value, unit) in summary.items():
+            add_perf_variable(self, name, sn.defer(value), unit)
+
+
+# Script printing the fingerprint of a node, see `SystemFingerprintPlugin`
+SYSINFO_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sysinfo', 'sysinfo.py')
+
+
+class SystemFingerprintPlugin(rfm.RegressionMixin):
+    """ Hooks recording a fingerprint of the system a test runs on, if `capture_fingerprint` is set.
+
+        Before the benchmark, `sysinfo.py --fingerprint` hashes the kernel, firmware (BIOS, CPU
+        microcode, network adaptor firmware) and main hardware of the node running the job script into
+        a short ID.  The ID is set as `system_fingerprint`, logged as a column of the perflog, so that
+        changes in performance can be attributed to changes of the system, e.g. after maintenance.  The
+        details of each new ID are appended to `fingerprints.jsonl` next to the perflog.
+
+        The script runs with the Python interpreter running ReFrame, which must also be available on
+        the compute nodes.  Its errors go to the stderr of the job.
+    """
+    capture_fingerprint = variable(typ.Bool, value=False)
+    system_fingerprint = variable(str, value='', loggable=True)
+    # Output of `sysinfo.py --fingerprint`, in the stage directory.
+    fingerprint_file = 'rfm_fingerprint.json'
+
+    @run_before('run')
+    def add_fingerprint_probe(self):
+        if not self.capture_fingerprint:
+            return
+        # isolated mode, so that the environment of the test doesn't affect Python
+        self.prerun_cmds.append(f'{sys.executable} -I {SYSINFO_SCRIPT} --fingerprint > {self.fingerprint_file}')
+
+    @run_before('performance')
+    def record_fingerprint(self):
+        if not self.capture_fingerprint:
+            return
+        try:
+            with open(os.path.join(self.stagedir, self.fingerprint_file)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            getlogger().warning(f'{self.display_name}: no system fingerprint, check that {sys.executable} '
+                                'can be run on the compute nodes')
+            return
+        self.keep_files.append(self.fingerprint_file)
+        self.system_fingerprint = record['fingerprint']
+        log_dir = perflog_dir(self)
+        if log_dir is None:
+            return
+        store = os.path.join(log_dir, 'fingerprints.jsonl')
+        if os.path.exists(store):
+            with open(store) as f:
+                if any(json.loads(line)['fingerprint'] == record['fingerprint'] for line in f if line.strip()):
+                    return
+        os.makedirs(log_dir, exist_ok=True)
+        with open(store, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def set_sge_num_slots(test):
+    """ Set the total number of CPUs to be requested for the SGE scheduler by a test running on an SGE partition """
+    if test.current_partition.scheduler.registered_name == 'sge':
+        # `test.num_tasks` or `test.num_cpus_per_task` may be `None`, here
+        # we default to `1` if not set.
+        num_tasks = test.num_tasks or 1
+        num_cpus_per_task = test.num_cpus_per_task or 1
+        test.extra_resources['mpi'] = {'num_slots': num_tasks * num_cpus_per_task}
+
+
+class SpackTest(rfm.RegressionTest, SpackBuildPlugin, AffinityProbePlugin, PerfCountersPlugin,
+                ProfilePlugin, TelemetryPlugin, SystemFingerprintPlugin):
+    """ Benchmark built with Spack in the compile stage of the test itself.
+
+        The only requirement is to inherit this class and set the `spack_spec` attribute.
+    """
+    build_system = 'Spack'
+
+    @run_before('compile')
+    def set_sge_num_slots(self):
+        set_sge_num_slots(self)
+
+
+class SpackBuild(rfm.CompileOnlyRegressionTest, SpackBuildPlugin):
+    """ Compile-only test building `spack_spec`, to be used as a fixture of `SpackRunTest`s """
+    build_system = 'Spack'
+    valid_systems = ['*']
+    valid_prog_environs = ['*']
+
+    @sanity_function
+    def validate_build(self):
+        return sn.assert_not_found(r'==> Error', self.stderr)
+
+
+class SpackRunTest(rfm.RunOnlyRegressionTest, AffinityProbePlugin, PerfCountersPlugin, ProfilePlugin,
+                   TelemetryPlugin, SystemFingerprintPlugin):
+    """ Benchmark using the Spack build of a `SpackBuild` fixture, instead of building in its own compile stage.
+
+        Classes deriving from this must define the `spack_build` fixture with the spec to build, e.g.:
+
+            spack_build = fixture(SpackBuild, scope='environment', variables={'spack_spec': 'sombrero@2021-08-16'})
+
+        ReFrame then builds each spec exactly once per system partition and programming environment in a session,
+        and all the tests depending on the same fixture (e.g. all the cases of a scaling sweep) run using that build.
+        `spack_spec` is set from the fixture, so that it can still be logged.
+    """
+    spack_spec = variable(str, value='', loggable=True)
+
+    @run_after('setup')
+    def setup_spack_build(self):
+        self.spack_spec = self.spack_build.spack_spec
+        # Keep the `spack.lock` of the build, as done by `SpackTest`.
+        self.keep_files.append(os.path.realpath(os.path.join(self.spack_build.build_system.environment, 'spack.lock')))
+
+    @run_before('run')
+    def load_spack_build(self):
+        # Same commands ReFrame would run before a `SpackTest`: activate the
+        # environment of the build and load the spec.
+        self.prerun_cmds = self.spack_build.build_system.prepare_cmds() + self.prerun_cmds
+
+    @run_before('run')
+    def set_sge_num_slots(self):
+        set_sge_num_slots(self)
 
 
 if __name__ == '__main__':
@@ -746,6 +746,8 @@ site_configuration = {
                         '%(check_num_gpus_per_node)s|'
                         '%(check_perfvalues)s|'
                         '%(check_spack_spec)s|'
+                        '%(check_placement)s|'
+                        '%(check_system_fingerprint)s|'
                         '%(check_display_name)s|'
                         '%(check_system)s|'
                         '%(check_partition)s|'
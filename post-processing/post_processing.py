@@ -1,6 +1,7 @@
 import argparse
 import ast
 import errno
+import json
 import math
 import operator as op
 import os
@@ -24,15 +25,19 @@ class PostProcessing:
         self.debug = debug
         self.verbose = verbose
 
-    def run_post_processing(self, log_path, config):
+    def run_post_processing(self, log_path, config, plot_type="generic"):
         """
             Return a dataframe containing the information passed to a plotting script and produce relevant graphs.
 
             Args:
                 log_path: str, path to a log file or a directory containing log files.
                 config: dict, configuration information for plotting.
+                plot_type: str, type of plot to be generated ("generic" bar chart or message size "curve").
         """
 
+        if plot_type not in self.plot_types:
+            raise RuntimeError("Unknown plot type '{0}', expected one of {1}.".format(plot_type, list(self.plot_types)))
+
         log_files = []
         # look for perflogs
         if os.path.isfile(log_path):
@@ -68,6 +73,10 @@ class PostProcessing:
         if df.empty:
             raise FileNotFoundError(errno.ENOENT, "Could not find a valid perflog in path", log_path)
 
+        # one row per message size for curve plots
+        if plot_type == "curve":
+            df = get_message_size_curves(df)
+
         # get axis columns
         columns = [config["x_axis"]["value"], config["y_axis"]["value"]]
         if config["x_axis"]["units"].get("column"):
@@ -162,8 +171,15 @@ class PostProcessing:
         print("Selected dataframe:")
         print(df[columns][mask])
 
+        # show what changed between the selected system fingerprints
+        if "system_fingerprint" in columns:
+            differences = get_fingerprint_differences(read_fingerprints(log_files), df["system_fingerprint"][mask].dropna().unique())
+            if not differences.empty:
+                print("System fingerprint differences:")
+                print(differences)
+
         # call a plotting script
-        self.plot_generic(config["title"], df[columns][mask], config["x_axis"], config["y_axis"], series_filters)
+        getattr(self, self.plot_types[plot_type])(config["title"], df[columns][mask], config["x_axis"], config["y_axis"], series_filters)
 
         if self.debug & self.verbose:
             print("")
@@ -245,6 +261,67 @@ class PostProcessing:
         # save to file
         save(plot)
 
+    def plot_curve(self, title, df: pd.DataFrame, x_axis, y_axis, series_filters):
+        """
+            Create a line chart of the supplied data against message size using bokeh, with logarithmic axes.
+
+            Args:
+                title: str, plot title (read from config).
+                df: dataframe, data to plot.
+                x_axis: dict, x-axis column and units (read from config).
+                y_axis: dict, y-axis column and units (read from config).
+                series_filters: list, filters used to split graph data into one line per series.
+        """
+
+        # get column names and labels for axes
+        x_column, x_label = get_axis_info(df, x_axis)
+        y_column, y_label = get_axis_info(df, y_axis)
+
+        # logarithmic axes can only show positive values (e.g. not the 0 byte message size)
+        df = df[(df[x_column] > 0) & (df[y_column] > 0)]
+        if self.debug:
+            print("")
+            print("Plot curve points:")
+            print(df)
+
+        # one line per series (or a single line if no series are present)
+        series_columns = list(dict.fromkeys(f[0] for f in series_filters))
+        grouped_df = list(df.groupby(series_columns)) if series_columns else [((y_label,), df)]
+
+        # create html file to store plot in
+        output_file(filename=os.path.join(Path(__file__).parent, "{0}.html".format(title.replace(" ", "_"))), title=title)
+
+        # create plot
+        plot = figure(x_axis_type="log", y_axis_type="log", title=title, width=800, toolbar_location="above")
+        # configure tooltip
+        plot.add_tools(HoverTool(tooltips=[(x_label, "@x"), (y_label, "@y{%0.2f}")], formatters={"@y": "printf"}))
+        # create legend outside plot
+        plot.add_layout(Legend(), "right")
+
+        colours = viridis(max(len(grouped_df), 3))
+        for (key, group), colour in zip(grouped_df, colours):
+            key = key if isinstance(key, tuple) else (key,)
+            label = ", ".join("{0} = {1}".format(c.replace("_", " "), k) for c, k in zip(series_columns, key)) if series_columns else key[0]
+            group = group.sort_values(x_column)
+            source = ColumnDataSource(data={"x": group[x_column].astype(float), "y": group[y_column].astype(float)})
+            plot.line(x="x", y="y", source=source, line_color=colour, line_width=2, legend_label=label)
+            plot.scatter(x="x", y="y", source=source, color=colour, size=6, legend_label=label)
+
+        # add labels
+        plot.xaxis.axis_label = x_label
+        plot.yaxis.axis_label = y_label
+        # adjust font size
+        plot.title.text_font_size = "15pt"
+
+        # save to file
+        save(plot)
+
+    # plot type lookup dictionary
+    plot_types = {
+        "generic":  "plot_generic",
+        "curve":    "plot_curve"
+    }
+
     # operator lookup dictionary
     op_lookup = {
         "==":   op.eq,
@@ -304,7 +381,7 @@ def read_args():
     parser.add_argument("config_path", type=str, help="path to a configuration file specifying what to plot")
 
     # optional argument (plot type)
-    parser.add_argument("-p", "--plot_type", type=str, default="generic", help="type of plot to be generated (default: \'generic\')")
+    parser.add_argument("-p", "--plot_type", type=str, default="generic", choices=PostProcessing.plot_types, help="type of plot to be generated: a \'generic\' bar chart or a message size \'curve\' (default: \'generic\')")
 
     # info dump flags
     parser.add_argument("-d", "--debug", action="store_true", help="debug flag for printing additional information")
@@ -370,8 +447,8 @@ def read_perflog(path):
         dictionary contents of their fields (keys become columns, values become row contents).
     """
 
-    # read perflog into dataframe
-    df = pd.read_csv(path, delimiter="|")
+    # read perflog into dataframe (system fingerprints are hex strings, which may look like numbers)
+    df = pd.read_csv(path, delimiter="|", dtype={"system_fingerprint": str})
     REQUIRED_LOG_FIELDS = ["job_completion_time", r"\w+_value$", r"\w+_unit$", "display_name"]
 
     # look for required column matches
@@ -429,6 +506,94 @@ def insert_key_cols(df: pd.DataFrame, index, results):
         # insert keys as new columns
         df.insert(index, k, [r[k] if k in r.keys() else None for r in results])
 
+def get_message_size_curves(df: pd.DataFrame):
+    """
+        Return a dataframe with one row per message size from a dataframe with one performance variable per message size.
+
+        Performance variables named <quantity>_<size>B (e.g. latency_8B, as logged by the OMB and IMB benchmarks) are
+        replaced by a "message_size" column and a single set of <quantity>_value, <quantity>_unit, etc. columns.
+        Message sizes missing from a row are dropped.
+
+        Args:
+            df: dataframe, perflog data with one row per test run.
+    """
+
+    # map message size columns to their size and the name of their replacement column
+    size_cols = {}
+    for col in df.columns:
+        match = re.match(r"^(\w+)_(\d+)B_(value|unit|ref|lower_thres|upper_thres)$", col)
+        if match:
+            size_cols[col] = (int(match.group(2)), "{0}_{1}".format(match.group(1), match.group(3)))
+    if not size_cols:
+        raise KeyError("Could not find message size columns", r"<quantity>_<size>B_value")
+
+    other_df = df.drop(columns=list(size_cols))
+    curves = []
+    for size in sorted(set(s for s, _ in size_cols.values())):
+        cols = {c: name for c, (s, name) in size_cols.items() if s == size}
+        curve = pd.concat([other_df, df[list(cols)].rename(columns=cols)], axis=1)
+        curve.insert(0, "message_size", size)
+        # drop rows from runs which did not report this message size
+        value_cols = [name for name in cols.values() if name.endswith("_value")]
+        curves.append(curve.dropna(subset=value_cols, how="all"))
+
+    return pd.concat(curves, ignore_index=True)
+
+def read_fingerprints(log_files):
+    """
+        Return a dictionary of system fingerprints and their flattened details, read from the fingerprints.jsonl files stored next to the given perflogs.
+
+        Args:
+            log_files: str list, paths to perflog files.
+    """
+
+    fingerprints = {}
+    for log_dir in sorted(set(os.path.dirname(f) for f in log_files)):
+        path = os.path.join(log_dir, "fingerprints.jsonl")
+        if not os.path.isfile(path):
+            continue
+        with open(path, "r") as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    fingerprints[record["fingerprint"]] = flatten_fingerprint(record["info"])
+
+    return fingerprints
+
+def flatten_fingerprint(info, prefix=""):
+    """
+        Return a dictionary of dotted keys (e.g. "os.kernel") and string values from nested system fingerprint details. Lists are joined with commas.
+
+        Args:
+            info: dict, nested fingerprint details.
+            prefix: str, prefix of the keys of this level of nesting.
+    """
+
+    flat = {}
+    for k, v in info.items():
+        if isinstance(v, dict):
+            flat.update(flatten_fingerprint(v, prefix + k + "."))
+        else:
+            flat[prefix + k] = ",".join(map(str, v)) if isinstance(v, list) else str(v)
+
+    return flat
+
+def get_fingerprint_differences(fingerprints, ids):
+    """
+        Return a dataframe with one row per fingerprint detail that differs between the given system fingerprints, and one column per fingerprint. Fingerprints without known details are left out.
+
+        Args:
+            fingerprints: dict, flattened details of each fingerprint (see read_fingerprints).
+            ids: str list, fingerprints to compare.
+    """
+
+    known = [i for i in ids if i in fingerprints]
+    if len(known) < 2:
+        return pd.DataFrame()
+    df = pd.DataFrame({i: fingerprints[i] for i in known}, dtype=object)
+
+    return df[df.nunique(axis=1, dropna=False) > 1]
+
 def get_axis_info(df: pd.DataFrame, axis):
     """
         Return the column name and label for a given axis. If a column name is supplied as units information, the actual units will be extracted from a dataframe.
@@ -461,7 +626,7 @@ def main():
 
     try:
         config = read_config(args.config_path)
-        post.run_post_processing(args.log_path, config)
+        post.run_post_processing(args.log_path, config, args.plot_type)
 
     except Exception as e:
         print(type(e).__name__ + ":", e)
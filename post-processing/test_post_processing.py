@@ -1,3 +1,4 @@
+import json
 import os
 import post_processing as post
 import pytest
@@ -253,3 +254,110 @@ def test_high_level_script(run_sombrero):
     # check returned subset is as expected
     assert df.columns.tolist() == EXPECTED_FIELDS
     assert len(df) == 1
+
+# Test that message size curves are extracted from per-size performance variables and plotted
+def test_message_size_curves(tmp_path):
+
+    # perflog with two runs of a benchmark logging the latency at each message size
+    log_path = tmp_path / "Latency.log"
+    log_path.write_text("\n".join([
+        "job_completion_time|version|info|jobid|num_tasks|latency_8B_value|latency_8B_unit|latency_1024B_value|latency_1024B_unit|display_name|system|tags",
+        "2000-01-01T12:30:15|reframe 4.4.1|Latency|1|2|1.5|us|3.0|us|Latency %mpi=openmpi|default|latency",
+        "2000-01-02T12:30:15|reframe 4.4.1|Latency|2|2|2.0|us|4.5|us|Latency %mpi=mpich|default|latency"]))
+
+    # check expected failure from perflog without message size columns
+    try:
+        post.get_message_size_curves(pd.DataFrame({"flops_value": [1.0], "flops_unit": ["Gflops/seconds"]}))
+    except KeyError:
+        assert True
+    else:
+        assert False
+
+    df = post.get_message_size_curves(post.read_perflog(log_path))
+    # check one row per run and message size, with a single set of latency columns
+    assert len(df) == 4
+    assert sorted(set(df["message_size"])) == [8, 1024]
+    assert "latency_value" in df.columns and "latency_8B_value" not in df.columns
+    assert df[(df["message_size"] == 1024) & (df["mpi"] == "mpich")]["latency_value"].iloc[0] == 4.5
+
+    # check expected failure from unknown plot type
+    post_ = post.PostProcessing()
+    config = {"title": "Title", "filters": [], "series": [["mpi", "openmpi"], ["mpi", "mpich"]], "x_axis": {"value": "message_size", "units": {"custom": "B"}}, "y_axis": {"value": "latency_value", "units": {"column": "latency_unit"}}, "column_types": {"message_size": "int", "latency_value": "float", "latency_unit": "str", "mpi": "str"}}
+    try:
+        post_.run_post_processing(str(log_path), config, "scatter")
+    except RuntimeError:
+        assert True
+    else:
+        assert False
+
+    # plot one curve per series
+    df = post_.run_post_processing(str(log_path), config, "curve")
+    assert df.columns.tolist() == ["message_size", "latency_value", "latency_unit", "mpi"]
+    assert len(df) == 4
+    # check graph was produced and clean it up
+    graph_path = Path(__file__).parent / "Title.html"
+    assert os.path.isfile(graph_path)
+    os.remove(graph_path)
+
+# Test that runs can be split by system fingerprint and the differences between fingerprints found
+def test_system_fingerprints(tmp_path):
+
+    # perflog with runs before and after a kernel and NIC firmware update, and the fingerprint store next to it
+    log_path = tmp_path / "Bandwidth.log"
+    log_path.write_text("\n".join([
+        "job_completion_time|version|info|jobid|num_tasks|bandwidth_value|bandwidth_unit|system_fingerprint|display_name|system|tags",
+        "2000-01-01T12:30:15|reframe 4.4.1|Bandwidth|1|2|12.5|GB/s|0a1b2c3d|Bandwidth|default|bw",
+        "2000-01-02T12:30:15|reframe 4.4.1|Bandwidth|2|2|9.5|GB/s|00123456|Bandwidth|default|bw"]))
+    info = {"os": {"kernel": "4.18.0-477"}, "cpu": {"Model name": "Xeon", "Microcode": "0x2b000461"}, "net": {"ib0": {"driver": ["driver=mlx5_core", "firmware-version=16.28.2006"]}}}
+    updated = {"os": {"kernel": "4.18.0-513"}, "cpu": {"Model name": "Xeon", "Microcode": "0x2b000461"}, "net": {"ib0": {"driver": ["driver=mlx5_core", "firmware-version=16.35.2000"]}}}
+    (tmp_path / "fingerprints.jsonl").write_text("\n".join(json.dumps({"fingerprint": f, "info": i}) for f, i in [("0a1b2c3d", info), ("00123456", updated)]))
+
+    # check fingerprints are read as strings
+    df = post.read_perflog(log_path)
+    assert df["system_fingerprint"].tolist() == ["0a1b2c3d", "00123456"]
+
+    # check only differing details are reported
+    differences = post.get_fingerprint_differences(post.read_fingerprints([str(log_path)]), ["0a1b2c3d", "00123456"])
+    assert differences.index.tolist() == ["os.kernel", "net.ib0.driver"]
+    assert differences["00123456"]["os.kernel"] == "4.18.0-513"
+    # check unknown fingerprints are left out
+    assert post.get_fingerprint_differences(post.read_fingerprints([str(log_path)]), ["0a1b2c3d", "ffffffff"]).empty
+
+    # plot one series per fingerprint
+    post_ = post.PostProcessing()
+    config = {"title": "Title", "filters": [], "series": [["system_fingerprint", "0a1b2c3d"], ["system_fingerprint", "00123456"]], "x_axis": {"value": "num_tasks", "units": {"custom": None}}, "y_axis": {"value": "bandwidth_value", "units": {"column": "bandwidth_unit"}}, "column_types": {"num_tasks": "int", "bandwidth_value": "float", "bandwidth_unit": "str", "system_fingerprint": "str"}}
+    df = post_.run_post_processing(str(log_path), config)
+    assert len(df) == 2
+    # check graph was produced and clean it up
+    graph_path = Path(__file__).parent / "Title.html"
+    assert os.path.isfile(graph_path)
+    os.remove(graph_path)
+
+# Test that the fingerprint store is found next to perflogs written under a non-default ReFrame prefix
+def test_system_fingerprints_prefix(tmp_path, capsys):
+
+    # perflogs and store as written with `--prefix <tmp_path>/prefix`, i.e. <prefix>/perflogs/<system>/<partition>
+    log_dir = tmp_path / "prefix" / "perflogs" / "default" / "default"
+    log_dir.mkdir(parents=True)
+    (log_dir / "Bandwidth.log").write_text("\n".join([
+        "job_completion_time|version|info|jobid|num_tasks|bandwidth_value|bandwidth_unit|system_fingerprint|display_name|system|tags",
+        "2000-01-01T12:30:15|reframe 4.4.1|Bandwidth|1|2|12.5|GB/s|0a1b2c3d|Bandwidth|default|bw",
+        "2000-01-02T12:30:15|reframe 4.4.1|Bandwidth|2|2|9.5|GB/s|00123456|Bandwidth|default|bw"]))
+    (log_dir / "fingerprints.jsonl").write_text("\n".join(json.dumps({"fingerprint": f, "info": {"os": {"kernel": k}}}) for f, k in [("0a1b2c3d", "4.18.0-477"), ("00123456", "4.18.0-513")]))
+
+    # check the store is found from the prefix directory
+    log_files = [os.path.join(root, f) for root, _, files in os.walk(tmp_path / "prefix") for f in files if f.endswith(".log")]
+    fingerprints = post.read_fingerprints(log_files)
+    assert sorted(fingerprints) == ["00123456", "0a1b2c3d"]
+
+    # check the differences are reported when plotting from the prefix directory
+    post_ = post.PostProcessing()
+    config = {"title": "Title", "filters": [], "series": [["system_fingerprint", "0a1b2c3d"], ["system_fingerprint", "00123456"]], "x_axis": {"value": "num_tasks", "units": {"custom": None}}, "y_axis": {"value": "bandwidth_value", "units": {"column": "bandwidth_unit"}}, "column_types": {"num_tasks": "int", "bandwidth_value": "float", "bandwidth_unit": "str", "system_fingerprint": "str"}}
+    post_.run_post_processing(str(tmp_path / "prefix"), config)
+    output = capsys.readouterr().out
+    assert "System fingerprint differences:" in output
+    assert "4.18.0-513" in output
+    # clean up graph
+    graph_path = Path(__file__).parent / "Title.html"
+    assert os.path.isfile(graph_path)
+    os.remove(graph_path)